@@ -0,0 +1,64 @@
+"""
+Declarative role checks for views.
+
+``@role_required(*roles)`` replaces the checks views used to start with::
+
+    @role_required(*MANAGER_ROLES, message='You do not have permission to view tickets.')
+    async def ticket_list(request):
+        ...
+
+It works on sync and async views, sends anonymous users to the login page
+and everybody else without one of ``roles`` to their dashboard with
+``message`` (or a JSON 403 with ``json=True``). Put it outermost, so
+nothing else, such as ``conditional_page``, runs for them. The roles come
+from the principal (see ``accounts.principal``), so the check costs no
+query.
+"""
+
+import asyncio
+from functools import wraps
+
+from django.contrib import messages
+from django.http import JsonResponse
+from django.shortcuts import redirect
+
+from carwash_management.async_views import login_required
+from .models import User
+
+ALL_ROLES = tuple(role for role, _ in User.ROLE_CHOICES)
+MANAGER_ROLES = ('author', 'superadmin')
+
+DEFAULT_MESSAGE = 'You do not have permission to view this page.'
+
+
+def has_role(user, *roles):
+    return user.is_authenticated and user.role in roles
+
+
+def role_required(*roles, message=DEFAULT_MESSAGE, json=False):
+    """Only let signed-in users with one of ``roles`` into the view."""
+    def denied(request):
+        if json:
+            return JsonResponse({'error': 'Permission denied'}, status=403)
+        messages.error(request, message)
+        return redirect('accounts:dashboard')
+
+    def decorator(view_func):
+        if asyncio.iscoroutinefunction(view_func):
+            @wraps(view_func)
+            async def wrapper(request, *args, **kwargs):
+                # login_required has loaded the user
+                if not has_role(request.user, *roles):
+                    return denied(request)
+                return await view_func(request, *args, **kwargs)
+        else:
+            @wraps(view_func)
+            def wrapper(request, *args, **kwargs):
+                if not has_role(request.user, *roles):
+                    return denied(request)
+                return view_func(request, *args, **kwargs)
+
+        wrapper.allowed_roles = roles
+        return login_required(wrapper)
+
+    return decorator
@@ -0,0 +1,95 @@
+import statistics
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.db import connection, reset_queries, transaction
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import reverse
+
+from accounts.management.commands.check_query_budget import QUERY_BUDGETS, Rollback
+from accounts.management.commands.check_query_budget import Command as BudgetCommand
+from carwash.management.benchmarking import ISOLATED_CACHES
+
+PRINCIPAL_MIDDLEWARE = 'accounts.principal.AuthenticationMiddleware'
+DJANGO_MIDDLEWARE = 'django.contrib.auth.middleware.AuthenticationMiddleware'
+
+# Label -> authentication middleware
+MODES = {
+    'user loaded per request': DJANGO_MIDDLEWARE,
+    'principal in the session': PRINCIPAL_MIDDLEWARE,
+}
+
+
+def middleware(authentication):
+    return [authentication if name == PRINCIPAL_MIDDLEWARE else name for name in settings.MIDDLEWARE]
+
+
+def user_lookups(queries):
+    """The queries loading one user by id, as authenticating a request does."""
+    return sum(1 for query in queries if 'FROM "accounts_user" WHERE "accounts_user"."id" =' in query['sql'])
+
+
+class Command(BaseCommand):
+    help = (
+        'Count the queries of every view in check_query_budget with the user loaded from the database per '
+        'request and with the principal stored in the session'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=25, help='Fixture rows per list')
+        parser.add_argument('--repeat', type=int, default=20, help='Timed requests per view and mode')
+
+    def handle(self, *args, **options):
+        results = {}
+        with override_settings(CACHES=ISOLATED_CACHES):
+            try:
+                with transaction.atomic():
+                    fixtures = BudgetCommand().create_fixtures(options['rows'])
+                    for mode, authentication in MODES.items():
+                        with override_settings(MIDDLEWARE=middleware(authentication)):
+                            results[mode] = self.run_views(mode, fixtures, options['repeat'])
+                    raise Rollback
+            except Rollback:
+                pass
+
+        self.summarize(results)
+
+    def run_views(self, mode, fixtures, repeat):
+        self.stdout.write(self.style.MIGRATE_HEADING(mode))
+        self.stdout.write(f'  {"view":<58} {"queries":>7} {"user":>5} {"median ms":>10}')
+        results = {}
+        for role, url_name, url_kwargs, query_string, _ in QUERY_BUDGETS:
+            kwargs = {key: fixtures[value].pk for key, value in url_kwargs.items()}
+            url = reverse(url_name, kwargs=kwargs) + (f'?{query_string}' if query_string else '')
+            label = f'{role} {url}'
+
+            client = Client()
+            client.force_login(fixtures[role])
+            client.get(url)  # warm up
+            # With DEBUG on, the query log may be full and capture nothing
+            reset_queries()
+            with CaptureQueriesContext(connection) as context:
+                client.get(url)
+            timings = []
+            for _ in range(repeat):
+                started = time.perf_counter()
+                client.get(url)
+                timings.append((time.perf_counter() - started) * 1000)
+
+            queries = len(context.captured_queries)
+            results[label] = queries
+            self.stdout.write(
+                f'  {label:<58} {queries:7} {user_lookups(context.captured_queries):5} '
+                f'{statistics.median(timings):10.2f}'
+            )
+        cache.clear()
+        return results
+
+    def summarize(self, results):
+        modes = list(results)
+        self.stdout.write(self.style.MIGRATE_HEADING('Queries over all views'))
+        for mode in modes:
+            self.stdout.write(f'  {mode:<30} {sum(results[mode].values()):5}')
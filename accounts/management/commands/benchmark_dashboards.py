@@ -0,0 +1,100 @@
+import statistics
+import time
+
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from accounts import stats
+from accounts.models import User
+from attendance.models import EmployerAttendance
+from carwash.management.benchmarking import ISOLATED_CACHES
+from carwash.models import Ticket
+
+
+def legacy_author_counts(user, today):
+    """The separate count() queries the author dashboard used to run."""
+    return (
+        Ticket.objects.filter(created_at__date=today).count(),
+        Ticket.objects.filter(status='under_working').count(),
+        Ticket.objects.filter(status='completed').count(),
+    )
+
+
+def legacy_superadmin_counts(user, today):
+    return (
+        User.objects.count(),
+        User.objects.filter(role='employer').count(),
+        User.objects.filter(role='author').count(),
+        Ticket.objects.count(),
+        Ticket.objects.filter(created_at__date=today).count(),
+    )
+
+
+def legacy_employer_counts(user, today):
+    records = EmployerAttendance.objects.filter(user=user, date__gte=today.replace(day=1))
+    return records.filter(status='worked').count(), records.filter(status='missed').count()
+
+
+def author_counts(user, today):
+    return stats.ticket_stats(today)
+
+
+def superadmin_counts(user, today):
+    return stats.user_stats(today), stats.ticket_stats(today)
+
+
+def employer_counts(user, today):
+    return stats.attendance_stats(user, today)
+
+
+ROLES = {
+    'author': (legacy_author_counts, author_counts),
+    'superadmin': (legacy_superadmin_counts, superadmin_counts),
+    'employer': (legacy_employer_counts, employer_counts),
+}
+
+
+class Command(BaseCommand):
+    help = 'Report queries and milliseconds per dashboard render, before and after the cached statistics'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=50, help='Timed runs per measurement')
+
+    def handle(self, *args, **options):
+        with override_settings(CACHES=ISOLATED_CACHES):
+            for role, (legacy, aggregated) in ROLES.items():
+                user = User.objects.filter(role=role).first()
+                if user is None:
+                    raise CommandError(f'No {role} user found. Run setup_initial_data first.')
+                today = timezone.now().date()
+
+                self.stdout.write(self.style.MIGRATE_HEADING(f'{role} dashboard'))
+                self.measure('legacy counts', lambda: legacy(user, today), options['repeat'], clear=True)
+                self.measure('aggregated (cold)', lambda: aggregated(user, today), options['repeat'], clear=True)
+                self.measure('aggregated (cached)', lambda: aggregated(user, today), options['repeat'])
+
+                client = Client()
+                client.force_login(user)
+                url = reverse('accounts:dashboard')
+                self.measure('full render (cold)', lambda: client.get(url), options['repeat'], clear=True)
+                self.measure('full render (cached)', lambda: client.get(url), options['repeat'])
+
+    def measure(self, label, run, repeat, clear=False):
+        run()  # warm up
+        timings, queries = [], []
+        for _ in range(repeat):
+            if clear:
+                cache.clear()
+            with CaptureQueriesContext(connection) as context:
+                started = time.perf_counter()
+                run()
+                timings.append((time.perf_counter() - started) * 1000)
+            queries.append(len(context.captured_queries))
+        self.stdout.write(
+            f'  {label:<22} {statistics.mean(queries):5.1f} queries   {statistics.median(timings):8.2f} ms'
+        )
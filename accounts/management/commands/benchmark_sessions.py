@@ -0,0 +1,95 @@
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, reset_queries
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import reverse
+
+from accounts.models import User
+from carwash.management.benchmarking import ISOLATED_CACHES, new_tag, percentile, remove_seeded, seed_tickets
+from carwash_management.sessions import ENGINES
+
+# (label, role, url name, query string)
+PAGES = [
+    ('ticket_list', 'author', 'carwash:ticket_list', ''),
+    ('ticket_list status=under_working', 'author', 'carwash:ticket_list', 'status=under_working'),
+    ('dashboard (author)', 'author', 'accounts:dashboard', ''),
+    ('dashboard (employer)', 'employer', 'accounts:dashboard', ''),
+    ('dashboard (superadmin)', 'superadmin', 'accounts:dashboard', ''),
+]
+
+
+def session_queries(queries):
+    return sum(1 for query in queries if 'django_session' in query['sql'])
+
+
+class Command(BaseCommand):
+    help = (
+        'Load the ticket list and the dashboards with every session store and report the django_session '
+        'queries per request and the request time'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=100, help='Timed requests per page and store')
+        parser.add_argument('--tickets', type=int, default=2000, help='Tickets to seed')
+        parser.add_argument('--keep', action='store_true', help='Keep the seeded rows')
+
+    def handle(self, *args, **options):
+        users = {
+            role: User.objects.filter(role=role, is_active=True).first()
+            for role in ('author', 'employer', 'superadmin')
+        }
+        missing = [role for role, user in users.items() if user is None]
+        if missing:
+            raise CommandError(f'No {", ".join(missing)} user found. Run setup_initial_data first.')
+
+        tag = new_tag()
+        results = {}
+        try:
+            seed_tickets(tag, options['tickets'], max(1, options['tickets'] // 10), stdout=self.stdout)
+            for store, engine in ENGINES.items():
+                # cached_db keeps the sessions in the default cache
+                with override_settings(SESSION_ENGINE=engine, CACHES=ISOLATED_CACHES):
+                    results[store] = self.run_pages(store, users, options['repeat'])
+        finally:
+            if not options['keep']:
+                self.stdout.write('Removing seeded rows...')
+                remove_seeded(tag)
+
+        self.summarize(results)
+
+    def run_pages(self, store, users, repeat):
+        self.stdout.write(self.style.MIGRATE_HEADING(store))
+        self.stdout.write(f'  {"page":<34} {"session queries":>15} {"queries":>8} {"median ms":>10} {"p95 ms":>8}')
+        results = {}
+        for label, role, url_name, query_string in PAGES:
+            client = Client()
+            client.force_login(users[role])
+            url = reverse(url_name) + (f'?{query_string}' if query_string else '')
+            client.get(url)  # warm up
+
+            timings = []
+            reset_queries()
+            with CaptureQueriesContext(connection) as context:
+                for _ in range(repeat):
+                    started = time.perf_counter()
+                    response = client.get(url)
+                    timings.append((time.perf_counter() - started) * 1000)
+                    if response.status_code != 200:
+                        raise CommandError(f'{url} returned {response.status_code}')
+
+            per_request = session_queries(context.captured_queries) / repeat
+            results[label] = per_request
+            self.stdout.write(
+                f'  {label:<34} {per_request:15.2f} {len(context.captured_queries) / repeat:8.2f} '
+                f'{statistics.median(timings):10.2f} {percentile(timings, 95):8.2f}'
+            )
+        return results
+
+    def summarize(self, results):
+        self.stdout.write(self.style.MIGRATE_HEADING('django_session queries per request'))
+        self.stdout.write(f'  {"page":<34} ' + ' '.join(f'{store:>15}' for store in results))
+        for label in next(iter(results.values())):
+            self.stdout.write(f'  {label:<34} ' + ' '.join(f'{results[store][label]:15.2f}' for store in results))
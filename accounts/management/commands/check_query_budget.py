@@ -0,0 +1,214 @@
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, reset_queries, transaction
+from django.template.base import Template
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from accounts.models import User
+from attendance.models import EmployerAttendance, EmployerNote
+from carwash.management.benchmarking import ISOLATED_CACHES
+from carwash.models import Customer, ServiceType, Ticket, TicketEvent
+from requests.models import EmployerRequest, RequestReply
+
+# (role, url name, url kwargs, query string, maximum number of queries).
+# Budgets include the session lookup every authenticated request makes (the
+# user comes from the principal stored at login, see accounts.principal),
+# are measured with an otherwise cold cache, and must not grow with the
+# number of rows on the page. Pages answering revalidations (see REVALIDATIONS)
+# also read their version once rendered: a query on the page's ids and
+# modification times, plus an exact count with offset pagination (and the
+# ticket list its bulk assignment options).
+QUERY_BUDGETS = [
+    ('author', 'accounts:dashboard', {}, '', 4),
+    ('employer', 'accounts:dashboard', {}, '', 4),
+    ('superadmin', 'accounts:dashboard', {}, '', 4),
+    ('author', 'carwash:ticket_list', {}, '', 7),
+    ('author', 'carwash:ticket_list', {}, 'search=fixture', 7),
+    ('author', 'carwash:ticket_list', {}, 'cursor=', 6),
+    ('author', 'carwash:ticket_create', {}, '', 3),
+    ('author', 'carwash:queue_board', {}, '', 2),
+    ('author', 'carwash:ticket_board', {}, '', 5),
+    ('author', 'carwash:ticket_preview', {'ticket_id': 'ticket'}, '', 3),
+    ('author', 'carwash:ticket_update', {'ticket_id': 'ticket'}, '', 3),
+    ('author', 'carwash:ticket_timeline', {'ticket_id': 'ticket'}, '', 5),
+    ('author', 'carwash:customer_list', {}, '', 5),
+    ('author', 'carwash:vehicle_history', {}, 'car_number=fix-0001', 2),
+    ('author', 'attendance:attendance_list', {}, '', 3),
+    ('employer', 'attendance:attendance_list', {}, '', 3),
+    ('author', 'attendance:notes_list', {}, '', 3),
+    ('employer', 'attendance:notes_list', {}, '', 3),
+    ('author', 'requests:request_list', {}, '', 3),
+    ('employer', 'requests:request_list', {}, '', 3),
+    ('author', 'requests:instruction_list', {}, '', 5),
+    ('author', 'requests:request_reply', {'request_id': 'request'}, '', 3),
+]
+
+# (role, url name, url kwargs, query string, maximum number of queries for
+# a 304, fixture change that must make the page render again). A
+# revalidation that still matches must not render any template.
+REVALIDATIONS = [
+    ('author', 'carwash:ticket_list', {}, '', 4, 'ticket'),
+    ('author', 'carwash:ticket_list', {}, '', 4, 'employer'),
+    ('author', 'carwash:ticket_list', {}, 'cursor=', 4, 'ticket'),
+    ('author', 'carwash:ticket_list', {}, 'search=fixture', 4, 'ticket'),
+    ('author', 'carwash:ticket_preview', {'ticket_id': 'ticket'}, '', 2, 'ticket'),
+    ('author', 'carwash:customer_list', {}, '', 3, 'customer'),
+    ('author', 'requests:instruction_list', {}, '', 3, 'instruction'),
+]
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = 'Render every list and dashboard view against fixture data and check it stays within its query budget'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=25, help='Fixture rows per list')
+        parser.add_argument('--verbose-queries', action='store_true', help='Print the SQL of views over budget')
+
+    def handle(self, *args, **options):
+        # Keeps numbers computed from the fixture rows out of the real cache
+        with override_settings(CACHES=ISOLATED_CACHES):
+            failures = self.check_budgets(options)
+
+        if failures:
+            raise CommandError(f'{len(failures)} view(s) exceeded their query budget or were not revalidated.')
+        self.stdout.write(self.style.SUCCESS('All views are within their query budgets.'))
+
+    def check_budgets(self, options):
+        failures = []
+        try:
+            with transaction.atomic():
+                fixtures = self.create_fixtures(options['rows'])
+                for role, url_name, url_kwargs, query_string, budget in QUERY_BUDGETS:
+                    kwargs = {key: fixtures[value].pk for key, value in url_kwargs.items()}
+                    url = reverse(url_name, kwargs=kwargs) + (f'?{query_string}' if query_string else '')
+
+                    client = Client()
+                    cache.clear()
+                    client.force_login(fixtures[role])
+                    # With DEBUG on, a full query log would capture nothing
+                    reset_queries()
+                    with CaptureQueriesContext(connection) as context:
+                        response = client.get(url)
+
+                    used = len(context.captured_queries)
+                    ok = response.status_code == 200 and used <= budget
+                    status = self.style.SUCCESS('ok  ') if ok else self.style.ERROR('FAIL')
+                    self.stdout.write(f'{status} {role:<10} {url:<45} {used:>3}/{budget} queries ({response.status_code})')
+                    if not ok:
+                        failures.append(url)
+                        if options['verbose_queries']:
+                            for query in context.captured_queries:
+                                self.stdout.write(f"      {query['sql']}")
+                failures += self.check_revalidations(fixtures)
+                raise Rollback
+        except Rollback:
+            pass
+        return failures
+
+    def check_revalidations(self, fixtures):
+        """Check conditional pages answer a matching revalidation with a 304 and a stale one with the page."""
+        failures = []
+        for role, url_name, url_kwargs, query_string, budget, change in REVALIDATIONS:
+            kwargs = {key: fixtures[value].pk for key, value in url_kwargs.items()}
+            url = reverse(url_name, kwargs=kwargs) + (f'?{query_string}' if query_string else '')
+
+            client = Client()
+            client.force_login(fixtures[role])
+            # Twice, so the CSRF cookie set by the first response is sent
+            client.get(url)
+            etag = client.get(url).get('ETag', '')
+            cache.clear()
+            # Signing in again stores the principal, which the cache held
+            client.force_login(fixtures[role])
+            reset_queries()
+            with mock.patch.object(Template, 'render', autospec=True, side_effect=Template.render) as render:
+                with CaptureQueriesContext(connection) as context:
+                    response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+            used = len(context.captured_queries)
+
+            self.make_change(change, fixtures)
+            changed = client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+            ok = (
+                etag and response.status_code == 304 and not render.called and used <= budget
+                and changed.status_code == 200
+            )
+            status = self.style.SUCCESS('ok  ') if ok else self.style.ERROR('FAIL')
+            self.stdout.write(
+                f'{status} {role:<10} {url:<45} {used:>3}/{budget} queries ({response.status_code}, '
+                f'{render.call_count} templates; {changed.status_code} after a {change} change)'
+            )
+            if not ok:
+                failures.append(url)
+        return failures
+
+    def make_change(self, change, fixtures):
+        if change == 'ticket':
+            fixtures['ticket'].save()
+        elif change == 'employer':
+            # Renamed in the bulk assignment options
+            fixtures['employer'].first_name = 'Renamed'
+            fixtures['employer'].save()
+        elif change == 'customer':
+            # Sorts first, so it lands on the first page
+            Customer.objects.create(name='AAA Fixture Customer')
+        elif change == 'instruction':
+            EmployerRequest.objects.create(
+                user=fixtures['employer'], title='New instruction', content='Fixture', is_instruction=True
+            )
+
+    def create_fixtures(self, rows):
+        """Create users and enough rows per list to expose per-row queries."""
+        users = {
+            role: User.objects.create_user(
+                username=f'budget-{role}', password='unused', first_name='Budget', last_name=role.title(), role=role
+            )
+            for role in ('superadmin', 'author', 'employer')
+        }
+
+        service = ServiceType.objects.create(name='Budget Fixture Service', price=Decimal('100.00'))
+        today = timezone.now().date()
+
+        ticket = None
+        for n in range(rows):
+            customer = Customer.objects.create(name=f'Fixture Customer {n}', phone=f'0170000{n:04d}')
+            ticket = Ticket.objects.create(
+                car_number=f'FIX-{n:04d}',
+                service_type=service,
+                customer=customer,
+                service_price=service.price,
+                assigned_to=users['employer'],
+            )
+            EmployerAttendance.objects.create(user=users['employer'], date=today - timedelta(days=n))
+            EmployerNote.objects.create(
+                employer=users['employer'], author=users['author'], title=f'Note {n}', content='Fixture'
+            )
+            employer_request = EmployerRequest.objects.create(
+                user=users['employer'], title=f'Request {n}', content='Fixture'
+            )
+            EmployerRequest.objects.create(
+                user=users['employer'], title=f'Instruction {n}', content='Fixture', is_instruction=True
+            )
+            RequestReply.objects.create(request=employer_request, author=users['author'], content='Fixture')
+
+        # A timeline for the last ticket; events are only written at commit
+        TicketEvent.objects.bulk_create([
+            TicketEvent(
+                ticket=ticket, ticket_number=ticket.ticket_id, action='changed', user=users['author'],
+                changes={'assigned_to_id': [None, users['employer'].pk], 'customer_id': [customer.pk, customer.pk]},
+            )
+            for _ in range(rows)
+        ])
+
+        return {**users, 'ticket': ticket, 'request': employer_request}
@@ -0,0 +1,42 @@
+import time
+from importlib import import_module
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+
+class Command(BaseCommand):
+    help = (
+        'Delete expired sessions a batch at a time, unlike clearsessions, which deletes them all in one '
+        'statement. Meant to run from cron, e.g. hourly.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=5000, help='Sessions deleted per statement')
+        parser.add_argument('--pause', type=float, default=0.1, help='Seconds to wait between batches')
+
+    def handle(self, *args, **options):
+        store = import_module(settings.SESSION_ENGINE).SessionStore
+        if not hasattr(store, 'get_model_class'):
+            self.stdout.write(f'{settings.SESSION_ENGINE} keeps no sessions on the server; nothing to clear.')
+            return
+
+        sessions = store.get_model_class().objects
+        started = time.perf_counter()
+        now = timezone.now()
+        # Read through the expire_date index
+        expired = sessions.filter(expire_date__lt=now).values_list('session_key', flat=True)
+        deleted = 0
+        while True:
+            keys = list(expired[:options['batch_size']])
+            if not keys:
+                break
+            deleted += sessions.filter(session_key__in=keys, expire_date__lt=now).delete()[0]
+            if options['verbosity'] > 1:
+                self.stdout.write(f'{deleted} expired sessions deleted')
+            time.sleep(options['pause'])
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Deleted {deleted} expired sessions in {time.perf_counter() - started:.1f}s'
+        ))
@@ -0,0 +1,95 @@
+"""
+The signed-in user without a database query per request.
+
+Django's ``AuthenticationMiddleware`` loads the user's row on every request.
+The :class:`AuthenticationMiddleware` here keeps a *principal* in the
+session instead: the fields views and templates read (names, role and
+flags), stored at login and turned back into a ``User`` whose other fields
+are deferred. Reading one of those, such as ``password``, still loads it,
+and ``save()`` only writes the loaded fields.
+
+A principal is trusted while it carries the current version of the user's
+``carwash.cache`` namespace, which ``accounts.signals`` bumps whenever the
+user is saved or deleted (a new role, password or active flag), and while
+it is younger than ``PRINCIPAL_MAX_AGE`` seconds, which bounds staleness
+when the cache is per process. Otherwise the user is loaded and checked
+the usual way and the principal is stored again.
+"""
+
+import time
+
+from django.conf import settings
+from django.contrib import auth
+from django.contrib.auth import BACKEND_SESSION_KEY, HASH_SESSION_KEY, SESSION_KEY
+from django.contrib.auth.middleware import AuthenticationMiddleware as DjangoAuthenticationMiddleware
+from django.db import router
+from django.utils.functional import SimpleLazyObject
+
+from carwash import cache
+from .models import User
+
+PRINCIPAL_SESSION_KEY = '_auth_principal'
+PRINCIPAL_MAX_AGE = 300
+
+# Enough for the role checks, the navigation and the dashboards
+PRINCIPAL_FIELDS = (
+    'id', 'username', 'first_name', 'last_name', 'email', 'role', 'is_active', 'is_staff', 'is_superuser',
+)
+
+
+def principal_namespace(user_id):
+    return f'principal:{user_id}'
+
+
+def remember(request, user):
+    """Store the principal of ``user``, who is signed in on ``request``."""
+    request.session[PRINCIPAL_SESSION_KEY] = {
+        'fields': {field: getattr(user, field) for field in PRINCIPAL_FIELDS},
+        'hash': request.session.get(HASH_SESSION_KEY),
+        'version': cache.namespace_version(principal_namespace(user.pk)),
+        'loaded_at': time.time(),
+    }
+
+
+def _is_current(session, principal):
+    fields = principal['fields']
+    return (
+        str(fields['id']) == session.get(SESSION_KEY)
+        and principal['hash'] == session.get(HASH_SESSION_KEY)
+        and session.get(BACKEND_SESSION_KEY) in settings.AUTHENTICATION_BACKENDS
+        and time.time() - principal['loaded_at'] < PRINCIPAL_MAX_AGE
+        and principal['version'] == cache.namespace_version(principal_namespace(fields['id']))
+    )
+
+
+def _principal_user(principal):
+    fields = principal['fields']
+    names = [field.attname for field in User._meta.concrete_fields if field.attname in fields]
+    return User.from_db(router.db_for_read(User), names, [fields[name] for name in names])
+
+
+def get_user(request):
+    """The user signed in on ``request``, from the principal in its session when that is current."""
+    principal = request.session.get(PRINCIPAL_SESSION_KEY)
+    if principal is not None and _is_current(request.session, principal):
+        return _principal_user(principal)
+
+    user = auth.get_user(request)
+    if user.is_authenticated:
+        remember(request, user)
+    elif principal is not None:
+        request.session.pop(PRINCIPAL_SESSION_KEY, None)
+    return user
+
+
+def invalidate(user_id):
+    """Make every session of the user reload them on its next request."""
+    cache.invalidate(principal_namespace(user_id))
+
+
+class AuthenticationMiddleware(DjangoAuthenticationMiddleware):
+    """``request.user`` from the session's principal, see the module docstring."""
+
+    def process_request(self, request):
+        super().process_request(request)
+        request.user = SimpleLazyObject(lambda: get_user(request))
@@ -0,0 +1,39 @@
+from django.contrib.auth.signals import user_logged_in
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from attendance.models import EmployerAttendance
+from carwash.models import Ticket
+from .models import User
+from . import principal, stats
+
+
+@receiver([post_save, post_delete], sender=Ticket)
+def ticket_changed(sender, instance, **kwargs):
+    # After the commit, so a dashboard computed meanwhile cannot cache the
+    # old counts under the new version
+    transaction.on_commit(stats.invalidate_ticket_stats)
+
+
+@receiver([post_save, post_delete], sender=User)
+def user_changed(sender, instance, **kwargs):
+    # After the commit, so a dashboard computed meanwhile cannot cache the
+    # old counts, nor a session reloading the user keep the old row, under
+    # the new version
+    transaction.on_commit(stats.invalidate_user_stats)
+    transaction.on_commit(lambda: principal.invalidate(instance.pk))
+
+
+@receiver(user_logged_in)
+def user_logged_in_principal(sender, request, user, **kwargs):
+    # Runs after update_last_login, so the version is already the new one
+    if request is not None and hasattr(request, 'session'):
+        principal.remember(request, user)
+
+
+@receiver([post_save, post_delete], sender=EmployerAttendance)
+def attendance_changed(sender, instance, **kwargs):
+    # After the commit, as for tickets
+    user_id = instance.user_id
+    transaction.on_commit(lambda: stats.invalidate_attendance_stats(user_id))
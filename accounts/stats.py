@@ -0,0 +1,91 @@
+"""
+Dashboard statistics.
+
+Each group of numbers is computed with one conditional aggregation query
+(ticket counts come from the daily rollups in ``reports``) and cached for a
+short time through ``carwash.cache``. The save/delete signals in
+``accounts.signals`` invalidate the group's namespace once the changes to
+the underlying rows commit, so the TTL only bounds staleness from bulk
+updates that bypass signals.
+"""
+
+from asgiref.sync import sync_to_async
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import Coalesce
+
+from attendance.models import EmployerAttendance
+from carwash import cache
+from reports.models import DailyTicketSummary
+from .models import User
+
+STATS_TIMEOUT = 30
+
+TICKET_STATS = 'dashboard-tickets'
+USER_STATS = 'dashboard-users'
+
+
+def attendance_stats_namespace(user_id):
+    return f'dashboard-attendance:{user_id}'
+
+
+def ticket_stats(today):
+    """Total, today's, pending and completed ticket counts."""
+    def compute():
+        totals = DailyTicketSummary.objects.aggregate(
+            total_tickets=Coalesce(Sum('tickets'), 0),
+            total_tickets_today=Coalesce(Sum('tickets', filter=Q(date=today)), 0),
+            completed_tickets=Coalesce(Sum('completed'), 0),
+            cancelled_tickets=Coalesce(Sum('cancelled'), 0),
+        )
+        # Every ticket is under working, completed or cancelled
+        totals['pending_tickets'] = (
+            totals['total_tickets'] - totals['completed_tickets'] - totals.pop('cancelled_tickets')
+        )
+        return totals
+
+    return cache.get_or_set(TICKET_STATS, today.isoformat(), compute, STATS_TIMEOUT)
+
+
+def user_stats(today):
+    """User counts by role."""
+    def compute():
+        return User.objects.aggregate(
+            total_users=Count('id'),
+            total_employers=Count('id', filter=Q(role='employer')),
+            total_authors=Count('id', filter=Q(role='author')),
+        )
+
+    return cache.get_or_set(USER_STATS, today.isoformat(), compute, STATS_TIMEOUT)
+
+
+def attendance_stats(user, today):
+    """Worked and missed days for ``user`` in the current month."""
+    def compute():
+        return EmployerAttendance.objects.filter(
+            user=user,
+            date__gte=today.replace(day=1),
+        ).aggregate(
+            worked_days=Count('id', filter=Q(status='worked')),
+            missed_days=Count('id', filter=Q(status='missed')),
+        )
+
+    return cache.get_or_set(attendance_stats_namespace(user.pk), today.isoformat(), compute, STATS_TIMEOUT)
+
+
+# For async views. The numbers usually come from the cache, but a miss runs
+# the aggregate, so the whole lookup happens in a worker thread.
+aticket_stats = sync_to_async(ticket_stats)
+auser_stats = sync_to_async(user_stats)
+aattendance_stats = sync_to_async(attendance_stats)
+
+
+def invalidate_ticket_stats():
+    cache.invalidate(TICKET_STATS)
+
+
+def invalidate_user_stats():
+    cache.invalidate(USER_STATS)
+
+
+def invalidate_attendance_stats(user_id):
+    cache.invalidate(attendance_stats_namespace(user_id))
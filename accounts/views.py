@@ -1,13 +1,17 @@
+import asyncio
+
 from django.shortcuts import render, redirect
 from django.contrib.auth import login, authenticate, logout
-from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from django.utils import timezone
 from django.db.models import Q
 from .forms import EmployerSignupForm, AuthorSignupForm, UserLoginForm
 from .models import User
-from carwash.models import Ticket, ServiceType
-from attendance.models import EmployerAttendance
+from . import stats
+from carwash.catalog import aget_catalog
+from carwash.fragments import aticket_rows_version
+from carwash.models import Ticket
+from carwash_management.async_views import alist, login_required
 from requests.models import EmployerRequest
 
 
@@ -70,53 +74,46 @@ def author_signup(request):
 
 
 @login_required
-def dashboard(request):
+async def dashboard(request):
     """Main dashboard based on user role."""
     user = request.user
     today = timezone.now().date()
     
     if user.is_employer():
-        return employer_dashboard(request, user, today)
+        return await employer_dashboard(request, user, today)
     elif user.is_author():
-        return author_dashboard(request, user, today)
+        return await author_dashboard(request, user, today)
     elif user.is_superadmin():
-        return superadmin_dashboard(request, user, today)
+        return await superadmin_dashboard(request, user, today)
     else:
         messages.error(request, 'Invalid user role.')
         return redirect('accounts:login')
 
 
-def employer_dashboard(request, user, today):
+async def employer_dashboard(request, user, today):
     """Employer dashboard with progress and instructions."""
-    # Get monthly progress
-    current_month = today.replace(day=1)
-    attendance_records = EmployerAttendance.objects.filter(
-        user=user,
-        date__gte=current_month
+    attendance_stats, instructions, recent_requests = await asyncio.gather(
+        # Get monthly progress
+        stats.aattendance_stats(user, today),
+        # Get instructions and notes from Author
+        alist(EmployerRequest.objects.filter(
+            user=user,
+            is_instruction=True,
+            is_active=True
+        ).order_by('-created_at')[:5]),
+        # Get recent requests
+        alist(EmployerRequest.objects.for_listing().filter(
+            user=user,
+            is_instruction=False
+        ).order_by('-created_at')[:5]),
     )
-    
-    worked_days = attendance_records.filter(status='worked').count()
-    missed_days = attendance_records.filter(status='missed').count()
     total_days = today.day
     
-    # Get instructions and notes from Author
-    instructions = EmployerRequest.objects.filter(
-        user=user,
-        is_instruction=True,
-        is_active=True
-    ).order_by('-created_at')[:5]
-    
-    # Get recent requests
-    recent_requests = EmployerRequest.objects.filter(
-        user=user,
-        is_instruction=False
-    ).order_by('-created_at')[:5]
-    
     context = {
         'user': user,
         'today': today,
-        'worked_days': worked_days,
-        'missed_days': missed_days,
+        'worked_days': attendance_stats['worked_days'],
+        'missed_days': attendance_stats['missed_days'],
         'total_days': total_days,
         'instructions': instructions,
         'recent_requests': recent_requests,
@@ -125,61 +122,62 @@ def employer_dashboard(request, user, today):
     return render(request, 'accounts/employer_dashboard.html', context)
 
 
-def author_dashboard(request, user, today):
+async def author_dashboard(request, user, today):
     """Author dashboard with events, tickets, and management tools."""
     # Get upcoming events (from SuperAdmin)
     # For now, we'll use a simple model - this can be enhanced later
     
-    # Get ticket statistics
-    total_tickets_today = Ticket.objects.filter(created_at__date=today).count()
-    pending_tickets = Ticket.objects.filter(status='under_working').count()
-    completed_tickets = Ticket.objects.filter(status='completed').count()
-    
-    # Get recent tickets
-    recent_tickets = Ticket.objects.filter(status='under_working').order_by('-created_at')[:10]
-    
-    # Get employer requests
-    employer_requests = EmployerRequest.objects.filter(
-        is_instruction=False,
-        is_active=True
-    ).order_by('-created_at')[:10]
+    # Read before the tickets, see carwash.fragments
+    tickets_version = await aticket_rows_version()
+    
+    ticket_stats, recent_tickets, employer_requests = await asyncio.gather(
+        # Get ticket statistics
+        stats.aticket_stats(today),
+        # Get recent tickets
+        alist(Ticket.objects.for_listing().filter(status='under_working').order_by('-created_at')[:10]),
+        # Get employer requests
+        alist(EmployerRequest.objects.for_listing().filter(
+            is_instruction=False,
+            is_active=True
+        ).order_by('-created_at')[:10]),
+    )
     
     context = {
         'user': user,
         'today': today,
-        'total_tickets_today': total_tickets_today,
-        'pending_tickets': pending_tickets,
-        'completed_tickets': completed_tickets,
+        'total_tickets_today': ticket_stats['total_tickets_today'],
+        'pending_tickets': ticket_stats['pending_tickets'],
+        'completed_tickets': ticket_stats['completed_tickets'],
         'recent_tickets': recent_tickets,
+        'tickets_version': tickets_version,
         'employer_requests': employer_requests,
     }
     
     return render(request, 'accounts/author_dashboard.html', context)
 
 
-def superadmin_dashboard(request, user, today):
+async def superadmin_dashboard(request, user, today):
     """SuperAdmin dashboard with system overview."""
-    # Get system statistics
-    total_users = User.objects.count()
-    total_employers = User.objects.filter(role='employer').count()
-    total_authors = User.objects.filter(role='author').count()
-    
-    # Get ticket statistics
-    total_tickets = Ticket.objects.count()
-    total_tickets_today = Ticket.objects.filter(created_at__date=today).count()
-    
-    # Get service types
-    service_types = ServiceType.objects.all()
+    user_stats, ticket_stats, catalog = await asyncio.gather(
+        # Get system statistics
+        stats.auser_stats(today),
+        # Get ticket statistics
+        stats.aticket_stats(today),
+        # Get service types
+        aget_catalog(),
+    )
+    service_types = catalog.services
     
     context = {
         'user': user,
         'today': today,
-        'total_users': total_users,
-        'total_employers': total_employers,
-        'total_authors': total_authors,
-        'total_tickets': total_tickets,
-        'total_tickets_today': total_tickets_today,
+        'total_users': user_stats['total_users'],
+        'total_employers': user_stats['total_employers'],
+        'total_authors': user_stats['total_authors'],
+        'total_tickets': ticket_stats['total_tickets'],
+        'total_tickets_today': ticket_stats['total_tickets_today'],
         'service_types': service_types,
+        'service_types_version': catalog.version,
     }
     
     return render(request, 'accounts/superadmin_dashboard.html', context)
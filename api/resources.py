@@ -0,0 +1,314 @@
+"""
+Models exposed by the JSON API.
+
+A resource says which rows a user may read and write, which fields a
+response may contain (API name -> attribute path, e.g. ``customer.name``),
+how its list is ordered for cursor pagination and which forms validate
+writes. Writes use the same forms, and so the same rules, as the HTML
+views.
+"""
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.forms.models import model_to_dict
+from django.utils import timezone
+
+from attendance.forms import AttendanceForm
+from attendance.models import EmployerAttendance
+from carwash import audit, live
+from carwash.forms import CustomerForm, TicketForm, TicketUpdateForm
+from carwash.imports import RowError, TicketImporter
+from carwash.models import Customer, ServiceType, Ticket
+from carwash.search import search_customers
+from requests.forms import EmployerRequestForm
+from requests.models import EmployerRequest
+
+
+class Resource:
+    model = None
+    # API field name -> attribute path
+    fields = {}
+    # Cursor pagination order; must end with a unique field
+    ordering = ('-created_at', '-id')
+    create_form = None
+    update_form = None
+    # Values a create request may leave out
+    defaults = {}
+
+    def can_read(self, user):
+        return user.is_author() or user.is_superadmin()
+
+    def can_write(self, user):
+        return self.can_read(user)
+
+    def queryset(self, user):
+        """Rows ``user`` may read."""
+        return self.model.objects.all()
+
+    def writable(self, user):
+        """Rows ``user`` may update."""
+        return self.queryset(user)
+
+    def filter(self, queryset, params):
+        """Apply the list filters in the query string ``params``."""
+        return queryset
+
+    def load(self, queryset, names):
+        """Restrict ``queryset`` to the columns and joins the fields ``names`` need."""
+        only = {name.lstrip('-') for name in self.ordering}
+        related = set()
+        for name in names:
+            model, path = self.model, []
+            parts = self.fields[name].split('.')
+            for index, part in enumerate(parts):
+                field = model._meta.get_field(part)
+                path.append(field.name)
+                if index < len(parts) - 1:
+                    related.add('__'.join(path))
+                    only.add('__'.join(path))
+                    model = field.related_model
+            only.add('__'.join(path))
+        return queryset.select_related(*related).only(*only)
+
+    def serialize(self, obj, names):
+        data = {}
+        for name in names:
+            value = obj
+            for part in self.fields[name].split('.'):
+                value = getattr(value, part)
+                if value is None:
+                    break
+            data[name] = value
+        return data
+
+    def initial(self, instance):
+        """The current values of ``instance`` as update form data, so a PATCH may send only what changes."""
+        return model_to_dict(instance, fields=self.update_form._meta.fields)
+
+    def create(self, forms, user):
+        """Save validated create forms in one transaction and return the new objects."""
+        # Ticket events of the whole batch are written with one insert
+        with transaction.atomic(), audit.batch():
+            return [self.save(form, user) for form in forms]
+
+    def update(self, forms, user):
+        with transaction.atomic(), audit.batch():
+            return [self.save(form, user) for form in forms]
+
+    def save(self, form, user):
+        return form.save()
+
+
+class TicketResource(Resource):
+    model = Ticket
+    fields = {
+        'id': 'id',
+        'ticket_id': 'ticket_id',
+        'car_number': 'car_number',
+        'car_model': 'car_model',
+        'service_type': 'service_type_id',
+        'service_name': 'service_type.name',
+        'customer': 'customer_id',
+        'customer_name': 'customer.name',
+        'customer_phone': 'customer.phone',
+        'status': 'status',
+        'payment_status': 'payment_status',
+        'service_price': 'service_price',
+        'additional_charges': 'additional_charges',
+        'total_amount': 'total_amount',
+        'assigned_to': 'assigned_to_id',
+        'created_at': 'created_at',
+        'updated_at': 'updated_at',
+        'completed_at': 'completed_at',
+        'version': 'version',
+    }
+    create_form = TicketForm
+    update_form = TicketUpdateForm
+    defaults = {'additional_charges': '0'}
+
+    def writable(self, user):
+        # Ticket.save() indexes the customer's name and phone
+        return Ticket.objects.select_related('customer')
+
+    def initial(self, instance):
+        # A PATCH sending the version it read fails if the ticket changed since
+        return {**super().initial(instance), 'version': instance.version}
+
+    def filter(self, queryset, params):
+        return queryset.filter_listing(
+            params.get('status'), params.get('payment'), params.get('service'), params.get('search'),
+        )
+
+    def create(self, forms, user):
+        # Validated like the ticket form, written in bulk like an import
+        rows = [self.import_row(form.cleaned_data) for form in forms]
+        try:
+            tickets = TicketImporter().import_chunk(list(enumerate(rows)))
+        except RowError as e:
+            raise ValidationError(str(e))
+
+        # bulk_create skips the signal that shows new tickets on the queue screens
+        events = [live.ticket_event(ticket, None) for ticket in tickets]
+        transaction.on_commit(lambda: [live.publish(event) for event in events])
+        return tickets
+
+    def import_row(self, data):
+        return {
+            'car_number': data['car_number'],
+            'car_model': data['car_model'],
+            'service_type': str(data['service_type'].pk),
+            'customer_name': data['customer_name'],
+            'customer_phone': data['customer_phone'],
+            'customer_email': data['customer_email'],
+            'customer_address': data['customer_address'],
+            'additional_charges': str(data['additional_charges']),
+            'assigned_to': data['assigned_to'].username if data['assigned_to'] else '',
+        }
+
+
+class CustomerResource(Resource):
+    model = Customer
+    fields = {
+        'id': 'id',
+        'name': 'name',
+        'phone': 'phone',
+        'email': 'email',
+        'address': 'address',
+        'created_at': 'created_at',
+        'updated_at': 'updated_at',
+    }
+    ordering = ('name', 'id')
+    create_form = CustomerForm
+    update_form = CustomerForm
+
+    def filter(self, queryset, params):
+        if params.get('search'):
+            queryset = search_customers(queryset, params['search'])
+        return queryset
+
+
+class ServiceTypeResource(Resource):
+    """Read only; service types are managed in the admin."""
+
+    model = ServiceType
+    fields = {
+        'id': 'id',
+        'name': 'name',
+        'description': 'description',
+        'price': 'price',
+        'is_active': 'is_active',
+        'updated_at': 'updated_at',
+    }
+    ordering = ('name', 'id')
+
+    def can_write(self, user):
+        return False
+
+    def filter(self, queryset, params):
+        if params.get('active'):
+            queryset = queryset.filter(is_active=params['active'] not in ('0', 'false'))
+        return queryset
+
+
+class AttendanceResource(Resource):
+    """Employers mark and correct their own attendance for today, as on the attendance page."""
+
+    model = EmployerAttendance
+    fields = {
+        'id': 'id',
+        'user': 'user_id',
+        'username': 'user.username',
+        'date': 'date',
+        'status': 'status',
+        'check_in_time': 'check_in_time',
+        'check_out_time': 'check_out_time',
+        'notes': 'notes',
+        'created_at': 'created_at',
+        'updated_at': 'updated_at',
+    }
+    ordering = ('-date', '-id')
+    create_form = AttendanceForm
+    update_form = AttendanceForm
+
+    def can_read(self, user):
+        return user.is_employer() or user.is_author() or user.is_superadmin()
+
+    def can_write(self, user):
+        return user.is_employer()
+
+    def queryset(self, user):
+        if user.is_employer():
+            return EmployerAttendance.objects.filter(user=user)
+        return EmployerAttendance.objects.all()
+
+    def writable(self, user):
+        return EmployerAttendance.objects.filter(user=user, date=timezone.now().date())
+
+    def filter(self, queryset, params):
+        return queryset.for_month(params.get('month'))
+
+    def save(self, form, user):
+        attendance = form.save(commit=False)
+        if attendance.pk is None:
+            attendance.user = user
+            attendance.date = timezone.now().date()
+            if EmployerAttendance.objects.filter(user=user, date=attendance.date).exists():
+                raise ValidationError('Attendance for today is already marked; update it instead.')
+        attendance.save()
+        return attendance
+
+
+class RequestResource(Resource):
+    """Employer requests and author instructions, as on the request pages."""
+
+    model = EmployerRequest
+    fields = {
+        'id': 'id',
+        'user': 'user_id',
+        'username': 'user.username',
+        'title': 'title',
+        'content': 'content',
+        'request_type': 'request_type',
+        'is_instruction': 'is_instruction',
+        'is_active': 'is_active',
+        'is_read': 'is_read',
+        'created_at': 'created_at',
+        'updated_at': 'updated_at',
+    }
+    create_form = EmployerRequestForm
+    update_form = EmployerRequestForm
+
+    def can_read(self, user):
+        return user.is_employer() or user.is_author()
+
+    def queryset(self, user):
+        if user.is_employer():
+            return EmployerRequest.objects.filter(user=user)
+        return EmployerRequest.objects.all()
+
+    def writable(self, user):
+        return EmployerRequest.objects.filter(user=user)
+
+    def filter(self, queryset, params):
+        kind = params.get('type')
+        if kind in ('request', 'instruction'):
+            queryset = queryset.filter(is_instruction=kind == 'instruction')
+        return queryset
+
+    def save(self, form, user):
+        request_obj = form.save(commit=False)
+        if request_obj.pk is None:
+            request_obj.user = user
+            # Authors write instructions
+            request_obj.is_instruction = user.is_author()
+        request_obj.save()
+        return request_obj
+
+
+RESOURCES = {
+    'tickets': TicketResource(),
+    'customers': CustomerResource(),
+    'service-types': ServiceTypeResource(),
+    'attendance': AttendanceResource(),
+    'requests': RequestResource(),
+}
@@ -0,0 +1,45 @@
+import json
+
+from django.test import TestCase
+
+from accounts.models import User
+from carwash.models import ServiceType, Ticket, TicketEvent
+
+
+class TicketBatchAuditTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user('author', password='secret', role='author')
+        cls.service = ServiceType.objects.create(name='Basic Wash', price=100)
+
+    def setUp(self):
+        self.client.force_login(self.author)
+
+    def create_tickets(self, count):
+        items = [
+            {'car_number': f'API-{n}', 'service_type': self.service.pk, 'customer_name': f'Customer {n}'}
+            for n in range(count)
+        ]
+        response = self.client.post('/api/tickets/', json.dumps(items), content_type='application/json')
+        self.assertEqual(response.status_code, 201)
+        return [item['id'] for item in response.json()]
+
+    def test_batch_create_records_created_events(self):
+        ids = self.create_tickets(3)
+        events = TicketEvent.objects.filter(ticket_id__in=ids)
+        self.assertEqual([event.action for event in events], ['created'] * 3)
+        self.assertEqual({event.user_id for event in events}, {self.author.pk})
+        self.assertEqual(events.get(ticket_id=ids[0]).changes['car_number'], [None, 'API-0'])
+
+    def test_batch_update_writes_events_with_one_insert(self):
+        ids = self.create_tickets(3)
+        items = [{'id': pk, 'additional_charges': '25'} for pk in ids]
+        # The session, the locked tickets, per ticket its savepoint, update,
+        # daily summary update and release, then a single event insert, the
+        # batch savepoints and the response rows
+        with self.assertNumQueries(20) as context:
+            response = self.client.patch('/api/tickets/', json.dumps(items), content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        inserts = [query for query in context.captured_queries if 'INSERT INTO "carwash_ticketevent"' in query['sql']]
+        self.assertEqual(len(inserts), 1)
+        self.assertEqual(TicketEvent.objects.filter(ticket_id__in=ids, action='changed').count(), 3)
@@ -0,0 +1,9 @@
+from django.urls import path
+from . import views
+
+app_name = 'api'
+
+urlpatterns = [
+    path('<slug:resource>/', views.collection, name='collection'),
+    path('<slug:resource>/<int:pk>/', views.detail, name='detail'),
+]
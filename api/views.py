@@ -0,0 +1,224 @@
+"""
+JSON API for the check-in tablets and other clients.
+
+    GET   /api/<resource>/             list, newest first, a page at a time
+    POST  /api/<resource>/             create one object, or a list of them
+    PATCH /api/<resource>/             update a list of objects, each with its "id"
+    GET   /api/<resource>/<id>/        one object
+    PATCH /api/<resource>/<id>/        update one object
+
+Resources are listed in ``api.resources``. Requests are authenticated with
+the session cookie and, for writes, the CSRF token in the ``X-CSRFToken``
+header, like the AJAX calls of the HTML pages.
+
+To keep transfers small:
+
+* ``?fields=id,status`` returns only those fields (and reads only their
+  columns).
+* Lists are paginated with the opaque ``next``/``previous`` cursors of
+  ``carwash_management.pagination``; ``?limit=`` sets the page size.
+* GET responses carry an ``ETag``; a request sending it back in
+  ``If-None-Match`` gets an empty ``304 Not Modified`` if nothing changed.
+* Responses are gzipped for clients that accept it.
+
+Tickets have a ``version``. A PATCH that sends the version it read is
+refused if the ticket has changed since, so it cannot overwrite someone
+else's change.
+
+A batch is validated as a whole and saved in one transaction: either every
+item is saved or, with a 400 response listing the errors by item index,
+none is.
+"""
+
+import json
+from functools import wraps
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.http import JsonResponse
+from django.utils.cache import get_conditional_response, patch_cache_control, set_response_etag
+from django.views.decorators.gzip import gzip_page
+from django.views.decorators.http import require_http_methods
+
+from carwash_management.pagination import CURSOR_PARAM, KeysetPaginator
+from .resources import RESOURCES
+
+PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+# Items per batch create or update
+MAX_BATCH_SIZE = 100
+
+
+class ApiError(Exception):
+
+    def __init__(self, message, status=400, **details):
+        super().__init__(message)
+        self.message = message
+        self.status = status
+        self.details = details
+
+
+def error_response(message, status, **details):
+    return JsonResponse({'error': message, **details}, status=status)
+
+
+def json_response(request, payload, status=200):
+    """``payload`` as JSON; successful GETs can be revalidated with their ETag."""
+    response = JsonResponse(payload, status=status, safe=False)
+    if request.method in ('GET', 'HEAD') and status == 200:
+        # Clients keep the copy but check with us before reusing it
+        patch_cache_control(response, private=True, no_cache=True)
+        set_response_etag(response)
+        return get_conditional_response(request, etag=response['ETag'], response=response)
+    return response
+
+
+def api_view(view_func):
+    """Look up the resource and check the user may read (GET) or write it."""
+    @wraps(view_func)
+    def wrapper(request, resource, *args, **kwargs):
+        if not request.user.is_authenticated:
+            return error_response('Authentication required', 401)
+        api_resource = RESOURCES.get(resource)
+        if api_resource is None:
+            return error_response('Unknown resource', 404)
+        if request.method in ('GET', 'HEAD'):
+            allowed = api_resource.can_read(request.user)
+        else:
+            allowed = api_resource.can_write(request.user)
+        if not allowed:
+            return error_response('Permission denied', 403)
+        try:
+            return view_func(request, api_resource, *args, **kwargs)
+        except ApiError as e:
+            return error_response(e.message, e.status, **e.details)
+    return gzip_page(wrapper)
+
+
+def requested_fields(request, resource):
+    """The field names in ``?fields=``, or every field."""
+    fields = request.GET.get('fields')
+    if not fields:
+        return list(resource.fields)
+    names = [name.strip() for name in fields.split(',') if name.strip()]
+    unknown = [name for name in names if name not in resource.fields]
+    if unknown:
+        raise ApiError(f'Unknown field: {", ".join(unknown)}', available=list(resource.fields))
+    return names
+
+
+def page_size(request):
+    try:
+        size = int(request.GET.get('limit', PAGE_SIZE))
+    except ValueError:
+        raise ApiError('limit must be a number')
+    return max(1, min(size, MAX_PAGE_SIZE))
+
+
+def read_items(request):
+    """The JSON body as a list of objects, and whether it was a list."""
+    try:
+        body = json.loads(request.body or b'null')
+    except ValueError:
+        raise ApiError('The request body is not valid JSON')
+    many = isinstance(body, list)
+    items = body if many else [body]
+    if not items or not all(isinstance(item, dict) for item in items):
+        raise ApiError('Send a JSON object or a list of objects')
+    if len(items) > MAX_BATCH_SIZE:
+        raise ApiError(f'Send at most {MAX_BATCH_SIZE} items at a time')
+    return items, many
+
+
+def validate(forms):
+    errors = [
+        {'index': index, 'fields': form.errors.get_json_data()}
+        for index, form in enumerate(forms)
+        if not form.is_valid()
+    ]
+    if errors:
+        raise ApiError('Invalid data', errors=errors)
+
+
+def saved(request, resource, objects, names, many, status=200):
+    """Respond with ``objects`` as just saved, read back with the fields ``names``."""
+    rows = resource.load(resource.model.objects.all(), names).in_bulk([obj.pk for obj in objects])
+    results = [resource.serialize(rows[obj.pk], names) for obj in objects]
+    return json_response(request, results if many else results[0], status)
+
+
+@api_view
+@require_http_methods(['GET', 'HEAD', 'POST', 'PATCH'])
+def collection(request, resource):
+    if request.method == 'POST':
+        return create(request, resource)
+    if request.method == 'PATCH':
+        return update(request, resource)
+
+    names = requested_fields(request, resource)
+    queryset = resource.load(resource.filter(resource.queryset(request.user), request.GET), names)
+    paginator = KeysetPaginator(queryset, page_size(request), resource.ordering, count_timeout=None)
+    page = paginator.get_page(request.GET.get(CURSOR_PARAM))
+    return json_response(request, {
+        'results': [resource.serialize(obj, names) for obj in page],
+        'next': page.next_cursor,
+        'previous': page.previous_cursor,
+    })
+
+
+@api_view
+@require_http_methods(['GET', 'HEAD', 'PATCH'])
+def detail(request, resource, pk):
+    if request.method == 'PATCH':
+        return update(request, resource, pk)
+
+    names = requested_fields(request, resource)
+    obj = resource.load(resource.queryset(request.user), names).filter(pk=pk).first()
+    if obj is None:
+        raise ApiError('Not found', 404)
+    return json_response(request, resource.serialize(obj, names))
+
+
+def create(request, resource):
+    if resource.create_form is None:
+        raise ApiError('This resource cannot be created through the API', 405)
+    names = requested_fields(request, resource)
+    items, many = read_items(request)
+    forms = [resource.create_form({**resource.defaults, **item}) for item in items]
+    validate(forms)
+    try:
+        objects = resource.create(forms, request.user)
+    except ValidationError as e:
+        raise ApiError('Invalid data', errors=e.messages)
+    return saved(request, resource, objects, names, many, status=201)
+
+
+def update(request, resource, pk=None):
+    if resource.update_form is None:
+        raise ApiError('This resource cannot be updated through the API', 405)
+    names = requested_fields(request, resource)
+    items, many = read_items(request)
+    if pk is not None:
+        if many:
+            raise ApiError('Send a single object to update one object')
+        items = [{**items[0], 'id': pk}]
+
+    ids = [item.get('id') for item in items]
+    if not all(isinstance(pk, int) for pk in ids):
+        raise ApiError('Every item needs the integer "id" of the object to update')
+
+    with transaction.atomic():
+        instances = resource.writable(request.user).select_for_update().in_bulk(ids)
+        missing = [pk for pk in ids if pk not in instances]
+        if missing:
+            raise ApiError('Not found', 404, ids=missing)
+        forms = [
+            resource.update_form({**resource.initial(instances[item['id']]), **item}, instance=instances[item['id']])
+            for item in items
+        ]
+        validate(forms)
+        try:
+            objects = resource.update(forms, request.user)
+        except ValidationError as e:
+            raise ApiError('Invalid data', errors=e.messages)
+    return saved(request, resource, objects, names, many)
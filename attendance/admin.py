@@ -7,6 +7,7 @@ class EmployerAttendanceAdmin(admin.ModelAdmin):
     list_display = ('user', 'date', 'status', 'check_in_time', 'check_out_time', 'created_at')
     list_filter = ('status', 'date', 'created_at')
     search_fields = ('user__first_name', 'user__last_name', 'user__username')
+    list_select_related = ('user',)
     ordering = ('-date',)
     
     fieldsets = (
@@ -27,6 +28,7 @@ class EmployerNoteAdmin(admin.ModelAdmin):
     list_display = ('title', 'employer', 'author', 'is_important', 'is_read', 'created_at')
     list_filter = ('is_important', 'is_read', 'created_at')
     search_fields = ('title', 'content', 'employer__first_name', 'employer__last_name')
+    list_select_related = ('employer', 'author')
     ordering = ('-created_at',)
     
     fieldsets = (
@@ -0,0 +1,12 @@
+"""Columns of the attendance export."""
+
+ATTENDANCE_COLUMNS = (
+    ('Date', 'date'),
+    ('Username', 'user__username'),
+    ('First Name', 'user__first_name'),
+    ('Last Name', 'user__last_name'),
+    ('Status', 'status'),
+    ('Check In', 'check_in_time'),
+    ('Check Out', 'check_out_time'),
+    ('Notes', 'notes'),
+)
@@ -0,0 +1,44 @@
+# Generated by Django 4.2.7 on 2026-10-17 01:25
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('attendance', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='employerattendance',
+            index=models.Index(fields=['-date', '-id'], name='attendance_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='employernote',
+            index=models.Index(fields=['-created_at', '-id'], name='note_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='employernote',
+            index=models.Index(fields=['employer', '-created_at', '-id'], name='note_employer_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='employernote',
+            index=models.Index(fields=['author', '-created_at', '-id'], name='note_author_idx'),
+        ),
+        # The composite indexes above lead with these columns, so drop the
+        # single-column foreign key indexes once they exist
+        migrations.AlterField(
+            model_name='employernote',
+            name='author',
+            field=models.ForeignKey(db_index=False, limit_choices_to={'role': 'author'}, on_delete=django.db.models.deletion.CASCADE, related_name='notes_created', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AlterField(
+            model_name='employernote',
+            name='employer',
+            field=models.ForeignKey(db_index=False, limit_choices_to={'role': 'employer'}, on_delete=django.db.models.deletion.CASCADE, related_name='notes_received', to=settings.AUTH_USER_MODEL),
+        ),
+    ]
@@ -1,8 +1,24 @@
-from django.db import models
+from django.db import models, transaction
 from django.utils import timezone
 from accounts.models import User
 
 
+class EmployerAttendanceQuerySet(models.QuerySet):
+    
+    def with_user(self):
+        return self.select_related('user')
+    
+    def for_month(self, month):
+        """Records in ``month`` (``YYYY-MM``); an empty or malformed value is ignored."""
+        if month:
+            try:
+                year, month = month.split('-')
+                return self.filter(date__year=year, date__month=month)
+            except ValueError:
+                pass
+        return self
+
+
 class EmployerAttendance(models.Model):
     """Employer attendance tracking."""
     
@@ -22,21 +38,45 @@ class EmployerAttendance(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    objects = EmployerAttendanceQuerySet.as_manager()
+    
     def __str__(self):
         return f"{self.user.get_full_name()} - {self.date} ({self.get_status_display()})"
     
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Lets the daily rollups see what a save changed without a query
+        instance._loaded_values = dict(zip(field_names, values))
+        return instance
+    
+    def save(self, *args, **kwargs):
+        # The save signals update the daily rollups in the same transaction
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+    
     class Meta:
         verbose_name = 'Employer Attendance'
         verbose_name_plural = 'Employer Attendances'
         unique_together = ('user', 'date')
         ordering = ['-date']
+        # (user, date) is covered by the unique constraint
+        indexes = [
+            models.Index(fields=['-date', '-id'], name='attendance_date_idx'),
+        ]
+
+
+class EmployerNoteQuerySet(models.QuerySet):
+    
+    def for_listing(self):
+        return self.select_related('employer', 'author')
 
 
 class EmployerNote(models.Model):
     """Private notes from Author to Employer."""
     
-    employer = models.ForeignKey(User, on_delete=models.CASCADE, limit_choices_to={'role': 'employer'}, related_name='notes_received')
-    author = models.ForeignKey(User, on_delete=models.CASCADE, limit_choices_to={'role': 'author'}, related_name='notes_created')
+    employer = models.ForeignKey(User, on_delete=models.CASCADE, limit_choices_to={'role': 'employer'}, related_name='notes_received', db_index=False)
+    author = models.ForeignKey(User, on_delete=models.CASCADE, limit_choices_to={'role': 'author'}, related_name='notes_created', db_index=False)
     title = models.CharField(max_length=200)
     content = models.TextField()
     is_important = models.BooleanField(default=False)
@@ -44,6 +84,8 @@ class EmployerNote(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    objects = EmployerNoteQuerySet.as_manager()
+    
     def __str__(self):
         return f"{self.title} - {self.employer.get_full_name()}"
     
@@ -51,3 +93,8 @@ class EmployerNote(models.Model):
         verbose_name = 'Employer Note'
         verbose_name_plural = 'Employer Notes'
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['-created_at', '-id'], name='note_created_idx'),
+            models.Index(fields=['employer', '-created_at', '-id'], name='note_employer_idx'),
+            models.Index(fields=['author', '-created_at', '-id'], name='note_author_idx'),
+        ]
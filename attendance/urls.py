@@ -5,6 +5,7 @@ app_name = 'attendance'
 
 urlpatterns = [
     path('', views.attendance_list, name='attendance_list'),
+    path('export/', views.attendance_export, name='attendance_export'),
     path('mark/', views.mark_attendance, name='mark_attendance'),
     path('notes/', views.notes_list, name='notes_list'),
     path('notes/create/', views.note_create, name='note_create'),
@@ -1,40 +1,32 @@
 from django.shortcuts import render, redirect, get_object_or_404
-from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from django.core.paginator import Paginator
 from django.utils import timezone
 from django.db.models import Q
 from .models import EmployerAttendance, EmployerNote
 from .forms import AttendanceForm, EmployerNoteForm
+from accounts.decorators import ALL_ROLES, MANAGER_ROLES, role_required
 from accounts.models import User
+from carwash_management.exports import export_response, export_rows
+from carwash_management.pagination import apaginate
+from .exports import ATTENDANCE_COLUMNS
 
 
-@login_required
-def attendance_list(request):
+@role_required(*ALL_ROLES, message='You do not have permission to view attendance.')
+async def attendance_list(request):
     """List attendance records."""
     if request.user.is_employer():
         # Show own attendance
-        attendance_records = EmployerAttendance.objects.filter(user=request.user).order_by('-date')
-    elif request.user.is_author() or request.user.is_superadmin():
-        # Show all attendance records
-        attendance_records = EmployerAttendance.objects.all().order_by('-date')
+        attendance_records = EmployerAttendance.objects.with_user().filter(user=request.user).order_by('-date')
     else:
-        messages.error(request, 'You do not have permission to view attendance.')
-        return redirect('accounts:dashboard')
+        # Show all attendance records
+        attendance_records = EmployerAttendance.objects.with_user().order_by('-date')
     
     # Filter by month if provided
     month_filter = request.GET.get('month')
-    if month_filter:
-        try:
-            year, month = month_filter.split('-')
-            attendance_records = attendance_records.filter(date__year=year, date__month=month)
-        except ValueError:
-            pass
+    attendance_records = attendance_records.for_month(month_filter)
     
     # Pagination
-    paginator = Paginator(attendance_records, 20)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    page_obj = await apaginate(request, attendance_records, 20, ('-date', '-id'))
     
     context = {
         'page_obj': page_obj,
@@ -44,13 +36,26 @@ def attendance_list(request):
     return render(request, 'attendance/attendance_list.html', context)
 
 
-@login_required
+@role_required(*ALL_ROLES, message='You do not have permission to export attendance.')
+def attendance_export(request):
+    """Stream the attendance records shown by the attendance list as CSV or XLSX."""
+    if request.user.is_employer():
+        attendance_records = EmployerAttendance.objects.filter(user=request.user)
+    else:
+        attendance_records = EmployerAttendance.objects.all()
+    
+    month_filter = request.GET.get('month')
+    attendance_records = attendance_records.for_month(month_filter).order_by('-date', '-id')
+    
+    header, rows = export_rows(attendance_records, ATTENDANCE_COLUMNS)
+    return export_response(
+        request, f'attendance-{timezone.localdate():%Y%m%d}', header, rows, 'Attendance'
+    )
+
+
+@role_required('employer', message='Only employers can mark attendance.')
 def mark_attendance(request):
     """Mark attendance (employers only)."""
-    if not request.user.is_employer():
-        messages.error(request, 'Only employers can mark attendance.')
-        return redirect('accounts:dashboard')
-    
     today = timezone.now().date()
     
     # Check if attendance already marked for today
@@ -85,37 +90,28 @@ def mark_attendance(request):
     return render(request, 'attendance/mark_attendance.html', context)
 
 
-@login_required
-def notes_list(request):
+@role_required(*ALL_ROLES, message='You do not have permission to view notes.')
+async def notes_list(request):
     """List employer notes."""
     if request.user.is_employer():
         # Show notes for this employer
-        notes = EmployerNote.objects.filter(employer=request.user).order_by('-created_at')
+        notes = EmployerNote.objects.for_listing().filter(employer=request.user).order_by('-created_at')
     elif request.user.is_author():
         # Show notes created by this author
-        notes = EmployerNote.objects.filter(author=request.user).order_by('-created_at')
-    elif request.user.is_superadmin():
-        # Show all notes
-        notes = EmployerNote.objects.all().order_by('-created_at')
+        notes = EmployerNote.objects.for_listing().filter(author=request.user).order_by('-created_at')
     else:
-        messages.error(request, 'You do not have permission to view notes.')
-        return redirect('accounts:dashboard')
+        # Show all notes
+        notes = EmployerNote.objects.for_listing().order_by('-created_at')
     
     # Pagination
-    paginator = Paginator(notes, 10)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    page_obj = await apaginate(request, notes, 10, ('-created_at', '-id'))
     
     return render(request, 'attendance/notes_list.html', {'page_obj': page_obj})
 
 
-@login_required
+@role_required(*MANAGER_ROLES, message='Only authors can create notes.')
 def note_create(request):
     """Create a new note (authors only)."""
-    if not (request.user.is_author() or request.user.is_superadmin()):
-        messages.error(request, 'Only authors can create notes.')
-        return redirect('accounts:dashboard')
-    
     if request.method == 'POST':
         form = EmployerNoteForm(request.POST)
         if form.is_valid():
@@ -1,5 +1,9 @@
-from django.contrib import admin
-from .models import ServiceType, Customer, Ticket, Event
+from django.contrib import admin, messages
+from django.contrib.admin.utils import flatten_fieldsets
+from accounts.models import User
+from . import workflow
+from .forms import VersionedTicketForm
+from .models import ServiceType, Customer, Vehicle, Ticket, TicketEvent, ArchivedTicketEvent, TicketSequence, Event
 
 
 @admin.register(ServiceType)
@@ -18,11 +22,24 @@ class CustomerAdmin(admin.ModelAdmin):
     ordering = ('name',)
 
 
+@admin.register(Vehicle)
+class VehicleAdmin(admin.ModelAdmin):
+    list_display = ('car_number', 'car_model', 'customer', 'updated_at')
+    list_select_related = ('customer',)
+    search_fields = ('car_number', 'car_model', 'customer__name')
+    raw_id_fields = ('customer',)
+    ordering = ('car_number',)
+
+
 @admin.register(Ticket)
 class TicketAdmin(admin.ModelAdmin):
+    # Refuses to save over a change made since the page was opened
+    form = VersionedTicketForm
+    actions = ['mark_completed', 'mark_paid', 'mark_cancelled', 'unassign']
     list_display = ('ticket_id', 'car_number', 'customer', 'service_type', 'status', 'payment_status', 'total_amount', 'created_at')
     list_filter = ('status', 'payment_status', 'service_type', 'created_at')
     search_fields = ('ticket_id', 'car_number', 'customer__name', 'customer__phone')
+    list_select_related = ('customer', 'service_type')
     readonly_fields = ('ticket_id', 'created_at', 'updated_at')
     ordering = ('-created_at',)
     
@@ -31,7 +48,7 @@ class TicketAdmin(admin.ModelAdmin):
             'fields': ('ticket_id', 'car_number', 'car_model', 'service_type', 'customer')
         }),
         ('Status & Payment', {
-            'fields': ('status', 'payment_status', 'assigned_to')
+            'fields': ('status', 'payment_status', 'assigned_to', 'version')
         }),
         ('Pricing', {
             'fields': ('service_price', 'additional_charges', 'total_amount')
@@ -41,11 +58,87 @@ class TicketAdmin(admin.ModelAdmin):
             'classes': ('collapse',)
         }),
     )
+    
+    def get_form(self, request, obj=None, **kwargs):
+        # version is a form field of its own, not an editable model field
+        fields = flatten_fieldsets(self.get_fieldsets(request, obj))
+        kwargs['fields'] = [name for name in fields if name != 'version']
+        return super().get_form(request, obj, **kwargs)
+    
+    def get_actions(self, request):
+        actions = super().get_actions(request)
+        # Missing without the change permission, like the other actions
+        if 'unassign' not in actions:
+            return actions
+        # One "Assign to" action per active employer
+        for employer in User.objects.filter(role='employer', is_active=True).order_by('username'):
+            name = f'assign_to_{employer.pk}'
+            actions[name] = (self._assign_action(employer), name, f'Assign selected tickets to {employer}')
+        return actions
+    
+    def _assign_action(self, employer):
+        def assign(modeladmin, request, queryset):
+            self._report(request, workflow.bulk_assign(queryset, employer.pk, request.user))
+        return assign
+    
+    def _report(self, request, updated):
+        if updated:
+            self.message_user(request, f'{updated} ticket(s) updated.', messages.SUCCESS)
+        else:
+            self.message_user(request, 'No selected ticket needed that change.', messages.WARNING)
+    
+    # The actions write each batch of tickets with one UPDATE, see carwash.workflow
+    
+    @admin.action(permissions=['change'], description='Mark selected tickets completed')
+    def mark_completed(self, request, queryset):
+        self._report(request, workflow.bulk_transition(queryset, 'status', 'completed', request.user))
+    
+    @admin.action(permissions=['change'], description='Mark selected tickets paid')
+    def mark_paid(self, request, queryset):
+        self._report(request, workflow.bulk_transition(queryset, 'payment_status', 'paid', request.user))
+    
+    @admin.action(permissions=['change'], description='Mark selected tickets cancelled')
+    def mark_cancelled(self, request, queryset):
+        self._report(request, workflow.bulk_transition(queryset, 'status', 'cancelled', request.user))
+    
+    @admin.action(permissions=['change'], description='Unassign selected tickets')
+    def unassign(self, request, queryset):
+        self._report(request, workflow.bulk_assign(queryset, None, request.user))
+
+
+class TicketEventAdmin(admin.ModelAdmin):
+    """The audit log can be read but not edited."""
+    
+    list_display = ('created_at', 'ticket_number', 'action', 'user', 'changes')
+    list_select_related = ('user',)
+    list_filter = ('action', 'created_at')
+    search_fields = ('ticket_number',)
+    
+    def has_add_permission(self, request):
+        return False
+    
+    def has_change_permission(self, request, obj=None):
+        return False
+    
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+
+admin.site.register(TicketEvent, TicketEventAdmin)
+admin.site.register(ArchivedTicketEvent, TicketEventAdmin)
+
+
+@admin.register(TicketSequence)
+class TicketSequenceAdmin(admin.ModelAdmin):
+    list_display = ('date', 'last_value', 'updated_at')
+    readonly_fields = ('updated_at',)
+    ordering = ('-date',)
 
 
 @admin.register(Event)
 class EventAdmin(admin.ModelAdmin):
     list_display = ('title', 'priority', 'is_urgent', 'is_active', 'created_at', 'created_by')
+    list_select_related = ('created_by',)
     list_filter = ('priority', 'is_urgent', 'is_active', 'created_at')
     search_fields = ('title', 'description')
     ordering = ('-created_at',)
@@ -0,0 +1,17 @@
+from django.apps import AppConfig
+from django.db.models.signals import post_migrate
+
+
+def install_search_index(sender, using, **kwargs):
+    from django.db import connections
+    from .search import install_sqlite_fts
+    install_sqlite_fts(connections[using])
+
+
+class CarwashConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'carwash'
+
+    def ready(self):
+        from . import signals  # noqa: F401
+        post_migrate.connect(install_search_index, sender=self)
@@ -0,0 +1,239 @@
+"""
+Ticket audit log.
+
+Who changed a ticket's price, status, payment or assignment, and when, is
+kept as append-only ``TicketEvent`` rows. ``Ticket.save()`` records the
+fields it changed, compared with the values loaded with the ticket (which
+the version check keeps current), so every ticket form, the admin and the
+API updates are covered. Tickets created with ``bulk_create`` (imports and
+API batch creates, see ``carwash.imports``) are recorded by
+:func:`record_created`. ``carwash.workflow`` records its moves and bulk
+actions, which write with ``UPDATE``, and deleting a ticket records its
+last values (see ``carwash.signals``).
+
+Events are written in the transaction that makes the change, so a change
+is never committed without its events and a rolled back change leaves none.
+They are written in batches: the events of a save or a move with one
+insert, those of a bulk action or an import with one insert per batch of
+tickets, and those recorded inside a :func:`batch` block (such as an API
+batch update saving each ticket) with one insert at the end of the block.
+:class:`AuditMiddleware` makes the signed-in user the author of the events
+of a request.
+
+Events older than ``TICKET_EVENTS_ARCHIVE_DAYS`` are moved to
+``ArchivedTicketEvent`` by the ``archive_ticket_events`` command, so the
+table the timelines read only holds recent changes. :func:`timeline` reads
+the archive only for tickets old enough to have events there.
+"""
+
+import datetime
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from django.utils.text import capfirst
+
+from accounts.models import User
+from .models import ArchivedTicketEvent, Customer, Ticket, TicketEvent
+from . import catalog
+
+# Fields whose changes are recorded
+AUDITED_FIELDS = (
+    'car_number', 'car_model', 'customer_id', 'service_type_id', 'status', 'payment_status',
+    'service_price', 'additional_charges', 'total_amount', 'assigned_to_id', 'completed_at',
+)
+
+# Days an event stays in the TicketEvent table
+DEFAULT_ARCHIVE_DAYS = 365
+
+# The request being served
+_request = ContextVar('audit_request', default=None)
+# The events held by the current batch() block
+_batch = ContextVar('audit_batch', default=None)
+
+
+def archive_days():
+    return getattr(settings, 'TICKET_EVENTS_ARCHIVE_DAYS', DEFAULT_ARCHIVE_DAYS)
+
+
+def _user_id(user):
+    if user is None:
+        # The signed-in user of the request being served, if any
+        user = getattr(_request.get(), 'user', None)
+    return user.pk if user is not None and user.is_authenticated else None
+
+
+def new_event(ticket_pk, ticket_number, action, changes, user=None):
+    """An unsaved event, by ``user`` or else the signed-in user."""
+    return TicketEvent(
+        ticket_id=ticket_pk,
+        ticket_number=ticket_number,
+        action=action,
+        changes=changes,
+        user_id=_user_id(user),
+        created_at=timezone.now(),
+    )
+
+
+def diff(old, new):
+    """The changes between two dicts of field values, as stored in ``TicketEvent.changes``."""
+    return {name: [old.get(name), value] for name, value in new.items() if old.get(name) != value}
+
+
+def record(events):
+    """Write ``events`` with one insert, in the transaction of the change they describe."""
+    events = list(events)
+    pending = _batch.get()
+    if pending is not None:
+        pending.extend(events)
+    elif events:
+        TicketEvent.objects.bulk_create(events)
+
+
+@contextmanager
+def batch():
+    """
+    Hold the events recorded in the block and write them with one insert
+    at its end. Use it inside the transaction making the changes, so the
+    events still commit with them; if the block raises, none are written.
+    """
+    if _batch.get() is not None:
+        # The outer block writes them
+        yield
+        return
+    events = []
+    token = _batch.set(events)
+    try:
+        yield
+    finally:
+        _batch.reset(token)
+    if events:
+        TicketEvent.objects.bulk_create(events)
+
+
+def _saved_names(ticket, update_fields=None):
+    # Deferred fields that were never set are not saved
+    names = [name for name in AUDITED_FIELDS if name in ticket.__dict__]
+    if update_fields is not None:
+        saved = {Ticket._meta.get_field(name).attname for name in update_fields}
+        names = [name for name in names if name in saved]
+    return names
+
+
+def stored_values(ticket, update_fields=None):
+    """The audited fields a save of ``ticket`` writes, as they are stored, from the loaded values if possible."""
+    names = _saved_names(ticket, update_fields)
+    loaded = getattr(ticket, '_loaded_values', None) or {}
+    if all(name in loaded for name in names):
+        return {name: loaded[name] for name in names}
+    return Ticket.objects.filter(pk=ticket.pk).values(*names).first() or {}
+
+
+def _created(ticket):
+    """The audited values of a new ticket, and the changes its creation records."""
+    current = {name: getattr(ticket, name) for name in _saved_names(ticket)}
+    return current, {name: [None, value] for name, value in current.items() if value not in (None, '')}
+
+
+def record_save(ticket, previous):
+    """Record what saving ``ticket`` changed, given its ``stored_values`` from before (None for a new ticket)."""
+    if previous is None:
+        current, changes = _created(ticket)
+        action = 'created'
+    else:
+        current = {name: getattr(ticket, name) for name in previous}
+        changes = diff(previous, current)
+        action = 'changed'
+    if changes:
+        record([new_event(ticket.pk, ticket.ticket_id, action, changes)])
+    # A later save of the same copy is compared with these
+    ticket._loaded_values = {**getattr(ticket, '_loaded_values', {}), **current}
+
+
+def record_created(tickets):
+    """Record the creation of ``tickets``, written with ``bulk_create``, with one insert."""
+    record(new_event(ticket.pk, ticket.ticket_id, 'created', _created(ticket)[1]) for ticket in tickets)
+
+
+def record_delete(ticket):
+    values = {name: ticket.__dict__[name] for name in AUDITED_FIELDS if name in ticket.__dict__}
+    changes = {name: [value, None] for name, value in values.items() if value not in (None, '')}
+    record([new_event(ticket.pk, ticket.ticket_id, 'deleted', changes)])
+
+
+def timeline(ticket):
+    """The events of ``ticket``, newest first."""
+    events = list(TicketEvent.objects.filter(ticket_id=ticket.pk).select_related('user'))
+    if ticket.created_at < timezone.now() - datetime.timedelta(days=archive_days()):
+        events += ArchivedTicketEvent.objects.filter(ticket_id=ticket.pk).select_related('user')
+    return events
+
+
+def _person(user):
+    return user.get_full_name() or user.username
+
+
+def describe(events):
+    """Set ``rows`` on each event: (field label, old value, new value) for display."""
+    ids = {'assigned_to_id': set(), 'customer_id': set()}
+    for event in events:
+        for name, values in event.changes.items():
+            if name in ids:
+                ids[name].update(value for value in values if value is not None)
+    # At most one query each, and only for events that changed them
+    users = User.objects.in_bulk(ids['assigned_to_id']) if ids['assigned_to_id'] else {}
+    customers = Customer.objects.in_bulk(ids['customer_id']) if ids['customer_id'] else {}
+
+    def display(name, value):
+        if value is None:
+            return None
+        if name == 'assigned_to_id':
+            return _person(users[value]) if value in users else f'#{value}'
+        if name == 'customer_id':
+            return customers[value].name if value in customers else f'#{value}'
+        if name == 'service_type_id':
+            service = catalog.service_type(value)
+            return service.name if service else f'#{value}'
+        if name == 'completed_at':
+            return parse_datetime(value) if isinstance(value, str) else value
+        field = Ticket._meta.get_field(name)
+        return dict(field.flatchoices).get(value, value) if field.choices else value
+
+    for event in events:
+        event.rows = [
+            (capfirst(Ticket._meta.get_field(name).verbose_name), display(name, old), display(name, new))
+            for name, (old, new) in event.changes.items()
+        ]
+    return events
+
+
+class AuditMiddleware:
+    """Make the signed-in user the author of the ticket events recorded during a request."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        token = _request.set(request)
+        try:
+            return self.get_response(request)
+        finally:
+            _request.reset(token)
+
+    async def __acall__(self, request):
+        token = _request.set(request)
+        try:
+            return await self.get_response(request)
+        finally:
+            _request.reset(token)
@@ -0,0 +1,91 @@
+"""
+Helpers on top of Django's cache for the hot read paths.
+
+Keys are grouped in namespaces. Every namespace has a version number kept
+in the cache and baked into its keys, so ``invalidate(namespace)`` drops all
+of them at once by bumping the version, without knowing the keys. Versions
+are kept forever unless a ``version_timeout`` is given; namespaces created
+per object (e.g. per number plate) should give one longer than the timeout
+of their entries, so their versions do not pile up in the cache. A version
+that has expired just starts the namespace afresh.
+
+``get_or_set`` protects against stampedes: when an entry goes stale only
+one caller recomputes it while the others keep serving the stale value,
+and when it is missing entirely the other callers wait briefly for the
+first one to fill it instead of all hitting the database together.
+"""
+
+import time
+
+from django.core.cache import cache
+
+LOCK_TIMEOUT = 10
+WAIT_INTERVAL = 0.05
+MAX_WAIT = 2.0
+
+
+def _version_key(namespace):
+    return f'ns:{namespace}:version'
+
+
+def _new_version():
+    # Time based, so a version recreated after eviction never reuses an old one
+    return time.time_ns() // 1000
+
+
+def namespace_version(namespace, version_timeout=None):
+    key = _version_key(namespace)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, _new_version(), version_timeout)
+        version = cache.get(key)
+    return version
+
+
+def make_key(namespace, key, version_timeout=None):
+    return f'{namespace}:v{namespace_version(namespace, version_timeout)}:{key}'
+
+
+def invalidate(namespace, version_timeout=None):
+    """Drop every key in ``namespace``."""
+    try:
+        # Keeps the version's expiry
+        cache.incr(_version_key(namespace))
+    except ValueError:
+        cache.set(_version_key(namespace), _new_version(), version_timeout)
+
+
+def _refresh(full_key, lock_key, compute, timeout):
+    try:
+        value = compute()
+        # Keep the entry around for a second period so it can be served
+        # stale while one caller refreshes it
+        cache.set(full_key, (value, time.time() + timeout), timeout * 2)
+        return value
+    finally:
+        cache.delete(lock_key)
+
+
+def get_or_set(namespace, key, compute, timeout, version_timeout=None):
+    """Return the cached value for ``key`` in ``namespace``, computing it with ``compute()`` if needed."""
+    full_key = make_key(namespace, key, version_timeout)
+    lock_key = f'{full_key}:lock'
+
+    entry = cache.get(full_key)
+    if entry is not None:
+        value, fresh_until = entry
+        if fresh_until > time.time() or not cache.add(lock_key, 1, LOCK_TIMEOUT):
+            # Fresh, or somebody else is already refreshing it
+            return value
+        return _refresh(full_key, lock_key, compute, timeout)
+
+    if cache.add(lock_key, 1, LOCK_TIMEOUT):
+        return _refresh(full_key, lock_key, compute, timeout)
+
+    deadline = time.time() + MAX_WAIT
+    while time.time() < deadline:
+        time.sleep(WAIT_INTERVAL)
+        entry = cache.get(full_key)
+        if entry is not None:
+            return entry[0]
+    return compute()
@@ -0,0 +1,119 @@
+"""
+Process-local catalog of service types.
+
+Service types change a few times a year but are read on almost every
+ticket screen, so each process keeps an immutable snapshot of the whole
+table in memory and answers price lookups, the active service list and the
+service type form choices from it without touching the database.
+
+The snapshot is tagged with the version of the ``service-types`` cache
+namespace. Saving or deleting a service type bumps that version (see
+``carwash.signals``), which drops the local snapshot immediately and makes
+other processes reload theirs the next time they compare versions, at most
+``VERSION_CHECK_INTERVAL`` seconds later. With the default local-memory
+cache the version is per process, so deployments with several workers
+should point CACHE_URL at a shared backend.
+"""
+
+import copy
+import threading
+import time
+from types import MappingProxyType
+
+from asgiref.sync import sync_to_async
+
+from . import cache
+from .models import ServiceType
+
+SERVICE_TYPES = 'service-types'
+VERSION_CHECK_INTERVAL = 1.0
+
+
+class Catalog:
+    """An immutable snapshot of the service type table."""
+
+    def __init__(self, version, services):
+        self.version = version
+        self.services = tuple(services)
+        self.active = tuple(service for service in self.services if service.is_active)
+        self.by_id = MappingProxyType({service.pk: service for service in self.services})
+        self.choices = tuple((service.pk, str(service)) for service in self.services)
+
+    def get(self, service_id, active_only=False):
+        try:
+            service = self.by_id.get(int(service_id))
+        except (TypeError, ValueError):
+            return None
+        if service is None or (active_only and not service.is_active):
+            return None
+        return service
+
+
+_lock = threading.Lock()
+_catalog = None
+_checked_at = 0.0
+
+
+def get_catalog():
+    """Return the current snapshot, reloading it if another process changed the table."""
+    global _catalog, _checked_at
+
+    catalog = _catalog
+    now = time.monotonic()
+    if catalog is not None and now - _checked_at < VERSION_CHECK_INTERVAL:
+        return catalog
+
+    version = cache.namespace_version(SERVICE_TYPES)
+    if catalog is not None and catalog.version == version:
+        _checked_at = now
+        return catalog
+
+    with _lock:
+        if _catalog is None or _catalog.version != version:
+            _catalog = Catalog(version, ServiceType.objects.all())
+        _checked_at = now
+        return _catalog
+
+
+async def aget_catalog():
+    """
+    :func:`get_catalog` for async views. A snapshot checked within the last
+    ``VERSION_CHECK_INTERVAL`` seconds is returned directly; otherwise the
+    check (and any reload) runs in a worker thread.
+    """
+    catalog = _catalog
+    if catalog is not None and time.monotonic() - _checked_at < VERSION_CHECK_INTERVAL:
+        return catalog
+    return await sync_to_async(get_catalog)()
+
+
+def active_service_types():
+    """Active service types, ordered by name."""
+    return get_catalog().active
+
+
+def service_type(service_id, active_only=False):
+    """A private copy of the service type ``service_id``, or ``None``."""
+    service = get_catalog().get(service_id, active_only)
+    return copy.copy(service) if service is not None else None
+
+
+def service_price(service_id, active_only=False):
+    """Price of the service type ``service_id``, or ``None`` if there is none."""
+    service = get_catalog().get(service_id, active_only)
+    return service.price if service is not None else None
+
+
+def active_service_price(service_id):
+    return service_price(service_id, active_only=True)
+
+
+def service_type_choices():
+    return get_catalog().choices
+
+
+def invalidate():
+    """Drop the snapshot here and, through the shared version, in every other process."""
+    global _catalog
+    cache.invalidate(SERVICE_TYPES)
+    _catalog = None
@@ -0,0 +1,26 @@
+"""Columns of the ticket and customer exports."""
+
+TICKET_COLUMNS = (
+    ('Ticket ID', 'ticket_id'),
+    ('Created', 'created_at'),
+    ('Car Number', 'car_number'),
+    ('Car Model', 'car_model'),
+    ('Customer', 'customer__name'),
+    ('Phone', 'customer__phone'),
+    ('Service', 'service_type__name'),
+    ('Status', 'status'),
+    ('Payment', 'payment_status'),
+    ('Service Price', 'service_price'),
+    ('Additional Charges', 'additional_charges'),
+    ('Total', 'total_amount'),
+    ('Assigned To', 'assigned_to__username'),
+    ('Completed', 'completed_at'),
+)
+
+CUSTOMER_COLUMNS = (
+    ('Name', 'name'),
+    ('Phone', 'phone'),
+    ('Email', 'email'),
+    ('Address', 'address'),
+    ('Created', 'created_at'),
+)
@@ -1,5 +1,46 @@
+from asgiref.sync import sync_to_async
 from django import forms
+from django.core.exceptions import ValidationError
+from accounts.models import User
 from .models import ServiceType, Customer, Ticket
+from . import catalog, intake, workflow
+
+
+class CatalogChoiceIterator:
+    """Service type choices read from the catalog only when iterated, i.e. when the field renders."""
+    
+    def __init__(self, field):
+        self.field = field
+    
+    def __iter__(self):
+        if self.field.empty_label is not None:
+            yield ('', self.field.empty_label)
+        yield from catalog.service_type_choices()
+    
+    def __len__(self):
+        return len(catalog.service_type_choices()) + (self.field.empty_label is not None)
+    
+    def __bool__(self):
+        return self.field.empty_label is not None or bool(catalog.service_type_choices())
+
+
+class ServiceTypeChoiceField(forms.ModelChoiceField):
+    """Service type choice answered from the in-memory catalog instead of the database."""
+    
+    # Lazy, as Django builds the field when the form class is defined,
+    # which must not query (e.g. before migrate has created the table)
+    def _get_choices(self):
+        return CatalogChoiceIterator(self)
+    
+    choices = property(_get_choices, forms.ChoiceField._set_choices)
+    
+    def to_python(self, value):
+        if value in self.empty_values:
+            return None
+        service = catalog.service_type(value)
+        if service is None:
+            raise ValidationError(self.error_messages['invalid_choice'], code='invalid_choice')
+        return service
 
 
 class CustomerForm(forms.ModelForm):
@@ -28,6 +69,7 @@ class TicketForm(forms.ModelForm):
     class Meta:
         model = Ticket
         fields = ['car_number', 'car_model', 'service_type', 'assigned_to', 'additional_charges']
+        field_classes = {'service_type': ServiceTypeChoiceField}
         widgets = {
             'car_number': forms.TextInput(attrs={'class': 'form-control', 'placeholder': 'Car Number'}),
             'car_model': forms.TextInput(attrs={'class': 'form-control', 'placeholder': 'Car Model'}),
@@ -51,30 +93,19 @@ class TicketForm(forms.ModelForm):
     def save(self, commit=True):
         ticket = super().save(commit=False)
         
-        # Get or create customer
-        customer_name = self.cleaned_data['customer_name']
-        customer_phone = self.cleaned_data['customer_phone']
-        customer_email = self.cleaned_data['customer_email']
-        customer_address = self.cleaned_data['customer_address']
-        
-        customer, created = Customer.objects.get_or_create(
-            name=customer_name,
-            defaults={
-                'phone': customer_phone,
-                'email': customer_email,
-                'address': customer_address,
-            }
-        )
-        
-        # Update customer if not created
-        if not created:
-            customer.phone = customer_phone
-            customer.email = customer_email
-            customer.address = customer_address
-            customer.save()
+        # Find the customer by phone and the car by number, or register them
+        [(customer, vehicle)] = intake.resolve([{
+            'name': self.cleaned_data['customer_name'],
+            'phone': self.cleaned_data['customer_phone'],
+            'email': self.cleaned_data['customer_email'],
+            'address': self.cleaned_data['customer_address'],
+            'car_number': ticket.car_number,
+            'car_model': ticket.car_model,
+        }])
         
         ticket.customer = customer
-        ticket.service_price = ticket.service_type.price
+        ticket.vehicle = vehicle
+        ticket.service_price = catalog.service_price(ticket.service_type_id)
         
         if commit:
             ticket.save()
@@ -82,7 +113,28 @@ class TicketForm(forms.ModelForm):
         return ticket
 
 
-class TicketUpdateForm(forms.ModelForm):
+class VersionedTicketForm(forms.ModelForm):
+    """Base for ticket forms that must not save over changes made since they were shown."""
+    
+    # The version the form was shown with, see carwash.workflow
+    version = forms.IntegerField(widget=forms.HiddenInput, min_value=0)
+    
+    STALE_MESSAGE = 'Someone else has changed this ticket since you opened it. Reload it and try again.'
+    
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fields['version'].initial = self.instance.version
+    
+    def clean_version(self):
+        version = self.cleaned_data['version']
+        if version != self.instance.version:
+            raise ValidationError(self.STALE_MESSAGE)
+        # Saving checks the version again and raises TicketConflict if the
+        # ticket changes between here and the write
+        return version
+
+
+class TicketUpdateForm(VersionedTicketForm):
     """Form for updating ticket status and payment."""
     
     class Meta:
@@ -99,16 +151,72 @@ class TicketUpdateForm(forms.ModelForm):
         super().__init__(*args, **kwargs)
         # Filter assigned_to to only show employers
         self.fields['assigned_to'].queryset = self.fields['assigned_to'].queryset.filter(role='employer')
-    
-    def save(self, commit=True):
-        ticket = super().save(commit=False)
         
-        # Set completion time if status changed to completed
-        if ticket.status == 'completed' and not ticket.completed_at:
-            from django.utils import timezone
-            ticket.completed_at = timezone.now()
-        
-        if commit:
-            ticket.save()
-        
-        return ticket
+        # Offer only the current state and the moves the workflow allows
+        for name in workflow.TRANSITIONS:
+            current = getattr(self.instance, name)
+            allowed = {current, *workflow.allowed_targets(name, current)}
+            self.fields[name].choices = [
+                (value, label) for value, label in self.fields[name].choices if value in allowed
+            ]
+
+
+
+def employer_choices():
+    """The employers tickets can be assigned to, as form choices."""
+    employers = User.objects.filter(role='employer', is_active=True).order_by('username')
+    return [(user.pk, str(user)) for user in employers]
+
+
+aemployer_choices = sync_to_async(employer_choices)
+
+
+class TicketBulkForm(forms.Form):
+    """Bulk action on the tickets picked in the ticket list, or on all tickets matching its filters."""
+    
+    # Action -> (field, target) of the workflow move it makes
+    MOVES = {
+        'complete': ('status', 'completed'),
+        'pay': ('payment_status', 'paid'),
+        'cancel': ('status', 'cancelled'),
+    }
+    
+    action = forms.ChoiceField(
+        choices=[
+            ('complete', 'Mark completed'),
+            ('pay', 'Mark paid'),
+            ('cancel', 'Mark cancelled'),
+            ('assign', 'Assign to'),
+        ],
+        widget=forms.Select(attrs={'class': 'form-select form-select-sm'}),
+    )
+    employer = forms.TypedChoiceField(
+        coerce=int,
+        empty_value=None,
+        required=False,
+        widget=forms.Select(attrs={'class': 'form-select form-select-sm'}),
+    )
+    tickets = forms.Field(required=False, widget=forms.MultipleHiddenInput)
+    # Every ticket matching the filters in query, not just the picked ones
+    matching = forms.BooleanField(required=False)
+    # The ticket list query string, to go back to
+    query = forms.CharField(required=False, widget=forms.HiddenInput)
+    
+    def __init__(self, *args, employers=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Async views load the choices beforehand
+        if employers is None:
+            employers = employer_choices()
+        self.fields['employer'].choices = [('', 'Nobody'), *employers]
+    
+    def clean_tickets(self):
+        try:
+            return [int(pk) for pk in self.cleaned_data['tickets'] or []]
+        except (TypeError, ValueError):
+            raise ValidationError('Invalid ticket selection.')
+    
+    def clean(self):
+        cleaned_data = super().clean()
+        if not cleaned_data.get('tickets') and not cleaned_data.get('matching'):
+            raise ValidationError('Select the tickets to update first.')
+        return cleaned_data
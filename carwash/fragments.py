@@ -0,0 +1,49 @@
+"""
+Versions for cached template fragments.
+
+The dashboards and the ticket list cache their heavy blocks that look the
+same for everyone with the same role (ticket rows, the service type table,
+the service filter options) with Django's ``{% cache %}`` tag::
+
+    {% cache 600 ticket_list_rows user.role tickets_version request.get_full_path %}
+
+The key varies on the viewer's role and on a *data version* from here,
+built from ``carwash.cache`` namespace versions. The save/delete signals in
+``carwash.signals`` invalidate the namespaces, so a changed row gets a new
+key at once and the stale fragment simply expires. Bulk writes that skip
+the signals (imports, the benchmark seeding) must call
+:func:`invalidate_tickets` themselves.
+
+A view reads the version *before* it loads the data the fragment shows, so
+a fragment rendered from rows read just before a change is stored under the
+old version and never served for the new one.
+"""
+
+from asgiref.sync import sync_to_async
+
+from . import cache
+from .catalog import SERVICE_TYPES
+
+# Tickets and the customers shown on them
+TICKETS = 'fragments-tickets'
+
+
+def data_version(*namespaces):
+    """A string that changes whenever one of ``namespaces`` is invalidated."""
+    return '.'.join(str(cache.namespace_version(namespace)) for namespace in namespaces)
+
+
+adata_version = sync_to_async(data_version)
+
+
+def ticket_rows_version():
+    """Version of ticket rows, which show the customer and the service type too."""
+    return data_version(TICKETS, SERVICE_TYPES)
+
+
+async def aticket_rows_version():
+    return await adata_version(TICKETS, SERVICE_TYPES)
+
+
+def invalidate_tickets():
+    cache.invalidate(TICKETS)
@@ -0,0 +1,102 @@
+"""
+Vehicle history: the latest tickets of a car, looked up by number plate.
+
+The plate is normalized like ``Vehicle.car_number`` (see
+``carwash.identity``), so staff can type it any way they like. The tickets
+are read with one query that finds the vehicle through its unique number
+and walks ``ticket_vehicle_idx`` (vehicle, -created_at, -id) newest first,
+so a lookup costs the same with millions of tickets.
+
+Recently looked up plates are cached for ``HISTORY_TIMEOUT`` seconds, each
+in its own ``carwash.cache`` namespace, whose version expires after
+``HISTORY_VERSION_TIMEOUT`` so plates no longer looked up or written leave
+nothing behind in the cache. Saving or deleting one of the car's
+tickets invalidates it (see ``carwash.signals``), so the TTL only bounds
+staleness from changes to the customer and from bulk writes that bypass
+signals.
+"""
+
+from asgiref.sync import sync_to_async
+from django.urls import reverse
+
+from . import cache
+from .identity import normalize_car_number
+from .models import Ticket
+
+HISTORY_LIMIT = 10
+MAX_HISTORY_LIMIT = 50
+HISTORY_TIMEOUT = 300
+# Longer than entries are kept (twice HISTORY_TIMEOUT, to be served stale)
+HISTORY_VERSION_TIMEOUT = HISTORY_TIMEOUT * 4
+
+HISTORY_FIELDS = (
+    'id', 'ticket_id', 'car_model', 'status', 'payment_status', 'total_amount', 'created_at', 'completed_at',
+    'customer__id', 'customer__name', 'customer__phone',
+    'service_type__id', 'service_type__name',
+)
+
+
+def history_namespace(car_number):
+    return f'vehicle-history:{car_number}'
+
+
+def history_tickets(car_number, limit=HISTORY_LIMIT):
+    """The latest ``limit`` tickets of the car with the normalized number ``car_number``."""
+    return (
+        Ticket.objects.filter(vehicle__car_number=car_number)
+        .select_related('customer', 'service_type')
+        .only(*HISTORY_FIELDS)
+        .order_by('-created_at', '-id')[:limit]
+    )
+
+
+def serialize_history(car_number, tickets):
+    latest = tickets[0] if tickets else None
+    return {
+        'car_number': car_number,
+        'car_model': next((ticket.car_model for ticket in tickets if ticket.car_model), ''),
+        # Who brought the car in last
+        'customer': {
+            'id': latest.customer.id,
+            'name': latest.customer.name,
+            'phone': latest.customer.phone,
+        } if latest else None,
+        'tickets': [
+            {
+                'id': ticket.id,
+                'ticket_id': ticket.ticket_id,
+                'service': ticket.service_type.name,
+                'status': ticket.status,
+                'status_display': ticket.get_status_display(),
+                'payment_status': ticket.payment_status,
+                'total_amount': str(ticket.total_amount),
+                'created_at': ticket.created_at.isoformat(),
+                'completed_at': ticket.completed_at.isoformat() if ticket.completed_at else None,
+                'url': reverse('carwash:ticket_preview', args=[ticket.id]),
+            }
+            for ticket in tickets
+        ],
+    }
+
+
+def vehicle_history(car_number, limit=HISTORY_LIMIT):
+    """The history of the car ``car_number`` as typed, or ``None`` if it is not a plate."""
+    number = normalize_car_number(car_number)
+    if not number:
+        return None
+
+    def compute():
+        return serialize_history(number, list(history_tickets(number, limit)))
+
+    return cache.get_or_set(
+        history_namespace(number), str(limit), compute, HISTORY_TIMEOUT, HISTORY_VERSION_TIMEOUT,
+    )
+
+
+avehicle_history = sync_to_async(vehicle_history)
+
+
+def invalidate(car_number):
+    number = normalize_car_number(car_number)
+    if number:
+        cache.invalidate(history_namespace(number), HISTORY_VERSION_TIMEOUT)
@@ -0,0 +1,39 @@
+"""
+Normalized identities of customers and cars.
+
+Customers are recognized by their phone number and cars by their number
+plate, however they were typed: ``+880 1712-345678`` and ``01712345678`` are
+the same phone, ``dhaka-metro ga 12-3456`` and ``DHAKA METRO GA 123456``
+the same car. The normalized values are stored in indexed columns
+(``Customer.phone_normalized``, ``Vehicle.car_number``) and looked up by
+``carwash.intake``.
+"""
+
+import unicodedata
+
+# Numbers written with the country code are stored in their national form
+COUNTRY_CODE = '880'
+NATIONAL_PREFIX = '0'
+
+
+def normalize_phone(phone):
+    """The digits of ``phone`` in national form, or ``''``."""
+    digits = ''.join(str(unicodedata.digit(char)) for char in phone or '' if char.isdigit())
+    if digits.startswith(COUNTRY_CODE + NATIONAL_PREFIX):
+        digits = digits[len(COUNTRY_CODE):]
+    elif digits.startswith(COUNTRY_CODE) and len(digits) > len(COUNTRY_CODE) + 6:
+        digits = NATIONAL_PREFIX + digits[len(COUNTRY_CODE):]
+    return digits
+
+
+def normalize_car_number(car_number):
+    """``car_number`` in upper case without spaces and punctuation, or ``''``."""
+    return ''.join(
+        char for char in (car_number or '').upper()
+        # Letters (with their combining vowel signs) and digits
+        if unicodedata.category(char)[0] in 'LMN'
+    )
+
+
+def same_name(a, b):
+    return ' '.join(a.casefold().split()) == ' '.join(b.casefold().split())
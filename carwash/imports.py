@@ -0,0 +1,276 @@
+"""
+Bulk ticket creation.
+
+``TicketImporter`` turns plain dictionaries (one per ticket, as read from a
+CSV or JSONL export) into tickets a chunk at a time: customers and vehicles
+are resolved with one query each per chunk (see ``carwash.intake``), ticket IDs are reserved in one block per day, and
+the tickets are written with ``bulk_create`` inside one transaction per
+chunk. It does what ``TicketForm.save()`` does for a single ticket without
+the per-row queries.
+
+Recognized keys: ``car_number``, ``customer_name`` and ``service_type``
+(name or id) are required; ``car_model``, ``customer_phone``,
+``customer_email``, ``customer_address``, ``status``, ``payment_status``,
+``service_price`` (defaults to the service type's price),
+``additional_charges``, ``assigned_to`` (employer username),
+``created_at``, ``completed_at`` and ``ticket_id`` are optional.
+"""
+
+import csv
+import datetime
+import json
+from decimal import Decimal, InvalidOperation
+from itertools import islice
+
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from accounts.models import User
+from reports import rollups
+from . import audit, catalog, fragments, history, intake
+from .models import Ticket
+from .search import ticket_search_text
+from .sequences import reserve_ticket_ids
+
+TICKET_ID_LENGTH = Ticket._meta.get_field('ticket_id').max_length
+
+
+class RowError(ValueError):
+    """A row that cannot be turned into a ticket."""
+
+    def __init__(self, line, message):
+        super().__init__(f'line {line}: {message}')
+        self.line = line
+
+
+def read_rows(stream, fmt):
+    """
+    Yield ``(line number, row)`` pairs from a CSV or JSONL stream without
+    loading it whole. A line that is not valid JSON is yielded with a
+    ``RowError`` as its row, which ``TicketImporter.parse_row`` raises.
+    """
+    if fmt == 'csv':
+        reader = csv.DictReader(stream)
+        for row in reader:
+            yield reader.line_num, row
+    elif fmt == 'jsonl':
+        for line_number, line in enumerate(stream, 1):
+            if line.strip():
+                try:
+                    row = json.loads(line)
+                except ValueError as e:
+                    # Not raised here, which would end the iteration: the
+                    # caller may skip the row and read on
+                    row = RowError(line_number, f'invalid JSON ({e})')
+                yield line_number, row
+    else:
+        raise ValueError(f'Unknown format {fmt!r}')
+
+
+def chunked(iterable, size):
+    iterator = iter(iterable)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
+def _text(row, key):
+    value = row.get(key)
+    return '' if value is None else str(value).strip()
+
+
+def _decimal(line, row, key, default=None):
+    value = _text(row, key)
+    if not value:
+        return default
+    try:
+        amount = Decimal(value)
+    except InvalidOperation:
+        raise RowError(line, f'{key} is not a number: {value!r}')
+    if amount < 0:
+        raise RowError(line, f'{key} must not be negative')
+    return amount
+
+
+def _datetime(line, row, key):
+    value = _text(row, key)
+    if not value:
+        return None
+    try:
+        parsed = parse_datetime(value) or datetime.datetime.fromisoformat(value)
+    except ValueError:
+        raise RowError(line, f'{key} is not a date/time: {value!r}')
+    if timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed)
+    return parsed
+
+
+def _choice(line, row, key, choices, default):
+    value = _text(row, key) or default
+    if value not in dict(choices):
+        raise RowError(line, f'{key} must be one of {", ".join(dict(choices))}, not {value!r}')
+    return value
+
+
+class TicketImporter:
+    """Create tickets from rows, one chunk per transaction."""
+
+    def __init__(self):
+        services = catalog.get_catalog().services
+        self.services = {str(service.pk): service for service in services}
+        self.services.update({service.name.lower(): service for service in services})
+        self.employers = {}
+
+    def import_chunk(self, numbered_rows):
+        """Create the tickets for ``numbered_rows`` (``(line, row)`` pairs) and return them."""
+        parsed = [self.parse_row(line, row) for line, row in numbered_rows]
+
+        errors = self.check_rows(parsed)
+        if errors:
+            raise errors[0]
+        # Before the transaction, which would otherwise hold the day's
+        # counter row locked until the whole chunk commits
+        self.assign_ticket_ids(parsed)
+
+        with transaction.atomic():
+            resolved = intake.resolve([self.intake(fields) for fields in parsed])
+            tickets = [
+                self.build_ticket(fields, customer, vehicle)
+                for fields, (customer, vehicle) in zip(parsed, resolved)
+            ]
+            Ticket.objects.bulk_create(tickets)
+
+            # created_at is auto_now_add, which bulk_create always overwrites
+            dated = []
+            for ticket, fields in zip(tickets, parsed):
+                if fields['created_at']:
+                    ticket.created_at = fields['created_at']
+                    dated.append(ticket)
+            if dated:
+                Ticket.objects.bulk_update(dated, ['created_at'])
+
+            # bulk_create skips the signals that keep the daily summaries current
+            # and the cached ticket rows fresh, and Ticket.save(), which
+            # records the audit event
+            rollups.add_tickets(tickets)
+            audit.record_created(tickets)
+            transaction.on_commit(fragments.invalidate_tickets)
+            car_numbers = {ticket.car_number for ticket in tickets}
+            transaction.on_commit(lambda: [history.invalidate(car_number) for car_number in car_numbers])
+        return tickets
+
+    def parse_row(self, line, row):
+        if isinstance(row, RowError):
+            raise row
+        if not isinstance(row, dict):
+            raise RowError(line, f'expected an object, not {type(row).__name__}')
+
+        ticket_id = _text(row, 'ticket_id')
+        if len(ticket_id) > TICKET_ID_LENGTH:
+            raise RowError(line, f'ticket_id must be at most {TICKET_ID_LENGTH} characters')
+        car_number = _text(row, 'car_number')
+        customer_name = _text(row, 'customer_name')
+        if not car_number:
+            raise RowError(line, 'car_number is required')
+        if not customer_name:
+            raise RowError(line, 'customer_name is required')
+
+        service = self.services.get(_text(row, 'service_type').lower())
+        if service is None:
+            raise RowError(line, f'unknown service_type {_text(row, "service_type")!r}')
+
+        status = _choice(line, row, 'status', Ticket.STATUS_CHOICES, 'under_working')
+        created_at = _datetime(line, row, 'created_at')
+        # Left empty when the file has none: a made-up completion time would
+        # count as a wash of no length in the reports
+        completed_at = _datetime(line, row, 'completed_at')
+
+        return {
+            'line': line,
+            'ticket_id': ticket_id,
+            'car_number': car_number[:20],
+            'car_model': _text(row, 'car_model')[:100],
+            'customer_name': customer_name[:100],
+            'customer': {
+                'phone': _text(row, 'customer_phone')[:15],
+                'email': _text(row, 'customer_email'),
+                'address': _text(row, 'customer_address'),
+            },
+            'service_type': service,
+            'status': status,
+            'payment_status': _choice(line, row, 'payment_status', Ticket.PAYMENT_STATUS_CHOICES, 'due'),
+            'service_price': _decimal(line, row, 'service_price', service.price),
+            'additional_charges': _decimal(line, row, 'additional_charges', Decimal('0')),
+            'assigned_to': _text(row, 'assigned_to'),
+            'created_at': created_at,
+            'completed_at': completed_at,
+        }
+
+    def check_rows(self, parsed):
+        """
+        The errors of parsed rows that name an unknown employer or a ticket ID
+        already in use (by a ticket or an earlier row), in row order.
+        """
+        self.resolve_employers(parsed)
+        ticket_ids = {fields['ticket_id'] for fields in parsed if fields['ticket_id']}
+        taken = set(Ticket.objects.filter(ticket_id__in=ticket_ids).values_list('ticket_id', flat=True))
+
+        errors = []
+        for fields in parsed:
+            username, ticket_id = fields['assigned_to'], fields['ticket_id']
+            if username and username not in self.employers:
+                errors.append(RowError(fields['line'], f'unknown employer {username!r}'))
+            elif ticket_id in taken:
+                errors.append(RowError(fields['line'], f'ticket_id {ticket_id!r} is already in use'))
+            elif ticket_id:
+                taken.add(ticket_id)
+        return errors
+
+    def resolve_employers(self, parsed):
+        missing = {fields['assigned_to'] for fields in parsed if fields['assigned_to']} - self.employers.keys()
+        if missing:
+            self.employers.update(
+                User.objects.filter(role='employer', username__in=missing).values_list('username', 'id')
+            )
+
+    def assign_ticket_ids(self, parsed):
+        """Reserve one block of IDs per day for the rows that do not bring their own."""
+        by_day = {}
+        for fields in parsed:
+            if not fields['ticket_id']:
+                created_at = fields['created_at'] or timezone.now()
+                # The same calendar as Ticket.save(), which uses timezone.now().date()
+                day = created_at.astimezone(datetime.timezone.utc).date()
+                by_day.setdefault(day, []).append(fields)
+
+        for day, rows in by_day.items():
+            for fields, ticket_id in zip(rows, reserve_ticket_ids(len(rows), day)):
+                fields['ticket_id'] = ticket_id
+
+    def intake(self, fields):
+        """The customer and car of a parsed row, for ``carwash.intake.resolve``."""
+        return {
+            'name': fields['customer_name'],
+            **fields['customer'],
+            'car_number': fields['car_number'],
+            'car_model': fields['car_model'],
+        }
+
+    def build_ticket(self, fields, customer, vehicle):
+        ticket = Ticket(
+            ticket_id=fields['ticket_id'],
+            car_number=fields['car_number'],
+            car_model=fields['car_model'],
+            service_type=fields['service_type'],
+            customer=customer,
+            vehicle=vehicle,
+            status=fields['status'],
+            payment_status=fields['payment_status'],
+            service_price=fields['service_price'],
+            additional_charges=fields['additional_charges'],
+            completed_at=fields['completed_at'],
+            assigned_to_id=self.employers.get(fields['assigned_to']),
+        )
+        ticket.total_amount = ticket.service_price + ticket.additional_charges
+        ticket.search_text = ticket_search_text(ticket.ticket_id, ticket.car_number, customer.name, customer.phone)
+        return ticket
@@ -0,0 +1,124 @@
+"""
+Customer and vehicle resolution at ticket intake.
+
+``TicketForm`` and ``TicketImporter`` describe each new ticket's customer
+and car as an *intake*: a dict with ``name``, ``phone``, ``email``,
+``address``, ``car_number`` and ``car_model``. :func:`resolve` finds the
+customer and the vehicle for a batch of intakes with two indexed queries:
+
+* a customer is matched by normalized phone number;
+* without a phone match, a known car whose last customer has the same name
+  and no conflicting phone brings that customer back;
+* anybody else is a new customer. Two people with the same name are no
+  longer merged.
+
+Existing customers and vehicles only get the details the intake actually
+provides, and are written only if something changed.
+"""
+
+from django.db import transaction
+from django.utils import timezone
+
+from .identity import normalize_car_number, normalize_phone, same_name
+from .models import Customer, Vehicle
+
+CUSTOMER_DETAILS = ('name', 'phone', 'email', 'address')
+
+
+def _owner(vehicle, name, phone):
+    """The vehicle's last customer, if the intake can be them."""
+    customer = vehicle.customer if vehicle is not None else None
+    if customer is None or not same_name(customer.name, name):
+        return None
+    if phone and customer.phone_normalized and customer.phone_normalized != phone:
+        return None
+    return customer
+
+
+def _update(obj, details, changed):
+    """Copy the non-blank ``details`` onto ``obj``, remembering it in ``changed`` if that changed it."""
+    for key, value in details.items():
+        if value and getattr(obj, key) != value:
+            setattr(obj, key, value)
+            changed[id(obj)] = obj
+
+
+def resolve(intakes):
+    """
+    Find or create the customer and the vehicle of each intake.
+
+    Returns ``(customer, vehicle)`` pairs in the order of ``intakes``; the
+    vehicle is ``None`` for an intake without a car number. Intakes in the
+    same batch with the same phone or car share their customer and vehicle.
+    """
+    phones = [normalize_phone(item['phone']) for item in intakes]
+    numbers = [normalize_car_number(item['car_number']) for item in intakes]
+
+    by_phone = {}
+    if any(phones):
+        customers = Customer.objects.filter(phone_normalized__in={phone for phone in phones if phone})
+        for customer in customers.order_by('id'):
+            by_phone.setdefault(customer.phone_normalized, customer)
+    vehicles = {}
+    if any(numbers):
+        vehicles = Vehicle.objects.select_related('customer').in_bulk(
+            {number for number in numbers if number}, field_name='car_number'
+        )
+
+    new_customers, changed_customers = {}, {}
+    new_vehicles, changed_vehicles = {}, {}
+    resolved = []
+    for item, phone, number in zip(intakes, phones, numbers):
+        vehicle = vehicles.get(number)
+        customer = by_phone.get(phone) if phone else None
+        if customer is None:
+            customer = _owner(vehicle, item['name'], phone)
+        if customer is None:
+            customer = Customer()
+            new_customers[id(customer)] = customer
+        details = {key: item[key] for key in CUSTOMER_DETAILS}
+        if phone and customer.phone_normalized == phone:
+            # The same number, however it was typed this time
+            del details['phone']
+        _update(customer, details, changed_customers)
+        if phone:
+            by_phone[phone] = customer
+
+        if number:
+            if vehicle is None:
+                vehicle = vehicles[number] = new_vehicles[number] = Vehicle(car_number=number)
+            _update(vehicle, {'car_model': item['car_model'], 'customer': customer}, changed_vehicles)
+        resolved.append((customer, vehicle))
+
+    with transaction.atomic():
+        _save_customers(
+            new_customers.values(),
+            [customer for key, customer in changed_customers.items() if key not in new_customers],
+        )
+        _save_vehicles(new_vehicles, [vehicle for vehicle in changed_vehicles.values() if vehicle.pk is not None])
+    return resolved
+
+
+def _save_customers(new, changed):
+    if new:
+        for customer in new:
+            customer.normalize()
+        Customer.objects.bulk_create(new)
+    for customer in changed:
+        # Rare enough that save() (which also reindexes their tickets) is fine
+        customer.save(update_fields=[*CUSTOMER_DETAILS, 'search_text', 'phone_normalized', 'updated_at'])
+
+
+def _save_vehicles(new, changed):
+    if new:
+        # Another intake may have registered the same car meanwhile
+        Vehicle.objects.bulk_create(new.values(), ignore_conflicts=True)
+        saved = dict(Vehicle.objects.filter(car_number__in=list(new)).values_list('car_number', 'id'))
+        for number, vehicle in new.items():
+            vehicle.pk = saved[number]
+            vehicle._state.adding = False
+    if changed:
+        now = timezone.now()
+        for vehicle in changed:
+            vehicle.updated_at = now
+        Vehicle.objects.bulk_update(changed, ['car_model', 'customer', 'updated_at'])
@@ -0,0 +1,268 @@
+"""
+Live ticket queue.
+
+Ticket creations and status changes are published as small JSON events
+once their transaction commits (see ``carwash.signals``) and pushed to
+open queue screens over Server-Sent Events.
+
+The stream is a plain ASGI application (``queue_events``) that
+``carwash_management.asgi`` routes to before Django, so an idle screen
+costs one coroutine rather than a thread. Events reach the screens
+through a broker chosen by ``LIVE_QUEUE_URL``::
+
+    memory://            fan out inside this process (development, one worker)
+    redis://host:port/db Redis pub/sub, so every worker sees every event
+"""
+
+import asyncio
+import io
+import json
+import logging
+import threading
+from importlib import import_module
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.core.handlers.asgi import ASGIRequest
+from django.db import close_old_connections
+from django.utils import timezone
+
+from accounts.decorators import MANAGER_ROLES, has_role
+from accounts.principal import get_user
+
+logger = logging.getLogger(__name__)
+
+# Events a slow screen may fall behind by before it is told to reload
+SUBSCRIBER_QUEUE_SIZE = 100
+# Comment lines keep proxies from closing idle streams
+HEARTBEAT_INTERVAL = 15
+# Milliseconds the browser waits before reconnecting
+RECONNECT_DELAY = 3000
+REDIS_CHANNEL = 'carwash:live-queue'
+
+# Queued in place of the events a subscriber missed
+RESYNC = {'event': 'resync'}
+
+
+def ticket_event(ticket, previous_status, event=None):
+    """
+    The event for a ticket that was just created (``previous_status`` is
+    ``None``) or changed status, or another ``event`` such as ``payment``.
+    """
+    created_at = timezone.localtime(ticket.created_at)
+    return {
+        'event': event or ('created' if previous_status is None else 'status'),
+        'id': ticket.pk,
+        'ticket_id': ticket.ticket_id,
+        'car_number': ticket.car_number,
+        'customer': ticket.customer.name,
+        'service': ticket.service_type.name,
+        'status': ticket.status,
+        'previous_status': previous_status,
+        'status_display': ticket.get_status_display(),
+        'payment_status': ticket.payment_status,
+        'version': ticket.version,
+        'total_amount': str(ticket.total_amount),
+        'created_at': created_at.isoformat(),
+        'created_time': created_at.strftime('%H:%M'),
+    }
+
+
+class Subscription:
+    """Events waiting for one open stream, on the event loop that serves it."""
+
+    def __init__(self, loop):
+        self.loop = loop
+        self.queue = asyncio.Queue(SUBSCRIBER_QUEUE_SIZE)
+
+    def push(self, event):
+        """Queue ``event``; safe to call from any thread."""
+        try:
+            self.loop.call_soon_threadsafe(self._put, event)
+        except RuntimeError:
+            # The loop has shut down; the stream is gone
+            pass
+
+    def _put(self, event):
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            # Rather than buffering without limit, drop what is queued and
+            # have the screen reload its state
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(RESYNC)
+
+    async def get(self, timeout):
+        return await asyncio.wait_for(self.queue.get(), timeout)
+
+
+class LocalBroker:
+    """Fans events out to the streams open in this process."""
+
+    def __init__(self):
+        self._subscriptions = set()
+        self._lock = threading.Lock()
+
+    def subscribe(self):
+        """Start receiving events; call from the event loop that will read them."""
+        subscription = Subscription(asyncio.get_running_loop())
+        with self._lock:
+            self._subscriptions.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscriptions.discard(subscription)
+
+    def publish(self, event):
+        self.deliver(event)
+
+    def deliver(self, event):
+        with self._lock:
+            subscriptions = list(self._subscriptions)
+        for subscription in subscriptions:
+            subscription.push(event)
+
+
+class RedisBroker(LocalBroker):
+    """
+    Publishes through a Redis channel. Each worker process starts listening
+    on the channel when its first stream opens and fans the events out
+    locally.
+    """
+
+    def __init__(self, url, channel=REDIS_CHANNEL):
+        super().__init__()
+        import redis
+        self.url = url
+        self.channel = channel
+        self._client = redis.Redis.from_url(url)
+        self._listener = None
+
+    def subscribe(self):
+        subscription = super().subscribe()
+        if self._listener is None or self._listener.done():
+            self._listener = subscription.loop.create_task(self._listen())
+        return subscription
+
+    def publish(self, event):
+        try:
+            self._client.publish(self.channel, json.dumps(event))
+        except Exception:
+            # Screens catch up when they reconnect; never fail the request
+            logger.exception('Could not publish a live queue event')
+
+    async def _listen(self):
+        import redis.asyncio
+        client = redis.asyncio.Redis.from_url(self.url)
+        while True:
+            try:
+                async with client.pubsub() as pubsub:
+                    await pubsub.subscribe(self.channel)
+                    async for message in pubsub.listen():
+                        if message['type'] == 'message':
+                            self.deliver(json.loads(message['data']))
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception('Live queue listener lost its Redis connection, retrying')
+                # Events published in the meantime are lost, so have the
+                # screens reload once the connection is back
+                await asyncio.sleep(1)
+                self.deliver(RESYNC)
+
+
+_broker = None
+_broker_lock = threading.Lock()
+
+
+def get_broker():
+    global _broker
+    with _broker_lock:
+        if _broker is None:
+            url = getattr(settings, 'LIVE_QUEUE_URL', 'memory://')
+            scheme = url.split(':', 1)[0].lower()
+            if scheme == 'memory':
+                _broker = LocalBroker()
+            elif scheme in ('redis', 'rediss'):
+                _broker = RedisBroker(url)
+            else:
+                raise ImproperlyConfigured(f"Unsupported LIVE_QUEUE_URL scheme '{scheme}'")
+        return _broker
+
+
+def publish(event):
+    get_broker().publish(event)
+
+
+def _format(event):
+    return f'event: {event["event"]}\ndata: {json.dumps(event)}\n\n'.encode()
+
+
+@sync_to_async
+def _scope_user(scope):
+    """The user logged in with the session cookie sent with ``scope``."""
+    request = ASGIRequest(scope, io.BytesIO())
+    try:
+        engine = import_module(settings.SESSION_ENGINE)
+        request.session = engine.SessionStore(request.COOKIES.get(settings.SESSION_COOKIE_NAME))
+        return get_user(request)
+    finally:
+        close_old_connections()
+
+
+async def _forbidden(send):
+    await send({'type': 'http.response.start', 'status': 403, 'headers': [(b'content-type', b'text/plain')]})
+    await send({'type': 'http.response.body', 'body': b'Forbidden'})
+
+
+async def _wait_for_disconnect(receive):
+    while (await receive())['type'] != 'http.disconnect':
+        pass
+
+
+async def queue_events(scope, receive, send):
+    """ASGI application streaming the live queue events to one screen."""
+    user = await _scope_user(scope)
+    if not has_role(user, *MANAGER_ROLES):
+        await _forbidden(send)
+        return
+
+    broker = get_broker()
+    subscription = broker.subscribe()
+
+    async def stream():
+        await send({
+            'type': 'http.response.start',
+            'status': 200,
+            'headers': [
+                (b'content-type', b'text/event-stream'),
+                (b'cache-control', b'no-cache'),
+                # Stops nginx from buffering the stream
+                (b'x-accel-buffering', b'no'),
+            ],
+        })
+        await send({'type': 'http.response.body', 'body': f'retry: {RECONNECT_DELAY}\n\n'.encode(), 'more_body': True})
+        while True:
+            try:
+                event = await subscription.get(HEARTBEAT_INTERVAL)
+            except asyncio.TimeoutError:
+                await send({'type': 'http.response.body', 'body': b': keep-alive\n\n', 'more_body': True})
+                continue
+            await send({'type': 'http.response.body', 'body': _format(event), 'more_body': True})
+            if event['event'] == RESYNC['event']:
+                break
+        await send({'type': 'http.response.body', 'body': b''})
+
+    streaming = asyncio.ensure_future(stream())
+    disconnect = asyncio.ensure_future(_wait_for_disconnect(receive))
+    try:
+        await asyncio.wait({streaming, disconnect}, return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        broker.unsubscribe(subscription)
+        for task in (streaming, disconnect):
+            task.cancel()
+    if streaming.done() and not streaming.cancelled():
+        streaming.result()  # Re-raise anything that broke the stream
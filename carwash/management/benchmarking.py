@@ -0,0 +1,244 @@
+"""Synthetic data and timing helpers shared by the benchmark commands."""
+
+import datetime
+import random
+import time
+import uuid
+from decimal import Decimal
+
+from django.core.management.base import CommandError
+from django.db import transaction
+from django.db.models import Max, Min
+from django.utils import timezone
+
+from accounts.models import User
+from attendance.models import EmployerAttendance, EmployerNote
+from carwash import fragments
+from carwash.identity import normalize_car_number
+from carwash.models import Customer, ServiceType, Ticket, TicketEvent, Vehicle
+from carwash.search import ticket_search_text
+from reports.rollups import rebuild_attendance_days, rebuild_ticket_days
+from requests.models import EmployerRequest
+
+# Private cache for benchmarks, so clearing it between runs never touches
+# the shared application cache
+ISOLATED_CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'benchmark',
+    }
+}
+
+
+def new_tag():
+    """Short unique prefix that marks every seeded row of one benchmark run."""
+    return f'B{uuid.uuid4().hex[:6]}'
+
+
+def seed_tickets(tag, tickets, customers, batch_size=5000, seed=42, stdout=None, days=None):
+    """
+    Bulk insert ``customers`` customers and ``tickets`` tickets tagged with ``tag``.
+
+    Every customer brings one car to all of their tickets, so each vehicle
+    has about ``tickets / customers`` tickets of history.
+
+    With ``days``, the tickets are spread evenly over that many days before
+    today instead of all being created now, and most of them are completed
+    and paid (see ``spread_over_days``).
+
+    Returns a small sample of car number and phone fragments that exist in
+    the seeded data, for use as search terms.
+    """
+    services = list(ServiceType.objects.filter(is_active=True))
+    if not services:
+        raise CommandError('No active service type found. Run setup_initial_data first.')
+
+    rng = random.Random(seed)
+    started = time.perf_counter()
+    if stdout:
+        stdout.write(f'Seeding {customers} customers and {tickets} tickets...')
+
+    rows = []
+    car_numbers = {}
+    for n in range(customers):
+        name = f'{tag} Customer {n}'
+        phone = f'01{rng.randrange(10 ** 9):09d}'
+        customer = Customer(name=name, phone=phone)
+        customer.normalize()
+        rows.append(customer)
+        car_number = f'DHA-{rng.choice("ABCDEFGH")}{rng.choice("ABCDEFGH")} {rng.randrange(10 ** 6):06d}'
+        car_numbers.setdefault(normalize_car_number(car_number), car_number)
+    with transaction.atomic():
+        seeded_customers = Customer.objects.bulk_create(rows, batch_size=batch_size)
+        # A plate that is already registered keeps its vehicle
+        Vehicle.objects.bulk_create(
+            [Vehicle(car_number=number, customer=customer) for number, customer in zip(car_numbers, seeded_customers)],
+            batch_size=batch_size,
+            ignore_conflicts=True,
+        )
+    numbers = list(car_numbers)
+    vehicle_ids = {}
+    for start in range(0, len(numbers), batch_size):
+        vehicle_ids.update(Vehicle.objects.filter(
+            car_number__in=numbers[start:start + batch_size]).values_list('car_number', 'id'))
+    cars = [(car_numbers[number], vehicle_ids[number]) for number in numbers]
+
+    samples = [f'{tag} Customer 1']
+    for start in range(0, tickets, batch_size):
+        batch = []
+        for n in range(start, min(start + batch_size, tickets)):
+            customer = seeded_customers[n % len(seeded_customers)]
+            car_number, vehicle_id = cars[n % len(cars)]
+            service = services[n % len(services)]
+            ticket_id = f'{tag}{n:07d}'
+            batch.append(Ticket(
+                ticket_id=ticket_id,
+                car_number=car_number,
+                vehicle_id=vehicle_id,
+                service_type=service,
+                customer=customer,
+                service_price=service.price,
+                additional_charges=Decimal('0'),
+                total_amount=service.price,
+                search_text=ticket_search_text(ticket_id, car_number, customer.name, customer.phone),
+            ))
+            if rng.random() < 0.001:
+                samples.append(car_number[-6:])
+                samples.append(customer.phone[-7:])
+        with transaction.atomic():
+            Ticket.objects.bulk_create(batch)
+
+    if days:
+        spread_over_days(tag, tickets, days)
+    # bulk_create and update() bypass the signals that maintain the rollups
+    # and the cached ticket rows
+    rebuild_seeded_days(tag)
+    fragments.invalidate_tickets()
+
+    if stdout:
+        stdout.write(f'Seeded in {time.perf_counter() - started:.1f}s')
+    return samples
+
+
+def spread_over_days(tag, tickets, days):
+    """
+    Backdate the seeded tickets so each of the last ``days`` days gets an
+    equal share. On every day 80% of the tickets are completed 20 to 50
+    minutes after they were created and three quarters of those are paid.
+    """
+    per_day = -(-tickets // days)
+    today = timezone.localdate()
+    zone = timezone.get_current_timezone()
+
+    for offset in range(days):
+        first = offset * per_day
+        if first >= tickets:
+            break
+        opened = datetime.datetime.combine(today - datetime.timedelta(days=offset), datetime.time(9), zone)
+        completed = first + per_day * 8 // 10
+        paid = first + per_day * 6 // 10
+
+        def block(start, end):
+            return Ticket.objects.filter(ticket_id__gte=f'{tag}{start:07d}', ticket_id__lt=f'{tag}{end:07d}')
+
+        with transaction.atomic():
+            block(first, first + per_day).update(created_at=opened)
+            block(first, completed).update(
+                status='completed',
+                completed_at=opened + datetime.timedelta(minutes=20 + offset % 31),
+            )
+            block(first, paid).update(payment_status='paid')
+
+
+def seed_staff(tag, employers, days, items, batch_size=5000, seed=42):
+    """
+    Create an author and ``employers`` employers tagged with ``tag``. Every
+    employer gets attendance for each of the last ``days`` days and
+    ``items`` each of requests, instructions and notes.
+
+    Returns the author and the list of employers.
+    """
+    rng = random.Random(seed)
+    today = timezone.localdate()
+
+    with transaction.atomic():
+        author = User.objects.create(username=f'{tag}-author', role='author', password='!')
+        staff = User.objects.bulk_create([
+            User(username=f'{tag}-employer-{n}', role='employer', password='!') for n in range(employers)
+        ])
+
+        statuses = [status for status, _ in EmployerAttendance.STATUS_CHOICES]
+        EmployerAttendance.objects.bulk_create([
+            EmployerAttendance(user=employer, date=today - datetime.timedelta(days=offset), status=rng.choice(statuses))
+            for employer in staff
+            for offset in range(days)
+        ], batch_size=batch_size)
+
+        EmployerRequest.objects.bulk_create([
+            EmployerRequest(
+                user=employer,
+                title=f'{tag} {kind} {n}',
+                content='Seeded',
+                request_type=kind,
+                is_instruction=kind == 'instruction',
+                is_active=rng.random() < 0.9,
+            )
+            for employer in staff
+            for kind in ('request', 'instruction')
+            for n in range(items)
+        ], batch_size=batch_size)
+
+        EmployerNote.objects.bulk_create([
+            EmployerNote(employer=employer, author=author, title=f'{tag} note {n}', content='Seeded')
+            for employer in staff
+            for n in range(items)
+        ], batch_size=batch_size)
+
+    if days:
+        rebuild_attendance_days(today - datetime.timedelta(days=days - 1), today)
+    return author, staff
+
+
+def _seeded_days(tickets):
+    bounds = tickets.aggregate(first=Min('created_at'), last=Max('created_at'))
+    if bounds['first'] is None:
+        return None
+    return timezone.localdate(bounds['first']), timezone.localdate(bounds['last'])
+
+
+def rebuild_seeded_days(tag):
+    days = _seeded_days(Ticket.objects.filter(ticket_id__startswith=tag))
+    if days:
+        rebuild_ticket_days(*days)
+
+
+def remove_seeded(tag):
+    tickets = Ticket.objects.filter(ticket_id__startswith=tag)
+    days = _seeded_days(tickets)
+    # A plain DELETE instead of one rollup update per ticket through the
+    # delete signals; the affected days are rebuilt afterwards
+    tickets._raw_delete(tickets.db)
+    # Whatever the benchmark changed went to the audit log too
+    events = TicketEvent.objects.filter(ticket_number__startswith=tag)
+    events._raw_delete(events.db)
+    Vehicle.objects.filter(customer__name__startswith=tag).delete()
+    Customer.objects.filter(name__startswith=tag).delete()
+    if days:
+        rebuild_ticket_days(*days)
+    fragments.invalidate_tickets()
+
+    users = list(User.objects.filter(username__startswith=f'{tag}-').values_list('id', flat=True))
+    if users:
+        attendance = EmployerAttendance.objects.filter(user_id__in=users)
+        dates = attendance.aggregate(first=Min('date'), last=Max('date'))
+        attendance._raw_delete(attendance.db)
+        # Cascades to the seeded requests and notes
+        User.objects.filter(id__in=users).delete()
+        if dates['first']:
+            rebuild_attendance_days(dates['first'], dates['last'])
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
@@ -0,0 +1,237 @@
+import http.client
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+import urllib.parse
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client
+from django.urls import reverse
+
+from accounts.models import User
+from carwash.management.benchmarking import new_tag, percentile, remove_seeded, seed_staff, seed_tickets
+from carwash.models import ServiceType
+
+# Server name -> command line, given the bind host, port and worker count
+SERVERS = {
+    # The async views on the event loop
+    'uvicorn': lambda host, port, workers: [
+        sys.executable, '-m', 'uvicorn', 'carwash_management.asgi:application',
+        '--host', host, '--port', str(port), '--workers', str(workers),
+        '--no-access-log', '--log-level', 'warning',
+    ],
+    # The previous deployment: one request per sync worker process
+    'gunicorn': lambda host, port, workers: [
+        sys.executable, '-m', 'gunicorn', 'carwash_management.wsgi:application',
+        '--bind', f'{host}:{port}', '--workers', str(workers), '--worker-class', 'sync',
+        '--log-level', 'warning',
+    ],
+    # The production deployment (see deploy.sh)
+    'gunicorn-uvicorn': lambda host, port, workers: [
+        sys.executable, '-m', 'gunicorn', 'carwash_management.asgi:application',
+        '--bind', f'{host}:{port}', '--workers', str(workers), '--worker-class', 'uvicorn.workers.UvicornWorker',
+        '--log-level', 'warning',
+    ],
+}
+
+STARTUP_TIMEOUT = 30
+
+
+def endpoints(service):
+    """``(label, role, path)`` for every endpoint that has an async view."""
+    return [
+        ('get_service_price', 'author', reverse('carwash:get_service_price') + f'?service_id={service.pk}'),
+        ('dashboard (author)', 'author', reverse('accounts:dashboard')),
+        ('dashboard (employer)', 'employer', reverse('accounts:dashboard')),
+        ('dashboard (superadmin)', 'superadmin', reverse('accounts:dashboard')),
+        ('ticket_list', 'author', reverse('carwash:ticket_list')),
+        ('ticket_list status=completed', 'author', reverse('carwash:ticket_list') + '?status=completed'),
+        ('customer_list', 'author', reverse('carwash:customer_list')),
+        ('request_list', 'employer', reverse('requests:request_list')),
+        ('instruction_list', 'author', reverse('requests:instruction_list')),
+        ('attendance_list', 'author', reverse('attendance:attendance_list')),
+        ('notes_list', 'author', reverse('attendance:notes_list')),
+    ]
+
+
+def free_port(host):
+    with socket.socket() as sock:
+        sock.bind((host, 0))
+        return sock.getsockname()[1]
+
+
+def wait_until_listening(process, host, port):
+    deadline = time.monotonic() + STARTUP_TIMEOUT
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise CommandError(f'The server exited with status {process.returncode} before it was ready')
+        try:
+            socket.create_connection((host, port), timeout=0.5).close()
+            return
+        except OSError:
+            time.sleep(0.2)
+    raise CommandError(f'The server was not listening on {host}:{port} after {STARTUP_TIMEOUT}s')
+
+
+def load(base_url, path, cookie, concurrency, duration):
+    """
+    Request ``path`` from ``concurrency`` keep-alive connections for
+    ``duration`` seconds. Returns the latencies of the successful requests
+    in milliseconds and the number of failed ones.
+    """
+    url = urllib.parse.urlsplit(base_url)
+    path = url.path.rstrip('/') + path
+    headers = {'Cookie': cookie, 'Host': url.netloc}
+    latencies = [[] for _ in range(concurrency)]
+    errors = [0] * concurrency
+    deadline = time.perf_counter() + duration
+
+    def client(index):
+        connection = http.client.HTTPConnection(url.hostname, url.port, timeout=30)
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            try:
+                connection.request('GET', path, headers=headers)
+                response = connection.getresponse()
+                response.read()
+            except (OSError, http.client.HTTPException):
+                # Sync workers close the connection after each response
+                connection.close()
+                connection = http.client.HTTPConnection(url.hostname, url.port, timeout=30)
+                errors[index] += 1
+                continue
+            if response.status == 200:
+                latencies[index].append((time.perf_counter() - started) * 1000)
+            else:
+                errors[index] += 1
+        connection.close()
+
+    threads = [threading.Thread(target=client, args=(n,)) for n in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return [latency for samples in latencies for latency in samples], sum(errors)
+
+
+class Command(BaseCommand):
+    help = (
+        'Start the app under uvicorn and under gunicorn sync workers and compare requests per second '
+        'on the dashboard, list and service price endpoints'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--servers', default='uvicorn,gunicorn',
+                            help=f'Comma separated servers to start: {", ".join(SERVERS)}')
+        parser.add_argument('--target', action='append', default=[], metavar='NAME=URL',
+                            help='Also load an already running server, e.g. an older checkout (repeatable)')
+        parser.add_argument('--workers', type=int, default=4, help='Worker processes per server')
+        parser.add_argument('--concurrency', type=int, default=32, help='Simultaneous connections')
+        parser.add_argument('--duration', type=float, default=10, help='Seconds of load per endpoint')
+        parser.add_argument('--warmup', type=float, default=1, help='Seconds of unmeasured load per endpoint')
+        parser.add_argument('--tickets', type=int, default=100_000, help='Tickets to seed')
+        parser.add_argument('--employers', type=int, default=20, help='Employers to seed')
+        parser.add_argument('--keep', action='store_true', help='Keep the seeded rows')
+
+    def handle(self, *args, **options):
+        servers = [name.strip() for name in options['servers'].split(',') if name.strip()]
+        unknown = set(servers) - set(SERVERS)
+        if unknown:
+            raise CommandError(f'Unknown server: {", ".join(sorted(unknown))}')
+        targets = []
+        for target in options['target']:
+            name, sep, url = target.partition('=')
+            if not sep or not url.startswith('http://'):
+                raise CommandError(f'--target must look like NAME=http://host:port, not {target!r}')
+            targets.append((name, url))
+
+        service = ServiceType.objects.filter(is_active=True).first()
+        superadmin = User.objects.filter(role='superadmin').first()
+        if service is None or superadmin is None:
+            raise CommandError('No service type or superadmin found. Run setup_initial_data first.')
+
+        tag = new_tag()
+        try:
+            seed_tickets(tag, options['tickets'], max(1, options['tickets'] // 20),
+                         stdout=self.stdout, days=30)
+            author, employers = seed_staff(tag, options['employers'], 30, 50)
+            cookies = {
+                'author': self.session_cookie(author),
+                'employer': self.session_cookie(employers[0]),
+                'superadmin': self.session_cookie(superadmin),
+            }
+
+            results = {}
+            for name in servers:
+                results[name] = self.run_server(name, cookies, service, options)
+            for name, url in targets:
+                self.stdout.write(self.style.MIGRATE_HEADING(f'{name} ({url})'))
+                results[name] = self.run_endpoints(url, cookies, service, options)
+        finally:
+            if not options['keep']:
+                self.stdout.write('Removing seeded rows...')
+                remove_seeded(tag)
+
+        self.summarize(results)
+
+    def session_cookie(self, user):
+        client = Client()
+        client.force_login(user)
+        session = client.cookies[settings.SESSION_COOKIE_NAME]
+        return f'{session.key}={session.value}'
+
+    def run_server(self, name, cookies, service, options):
+        host = '127.0.0.1'
+        port = free_port(host)
+        env = dict(os.environ, DJANGO_SETTINGS_MODULE=settings.SETTINGS_MODULE)
+        command = SERVERS[name](host, port, options['workers'])
+        self.stdout.write(self.style.MIGRATE_HEADING(f'{name}: {" ".join(command[1:])}'))
+        try:
+            process = subprocess.Popen(command, env=env, cwd=settings.BASE_DIR)
+        except OSError as exc:
+            raise CommandError(f'Could not start {name}: {exc}')
+        try:
+            wait_until_listening(process, host, port)
+            return self.run_endpoints(f'http://{host}:{port}', cookies, service, options)
+        finally:
+            process.terminate()
+            try:
+                process.wait(10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+
+    def run_endpoints(self, base_url, cookies, service, options):
+        results = {}
+        self.stdout.write(f'  {"endpoint":<30} {"req/s":>9} {"p50 ms":>9} {"p99 ms":>9} {"errors":>7}')
+        for label, role, path in endpoints(service):
+            if options['warmup']:
+                load(base_url, path, cookies[role], options['concurrency'], options['warmup'])
+            latencies, errors = load(base_url, path, cookies[role], options['concurrency'], options['duration'])
+            rate = len(latencies) / options['duration']
+            results[label] = rate
+            line = (
+                f'  {label:<30} {rate:9.1f} '
+                f'{percentile(latencies, 50) if latencies else 0:9.2f} '
+                f'{percentile(latencies, 99) if latencies else 0:9.2f} {errors:7d}'
+            )
+            self.stdout.write(self.style.ERROR(line) if errors else line)
+        return results
+
+    def summarize(self, results):
+        if len(results) < 2:
+            return
+        names = list(results)
+        baseline = names[-1] if 'gunicorn' not in results else 'gunicorn'
+        others = [name for name in names if name != baseline]
+        self.stdout.write(self.style.MIGRATE_HEADING(f'Requests per second relative to {baseline}'))
+        self.stdout.write(f'  {"endpoint":<30} ' + ' '.join(f'{name:>18}' for name in others))
+        for label, rate in results[baseline].items():
+            ratios = [
+                f'{results[name][label] / rate:17.2f}x' if rate else f'{"-":>18}'
+                for name in others
+            ]
+            self.stdout.write(f'  {label:<30} ' + ' '.join(ratios))
@@ -0,0 +1,88 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection, reset_queries
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.utils import timezone
+
+from carwash import workflow
+from carwash.management.benchmarking import ISOLATED_CACHES, new_tag, remove_seeded, seed_staff, seed_tickets
+from carwash.models import Ticket
+from reports import rollups
+from reports.models import DailyTicketSummary
+
+# Compared between the summaries and the tickets; wash_seconds is left out
+# because rounding per ticket and per group may differ by a second or so
+CHECKED_MEASURES = tuple(name for name in rollups.TICKET_MEASURES if name != 'wash_seconds')
+
+
+class Command(BaseCommand):
+    help = (
+        'Seed tickets and time marking them completed, paid and assigned with the bulk actions, against '
+        'saving a sample of them one by one as ticket_update does'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tickets', type=int, default=10000, help='Tickets to seed and update')
+        parser.add_argument('--one-by-one', type=int, default=200, help='Tickets saved one by one for comparison')
+        parser.add_argument('--keep', action='store_true', help='Keep the seeded rows')
+
+    def handle(self, *args, **options):
+        tag = new_tag()
+        try:
+            with override_settings(CACHES=ISOLATED_CACHES):
+                seed_tickets(tag, options['tickets'], max(1, options['tickets'] // 10), stdout=self.stdout)
+                author, employers = seed_staff(tag, 1, 0, 0)
+                tickets = Ticket.objects.filter(ticket_id__startswith=tag)
+
+                self.stdout.write(f'  {"step":<28} {"tickets":>8} {"queries":>8} {"seconds":>8} {"tickets/s":>10}')
+                sample = list(tickets.order_by('pk').values_list('pk', flat=True)[:options['one_by_one']])
+                self.measure('one by one (save)', lambda: self.save_each(sample))
+                self.measure('mark completed', lambda: workflow.bulk_transition(
+                    tickets, 'status', 'completed', author))
+                self.measure('mark paid', lambda: workflow.bulk_transition(
+                    tickets, 'payment_status', 'paid', author))
+                self.measure('assign employer', lambda: workflow.bulk_assign(tickets, employers[0].pk, author))
+
+                self.check_rollups()
+        finally:
+            if not options['keep']:
+                self.stdout.write('Removing seeded rows...')
+                remove_seeded(tag)
+
+    def save_each(self, ids):
+        """Complete tickets the way the update form does: load, change, save."""
+        for pk in ids:
+            ticket = Ticket.objects.for_detail().get(pk=pk)
+            ticket.status = 'completed'
+            ticket.save()
+        return len(ids)
+
+    def measure(self, label, run):
+        reset_queries()
+        with CaptureQueriesContext(connection) as context:
+            started = time.perf_counter()
+            updated = run()
+            elapsed = time.perf_counter() - started
+        rate = updated / elapsed if elapsed else 0
+        self.stdout.write(
+            f'  {label:<28} {updated:8} {len(context.captured_queries):8} {elapsed:8.2f} {rate:10.0f}'
+        )
+
+    def check_rollups(self):
+        """Compare today's summaries with totals computed from the tickets."""
+        today = timezone.localdate()
+        expected = rollups.ticket_totals(Ticket.objects.filter(created_at__date=today))
+        stored = {
+            (row.date, row.service_type_id, row.employer_id): row
+            for row in DailyTicketSummary.objects.filter(date=today)
+        }
+        mismatches = 0
+        for key, measures in expected.items():
+            row = stored.get(key)
+            if row is None or any(getattr(row, name) != measures[name] for name in CHECKED_MEASURES):
+                mismatches += 1
+        if mismatches:
+            self.stdout.write(self.style.ERROR(f'{mismatches} summary rows do not match the tickets'))
+        else:
+            self.stdout.write(self.style.SUCCESS(f'The {len(expected)} summary rows of today match the tickets'))
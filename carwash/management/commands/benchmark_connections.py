@@ -0,0 +1,147 @@
+import io
+import statistics
+import time
+
+from django.conf import settings
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.backends.signals import connection_created
+from django.test import Client
+from django.test.utils import override_settings
+from django.urls import reverse
+
+from accounts.models import User
+from carwash.management.benchmarking import percentile
+from carwash.models import ServiceType
+
+# Label -> changes to the default database's settings
+MODES = {
+    'new connection per request': {'CONN_MAX_AGE': 0, 'CONN_HEALTH_CHECKS': False},
+    'persistent': {'CONN_MAX_AGE': 300, 'CONN_HEALTH_CHECKS': False},
+    'persistent + health checks': {'CONN_MAX_AGE': 300, 'CONN_HEALTH_CHECKS': True},
+}
+
+HOST = 'testserver'
+
+
+def pages(service):
+    """``(label, role, path, query string)`` of cheap pages, where connecting is a large part of the work."""
+    return [
+        ('get_service_price', 'author', reverse('carwash:get_service_price'), f'service_id={service.pk}'),
+        ('dashboard (author)', 'author', reverse('accounts:dashboard'), ''),
+        ('ticket_list', 'author', reverse('carwash:ticket_list'), ''),
+    ]
+
+
+class Command(BaseCommand):
+    help = (
+        'Time requests through the WSGI handler, which opens and closes database connections like a '
+        'server does, with a new connection per request and with persistent connections'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=200, help='Timed requests per page and mode')
+        parser.add_argument('--pgbouncer', metavar='HOST:PORT',
+                            help='Also time connecting through PgBouncer in transaction pooling mode')
+
+    def handle(self, *args, **options):
+        service = ServiceType.objects.filter(is_active=True).first()
+        author = User.objects.filter(role='author').first()
+        if service is None or author is None:
+            raise CommandError('No service type or author found. Run setup_initial_data first.')
+
+        modes = dict(MODES)
+        if options['pgbouncer']:
+            if connection.vendor != 'postgresql':
+                raise CommandError('--pgbouncer needs a PostgreSQL database')
+            host, _, port = options['pgbouncer'].rpartition(':')
+            modes['pgbouncer'] = {
+                'HOST': host, 'PORT': port, 'CONN_MAX_AGE': 0, 'CONN_HEALTH_CHECKS': False,
+                'DISABLE_SERVER_SIDE_CURSORS': True,
+            }
+
+        cookies = {'author': self.session_cookie(author)}
+        self.stdout.write(f'{connection.vendor} database {connection.settings_dict["NAME"]}')
+        original = dict(connection.settings_dict)
+        results = {}
+        try:
+            with override_settings(ALLOWED_HOSTS=[HOST]):
+                for mode, changes in modes.items():
+                    # Applies from the next connection on
+                    connection.close()
+                    connection.settings_dict.clear()
+                    connection.settings_dict.update(original, **changes)
+                    results[mode] = self.run_pages(mode, cookies, service, options['repeat'])
+        finally:
+            connection.close()
+            connection.settings_dict.clear()
+            connection.settings_dict.update(original)
+
+        self.summarize(results)
+
+    def session_cookie(self, user):
+        client = Client()
+        client.force_login(user)
+        session = client.cookies[settings.SESSION_COOKIE_NAME]
+        return f'{session.key}={session.value}'
+
+    def run_pages(self, mode, cookies, service, repeat):
+        self.stdout.write(self.style.MIGRATE_HEADING(mode))
+        self.stdout.write(f'  {"page":<24} {"median ms":>10} {"p95 ms":>8} {"connects/request":>17}')
+        handler = WSGIHandler()
+        connects = []
+        connection_created.connect(lambda **kwargs: connects.append(1), weak=False, dispatch_uid='benchmark')
+        results = {}
+        try:
+            for label, role, path, query_string in pages(service):
+                self.request(handler, path, query_string, cookies[role])  # warm up
+                connects.clear()
+                timings = []
+                for _ in range(repeat):
+                    started = time.perf_counter()
+                    self.request(handler, path, query_string, cookies[role])
+                    timings.append((time.perf_counter() - started) * 1000)
+
+                results[label] = statistics.median(timings)
+                self.stdout.write(
+                    f'  {label:<24} {statistics.median(timings):10.2f} {percentile(timings, 95):8.2f} '
+                    f'{len(connects) / repeat:17.2f}'
+                )
+        finally:
+            connection_created.disconnect(dispatch_uid='benchmark')
+        return results
+
+    def request(self, handler, path, query_string, cookie):
+        """One GET through ``handler``, closed like a WSGI server closes it, which ends the request."""
+        environ = {
+            'REQUEST_METHOD': 'GET',
+            'PATH_INFO': path,
+            'QUERY_STRING': query_string,
+            'SCRIPT_NAME': '',
+            'SERVER_NAME': HOST,
+            'SERVER_PORT': '80',
+            'SERVER_PROTOCOL': 'HTTP/1.1',
+            'HTTP_HOST': HOST,
+            'HTTP_COOKIE': cookie,
+            'wsgi.input': io.BytesIO(),
+            'wsgi.errors': self.stderr,
+            'wsgi.url_scheme': 'http',
+        }
+        statuses = []
+        response = handler(environ, lambda status, headers, exc_info=None: statuses.append(status))
+        try:
+            b''.join(response)
+        finally:
+            response.close()
+        if not statuses[0].startswith('200'):
+            raise CommandError(f'{path}?{query_string} returned {statuses[0]}')
+
+    def summarize(self, results):
+        modes = list(results)
+        baseline = modes[0]
+        self.stdout.write(self.style.MIGRATE_HEADING(f'Median request time relative to "{baseline}"'))
+        self.stdout.write(f'  {"page":<24} ' + ' '.join(f'{mode:>27}' for mode in modes[1:]))
+        for label, median in results[baseline].items():
+            self.stdout.write(f'  {label:<24} ' + ' '.join(f'{results[mode][label] / median:26.2f}x'
+                                                          for mode in modes[1:]))
@@ -0,0 +1,70 @@
+import resource
+import time
+
+from django.core.management.base import BaseCommand
+from django.test import Client
+from django.urls import reverse
+
+from accounts.models import User
+from carwash.management.benchmarking import new_tag, remove_seeded, seed_tickets
+from carwash.models import Ticket
+
+
+def current_rss_mb():
+    """Resident set size of this process, from /proc where available."""
+    try:
+        with open('/proc/self/statm') as f:
+            pages = int(f.read().split()[1])
+        return pages * resource.getpagesize() / 2 ** 20
+    except OSError:
+        return peak_rss_mb()
+
+
+def peak_rss_mb():
+    # ru_maxrss is in kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+class Command(BaseCommand):
+    help = 'Seed tickets, stream them through the ticket export endpoint and report throughput and memory use'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tickets', type=int, default=1_000_000, help='Number of tickets to seed')
+        parser.add_argument('--format', choices=['csv', 'xlsx'], default='csv')
+        parser.add_argument('--keep', action='store_true', help='Keep the seeded rows')
+
+    def handle(self, *args, **options):
+        user = User.objects.filter(role='author').first()
+        tag = new_tag()
+
+        try:
+            seed_tickets(tag, options['tickets'], max(1, options['tickets'] // 20), stdout=self.stdout)
+
+            rows = Ticket.objects.count()
+            client = Client()
+            client.force_login(user)
+            url = reverse('carwash:ticket_export')
+
+            baseline = current_rss_mb()
+            highest = baseline
+            size = chunks = 0
+            started = time.perf_counter()
+
+            response = client.get(url, {'format': options['format']})
+            for chunk in response.streaming_content:
+                size += len(chunk)
+                chunks += 1
+                if chunks % 50 == 0:
+                    highest = max(highest, current_rss_mb())
+            elapsed = time.perf_counter() - started
+            highest = max(highest, current_rss_mb())
+
+            self.stdout.write(f'Exported {rows} tickets, {size / 2 ** 20:.1f} MB of {options["format"]}, in {elapsed:.1f}s')
+            self.stdout.write(f'  throughput       {rows / elapsed:10.0f} rows/s ({size / 2 ** 20 / elapsed:.1f} MB/s)')
+            self.stdout.write(f'  RSS before       {baseline:10.1f} MB')
+            self.stdout.write(f'  RSS peak         {highest:10.1f} MB (+{highest - baseline:.1f} MB during the export)')
+            self.stdout.write(f'  process max RSS  {peak_rss_mb():10.1f} MB (including seeding)')
+        finally:
+            if not options['keep']:
+                self.stdout.write('Removing seeded rows...')
+                remove_seeded(tag)
@@ -0,0 +1,141 @@
+import re
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.utils import timezone
+
+from attendance.models import EmployerAttendance, EmployerNote
+from carwash.management.benchmarking import new_tag, remove_seeded, seed_staff, seed_tickets
+from carwash.history import history_tickets
+from carwash.models import Customer, ServiceType, Ticket, Vehicle
+from requests.models import EmployerRequest
+
+# Tables that must never be read in full by a list or dashboard query.
+# Small lookup tables (service types, users) may be.
+LARGE_TABLES = (
+    Ticket._meta.db_table,
+    Customer._meta.db_table,
+    Vehicle._meta.db_table,
+    EmployerAttendance._meta.db_table,
+    EmployerNote._meta.db_table,
+    EmployerRequest._meta.db_table,
+)
+
+
+def view_queries(author, employer, service, car_number, today):
+    """``(label, queryset, vendors)`` for the queries the list and dashboard views run."""
+    tickets = Ticket.objects.for_listing().order_by('-created_at', '-id')
+    requests = EmployerRequest.objects.for_listing().order_by('-created_at', '-id')
+    notes = EmployerNote.objects.for_listing().order_by('-created_at', '-id')
+    attendance = EmployerAttendance.objects.with_user().order_by('-date', '-id')
+    return [
+        ('ticket_list', tickets[:21], None),
+        ('ticket_list status=completed', tickets.filter_listing(status='completed')[:21], None),
+        ('ticket_list status=cancelled', tickets.filter_listing(status='cancelled')[:21], None),
+        ('ticket_list payment=due', tickets.filter_listing(payment='due')[:21], None),
+        ('ticket_list service', tickets.filter_listing(service=service.pk)[:21], None),
+        ('author_dashboard open tickets', tickets.filter(status='under_working')[:10], None),
+        ('tickets created today', Ticket.objects.filter(created_at__date=today).only('id'), ('postgresql',)),
+        ('ticket id prefix', Ticket.objects.filter(
+            ticket_id__startswith=f'{today:%Y%m%d}').order_by('-ticket_id').values('ticket_id')[:1], None),
+        ('vehicle_history', history_tickets(car_number), None),
+        ('customer_list', Customer.objects.order_by('name', 'id')[:21], None),
+        ('attendance_list (employer)', attendance.filter(user=employer)[:21], None),
+        ('attendance_list (author)', attendance[:21], None),
+        ('attendance_list month', attendance.for_month(f'{today:%Y-%m}')[:21], None),
+        ('employer_dashboard attendance', EmployerAttendance.objects.filter(
+            user=employer, date__gte=today.replace(day=1)).only('status'), None),
+        ('note_list (employer)', notes.filter(employer=employer)[:11], None),
+        ('note_list (author)', notes.filter(author=author)[:11], None),
+        ('note_list (superadmin)', notes[:11], None),
+        ('request_list (employer)', requests.filter(user=employer)[:11], None),
+        ('request_list (author)', requests.filter(is_instruction=False)[:11], None),
+        ('instruction_list (employer)', requests.filter(user=employer, is_instruction=True)[:11], None),
+        ('instruction_list (author)', requests.filter(is_instruction=True)[:11], None),
+        ('employer_dashboard instructions', EmployerRequest.objects.filter(
+            user=employer, is_instruction=True, is_active=True).order_by('-created_at')[:5], None),
+        ('employer_dashboard requests', requests.filter(user=employer, is_instruction=False)[:5], None),
+        ('author_dashboard requests', requests.filter(is_instruction=False, is_active=True)[:10], None),
+    ]
+
+
+def read_plan(plan, vendor):
+    """The indexes an EXPLAIN plan uses, the large tables it scans in full and whether it sorts."""
+    if vendor == 'postgresql':
+        indexes = re.findall(r'(?:Index Scan|Index Only Scan) (?:Backward )?using (\w+)|Bitmap Index Scan on (\w+)', plan)
+        indexes = [using or bitmap for using, bitmap in indexes]
+        full_scans = re.findall(r'Seq Scan on (\w+)', plan)
+        sorts = re.search(r'\bSort\b', plan) is not None
+    else:
+        indexes = re.findall(r'USING (?:COVERING )?INDEX (\w+)', plan)
+        full_scans = re.findall(r'\bSCAN (\w+)(?! USING)', plan)
+        sorts = 'TEMP B-TREE FOR ORDER BY' in plan
+    return indexes, [table for table in full_scans if table in LARGE_TABLES], sorts
+
+
+class Command(BaseCommand):
+    help = 'Seed tickets and staff records, then EXPLAIN every list and dashboard query to check it uses an index'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tickets', type=int, default=1_000_000, help='Number of tickets to seed')
+        parser.add_argument('--days', type=int, default=365, help='Days the tickets and attendance span')
+        parser.add_argument('--employers', type=int, default=50, help='Employers to seed')
+        parser.add_argument('--items', type=int, default=500,
+                            help='Requests, instructions and notes per employer')
+        parser.add_argument('--repeat', type=int, default=5, help='Timed runs per query')
+        parser.add_argument('--plans', action='store_true', help='Print every query plan')
+        parser.add_argument('--keep', action='store_true', help='Keep the seeded rows')
+
+    def handle(self, *args, **options):
+        vendor = connection.vendor
+        service = ServiceType.objects.filter(is_active=True).first()
+        tag = new_tag()
+        failures = []
+
+        try:
+            seed_tickets(tag, options['tickets'], max(1, options['tickets'] // 20),
+                         stdout=self.stdout, days=options['days'])
+            car_number = Ticket.objects.filter(ticket_id__startswith=tag).values_list(
+                'vehicle__car_number', flat=True).first()
+            self.stdout.write(f'Seeding {options["employers"]} employers...')
+            author, employers = seed_staff(tag, options['employers'], options['days'], options['items'])
+
+            # Fresh statistics, as autovacuum would have by the time the
+            # tables reached this size in production
+            with connection.cursor() as cursor:
+                cursor.execute('ANALYZE')
+
+            self.stdout.write(f'{"query":<34} {"sort":<5} {"ms":>8}   index')
+            for label, queryset, vendors in view_queries(author, employers[0], service, car_number, timezone.localdate()):
+                if vendors and vendor not in vendors:
+                    self.stdout.write(f'{label:<34} (only checked on {", ".join(vendors)})')
+                    continue
+
+                plan = queryset.explain()
+                indexes, full_scans, sorts = read_plan(plan, vendor)
+                timings = []
+                for _ in range(options['repeat']):
+                    started = time.perf_counter()
+                    list(queryset.all())
+                    timings.append((time.perf_counter() - started) * 1000)
+
+                line = (
+                    f'{label:<34} {"yes" if sorts else "no":<5} {statistics.median(timings):8.2f}   '
+                    f'{", ".join(dict.fromkeys(indexes)) or "-"}'
+                )
+                if full_scans:
+                    failures.append(label)
+                    line = self.style.ERROR(f'{line}   full scan of {", ".join(full_scans)}')
+                self.stdout.write(line)
+                if options['plans']:
+                    self.stdout.write(plan)
+        finally:
+            if not options['keep']:
+                self.stdout.write('Removing seeded rows...')
+                remove_seeded(tag)
+
+        if failures:
+            raise CommandError(f'{len(failures)} queries scan a large table in full: {", ".join(failures)}')
+        self.stdout.write(self.style.SUCCESS('Every query reads its rows through an index.'))
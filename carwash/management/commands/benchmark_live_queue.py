@@ -0,0 +1,88 @@
+import asyncio
+import json
+import statistics
+import threading
+import time
+
+from asgiref.sync import sync_to_async
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client
+
+from accounts.models import User
+from carwash import live
+from carwash.management.benchmarking import percentile
+
+
+class Command(BaseCommand):
+    help = 'Open many idle live queue streams in this process and time how long an event takes to reach all of them'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--connections', type=int, default=500, help='Open streams')
+        parser.add_argument('--events', type=int, default=50, help='Events to publish')
+
+    def handle(self, *args, **options):
+        author = User.objects.filter(role='author').first()
+        if author is None:
+            raise CommandError('No author user found. Run setup_initial_data first.')
+        client = Client()
+        client.force_login(author)
+        self.cookie = f'{client.cookies["sessionid"].key}={client.cookies["sessionid"].value}'.encode()
+
+        asyncio.run(self.run(options['connections'], options['events']))
+
+    def scope(self):
+        return {
+            'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': 'GET', 'scheme': 'http',
+            'path': '/carwash/queue/events/', 'root_path': '', 'query_string': b'',
+            'headers': [(b'host', b'localhost'), (b'cookie', self.cookie)],
+            'server': ('localhost', 80), 'client': ('127.0.0.1', 0),
+        }
+
+    async def run(self, connections, events):
+        from carwash_management.asgi import application
+
+        threads_before = threading.active_count()
+        disconnect = asyncio.Event()
+        received = [[] for _ in range(connections)]
+
+        async def receive():
+            await disconnect.wait()
+            return {'type': 'http.disconnect'}
+
+        def sender(index):
+            async def send(message):
+                for line in message.get('body', b'').decode().splitlines():
+                    if line.startswith('data: '):
+                        received[index].append((json.loads(line[6:])['sent'], time.perf_counter()))
+            return send
+
+        started = time.perf_counter()
+        streams = [asyncio.create_task(application(self.scope(), receive, sender(n))) for n in range(connections)]
+        broker = live.get_broker()
+        while len(broker._subscriptions) < connections:
+            await asyncio.sleep(0.01)
+        self.stdout.write(
+            f'{connections} streams open in {time.perf_counter() - started:.2f}s, '
+            f'{threading.active_count()} threads (was {threads_before})'
+        )
+
+        # Published from a worker thread, as a ticket save would be
+        def publish(n):
+            live.publish({'event': 'status', 'id': n, 'sent': time.perf_counter()})
+
+        for n in range(events):
+            await sync_to_async(publish)(n)
+            await asyncio.sleep(0.01)
+        while sum(map(len, received)) < connections * events:
+            await asyncio.sleep(0.01)
+
+        latencies = [(arrived - sent) * 1000 for stream in received for sent, arrived in stream]
+        self.stdout.write(
+            f'{events} events to {connections} streams: '
+            f'p50 {percentile(latencies, 50):.2f} ms   p99 {percentile(latencies, 99):.2f} ms   '
+            f'mean {statistics.mean(latencies):.2f} ms'
+        )
+
+        disconnect.set()
+        await asyncio.gather(*streams)
+        self.stdout.write(f'{len(broker._subscriptions)} subscriptions left after disconnect')
@@ -0,0 +1,65 @@
+import statistics
+import time
+
+from django.core.paginator import Paginator
+from django.core.management.base import BaseCommand
+
+from carwash.management.benchmarking import new_tag, percentile, remove_seeded, seed_tickets
+from carwash.models import Ticket
+from carwash_management.pagination import KeysetPaginator
+
+
+class Command(BaseCommand):
+    help = 'Compare deep-page latency of the offset Paginator with the keyset paginator on tickets'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tickets', type=int, default=100_000, help='Number of tickets to seed')
+        parser.add_argument('--page', type=int, default=500, help='Page number to fetch')
+        parser.add_argument('--per-page', type=int, default=20)
+        parser.add_argument('--repeat', type=int, default=50, help='Timed fetches per variant')
+        parser.add_argument('--keep', action='store_true', help='Keep the seeded rows')
+
+    def handle(self, *args, **options):
+        tag = new_tag()
+        per_page, page_number = options['per_page'], options['page']
+        ordering = ('-created_at', '-id')
+
+        try:
+            seed_tickets(tag, options['tickets'], max(1, options['tickets'] // 20), stdout=self.stdout)
+            queryset = Ticket.objects.all()
+
+            def offset_page():
+                # What the list views did before: COUNT(*) plus OFFSET
+                page = Paginator(queryset.order_by(*ordering), per_page).get_page(page_number)
+                return list(page)
+
+            # Cursor pointing at the last row of the previous page, as a
+            # "Next" link on that page would carry it
+            keyset = KeysetPaginator(queryset, per_page, ordering, count_timeout=None)
+            boundary = queryset.order_by(*ordering)[(page_number - 1) * per_page - 1]
+            cursor = keyset.encode_cursor('n', keyset.values_for(boundary))
+
+            def keyset_page():
+                return list(keyset.get_page(cursor))
+
+            offset_rows = [ticket.pk for ticket in offset_page()]
+            keyset_rows = [ticket.pk for ticket in keyset_page()]
+            if offset_rows != keyset_rows:
+                self.stdout.write(self.style.WARNING('Keyset page differs from offset page!'))
+
+            self.stdout.write(f'Page {page_number} ({per_page} per page):')
+            for label, fetch in (('offset', offset_page), ('keyset', keyset_page)):
+                timings = []
+                for _ in range(options['repeat']):
+                    started = time.perf_counter()
+                    fetch()
+                    timings.append((time.perf_counter() - started) * 1000)
+                self.stdout.write(
+                    f'{label:<8} p50 {percentile(timings, 50):8.2f} ms   '
+                    f'p99 {percentile(timings, 99):8.2f} ms   '
+                    f'mean {statistics.mean(timings):8.2f} ms'
+                )
+        finally:
+            if not options['keep']:
+                self.stdout.write('Removing seeded rows...')
+                remove_seeded(tag)
@@ -0,0 +1,77 @@
+import random
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+
+from carwash.management.benchmarking import new_tag, percentile, remove_seeded, seed_tickets
+from carwash.models import Customer, Ticket
+from carwash.search import search_customers, search_tickets
+
+
+class Command(BaseCommand):
+    help = 'Seed tickets and report p50/p99 search latency for indexed vs. icontains search'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tickets', type=int, default=1_000_000, help='Number of tickets to seed')
+        parser.add_argument('--customers', type=int, default=50_000, help='Number of customers to seed')
+        parser.add_argument('--queries', type=int, default=200, help='Search queries to time per variant')
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--skip-legacy', action='store_true', help='Only time the indexed search')
+        parser.add_argument('--keep', action='store_true', help='Keep the seeded rows')
+
+    def handle(self, *args, **options):
+        tag = new_tag()
+        rng = random.Random(42)
+
+        try:
+            samples = seed_tickets(
+                tag, options['tickets'], options['customers'], options['batch_size'], stdout=self.stdout
+            )
+            queries = [rng.choice(samples) for _ in range(options['queries'])]
+
+            variants = [('indexed', self.indexed_ticket_search, self.indexed_customer_search)]
+            if not options['skip_legacy']:
+                variants.append(('icontains', self.legacy_ticket_search, self.legacy_customer_search))
+
+            for label, ticket_search, customer_search in variants:
+                self.report(f'tickets/{label}', ticket_search, queries)
+                self.report(f'customers/{label}', customer_search, queries)
+        finally:
+            if not options['keep']:
+                self.stdout.write('Removing seeded rows...')
+                remove_seeded(tag)
+
+    def indexed_ticket_search(self, query):
+        return list(search_tickets(Ticket.objects.order_by('-created_at'), query)[:20])
+
+    def indexed_customer_search(self, query):
+        return list(search_customers(Customer.objects.order_by('name'), query)[:20])
+
+    def legacy_ticket_search(self, query):
+        return list(Ticket.objects.filter(
+            Q(ticket_id__icontains=query) |
+            Q(car_number__icontains=query) |
+            Q(customer__name__icontains=query) |
+            Q(customer__phone__icontains=query)
+        ).order_by('-created_at')[:20])
+
+    def legacy_customer_search(self, query):
+        return list(Customer.objects.filter(
+            Q(name__icontains=query) |
+            Q(phone__icontains=query) |
+            Q(email__icontains=query)
+        ).order_by('name')[:20])
+
+    def report(self, label, search, queries):
+        timings = []
+        for query in queries:
+            started = time.perf_counter()
+            search(query)
+            timings.append((time.perf_counter() - started) * 1000)
+        self.stdout.write(
+            f'{label:<22} p50 {percentile(timings, 50):8.2f} ms   '
+            f'p99 {percentile(timings, 99):8.2f} ms   '
+            f'mean {statistics.mean(timings):8.2f} ms'
+        )
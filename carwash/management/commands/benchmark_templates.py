@@ -0,0 +1,151 @@
+import copy
+import statistics
+import time
+from unittest import mock
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.template.backends.django import Template
+from django.test import Client
+from django.test.utils import override_settings
+from django.urls import reverse
+
+from accounts.models import User
+from carwash.management.benchmarking import ISOLATED_CACHES, new_tag, remove_seeded, seed_tickets
+
+LOADERS = [
+    'django.template.loaders.filesystem.Loader',
+    'django.template.loaders.app_directories.Loader',
+]
+
+# Label -> (template loaders, cache for {% cache %} fragments)
+MODES = {
+    'parsed every time': (LOADERS, 'django.core.cache.backends.dummy.DummyCache'),
+    'cached loader': ([('django.template.loaders.cached.Loader', LOADERS)],
+                      'django.core.cache.backends.dummy.DummyCache'),
+    'cached loader + fragments': ([('django.template.loaders.cached.Loader', LOADERS)],
+                                  'django.core.cache.backends.locmem.LocMemCache'),
+}
+
+# (label, role, url name, query string)
+PAGES = [
+    ('ticket_list', 'author', 'carwash:ticket_list', ''),
+    ('ticket_list status=under_working', 'author', 'carwash:ticket_list', 'status=under_working'),
+    ('dashboard (author)', 'author', 'accounts:dashboard', ''),
+    ('dashboard (superadmin)', 'superadmin', 'accounts:dashboard', ''),
+]
+
+
+def template_settings(loaders):
+    templates = copy.deepcopy(settings.TEMPLATES)
+    for engine in templates:
+        engine.pop('APP_DIRS', None)
+        engine.setdefault('OPTIONS', {})['loaders'] = loaders
+    return templates
+
+
+def cache_settings(fragment_backend):
+    caches = copy.deepcopy(ISOLATED_CACHES)
+    # {% cache %} uses this cache when it is configured
+    caches['template_fragments'] = {'BACKEND': fragment_backend, 'LOCATION': 'benchmark-fragments'}
+    return caches
+
+
+class RenderTimer:
+    """Wall and CPU milliseconds spent rendering templates, summed per request."""
+
+    def __init__(self):
+        self.wall = self.cpu = 0.0
+
+    def reset(self):
+        self.wall = self.cpu = 0.0
+
+    def patch(self):
+        render = Template.render
+        timer = self
+
+        def timed_render(template, *args, **kwargs):
+            wall, cpu = time.perf_counter(), time.thread_time()
+            try:
+                return render(template, *args, **kwargs)
+            finally:
+                timer.wall += (time.perf_counter() - wall) * 1000
+                timer.cpu += (time.thread_time() - cpu) * 1000
+
+        return mock.patch.object(Template, 'render', timed_render)
+
+
+class Command(BaseCommand):
+    help = (
+        'Report template render time per request on the ticket list and dashboards, without and with the '
+        'cached template loader and fragment caching'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=50, help='Timed requests per page and mode')
+        parser.add_argument('--tickets', type=int, default=2000, help='Tickets to seed')
+        parser.add_argument('--keep', action='store_true', help='Keep the seeded rows')
+
+    def handle(self, *args, **options):
+        users = {role: User.objects.filter(role=role).first() for role in ('author', 'superadmin')}
+        missing = [role for role, user in users.items() if user is None]
+        if missing:
+            raise CommandError(f'No {", ".join(missing)} user found. Run setup_initial_data first.')
+
+        tag = new_tag()
+        try:
+            seed_tickets(tag, options['tickets'], max(1, options['tickets'] // 10), stdout=self.stdout)
+            results = {}
+            for mode, (loaders, fragment_backend) in MODES.items():
+                with override_settings(TEMPLATES=template_settings(loaders), CACHES=cache_settings(fragment_backend)):
+                    results[mode] = self.run_pages(mode, users, options['repeat'])
+        finally:
+            if not options['keep']:
+                self.stdout.write('Removing seeded rows...')
+                remove_seeded(tag)
+
+        self.summarize(results)
+
+    def run_pages(self, mode, users, repeat):
+        self.stdout.write(self.style.MIGRATE_HEADING(mode))
+        self.stdout.write(f'  {"page":<36} {"template ms":>12} {"template CPU":>13} {"request ms":>11}')
+        timer = RenderTimer()
+        results = {}
+        cache.clear()
+        with timer.patch():
+            for label, role, url_name, query_string in PAGES:
+                client = Client()
+                client.force_login(users[role])
+                url = reverse(url_name) + (f'?{query_string}' if query_string else '')
+                client.get(url)  # warm up
+
+                walls, cpus, requests = [], [], []
+                for _ in range(repeat):
+                    timer.reset()
+                    started = time.perf_counter()
+                    response = client.get(url)
+                    requests.append((time.perf_counter() - started) * 1000)
+                    if response.status_code != 200:
+                        raise CommandError(f'{url} returned {response.status_code}')
+                    walls.append(timer.wall)
+                    cpus.append(timer.cpu)
+
+                results[label] = statistics.median(cpus)
+                self.stdout.write(
+                    f'  {label:<36} {statistics.median(walls):12.2f} {statistics.median(cpus):13.2f} '
+                    f'{statistics.median(requests):11.2f}'
+                )
+        return results
+
+    def summarize(self, results):
+        modes = list(results)
+        baseline = modes[0]
+        self.stdout.write(self.style.MIGRATE_HEADING(f'Template CPU per request relative to "{baseline}"'))
+        self.stdout.write(f'  {"page":<36} ' + ' '.join(f'{mode:>26}' for mode in modes[1:]))
+        for label, cpu in results[baseline].items():
+            ratios = [
+                f'{results[mode][label] / cpu:25.2f}x' if cpu else f'{"-":>26}'
+                for mode in modes[1:]
+            ]
+            self.stdout.write(f'  {label:<36} ' + ' '.join(ratios))
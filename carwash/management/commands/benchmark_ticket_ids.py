@@ -0,0 +1,86 @@
+import threading
+import time
+import uuid
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import IntegrityError, connection
+from django.test import Client
+from django.urls import reverse
+
+from carwash.models import Customer, ServiceType
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = 'Run parallel ticket_create requests and report throughput and duplicate ticket IDs'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=8, help='Number of concurrent clients')
+        parser.add_argument('--tickets', type=int, default=25, help='Tickets created by each client')
+        parser.add_argument('--username', default='author', help='Author account used to create tickets')
+        parser.add_argument('--keep', action='store_true', help='Keep the benchmark tickets instead of deleting them')
+
+    def handle(self, *args, **options):
+        try:
+            user = User.objects.get(username=options['username'])
+        except User.DoesNotExist:
+            raise CommandError(f"User '{options['username']}' does not exist. Run setup_initial_data first.")
+
+        service = ServiceType.objects.filter(is_active=True).first()
+        if service is None:
+            raise CommandError('No active service type found. Run setup_initial_data first.')
+
+        tag = f'bench-{uuid.uuid4().hex[:8]}'
+        url = reverse('carwash:ticket_create')
+        results = {'created': 0, 'duplicates': 0, 'errors': 0}
+        lock = threading.Lock()
+
+        def worker(number):
+            client = Client()
+            client.force_login(user)
+            for i in range(options['tickets']):
+                data = {
+                    'car_number': f'{tag}-{number}-{i}'[:20],
+                    'car_model': 'Benchmark',
+                    'service_type': service.id,
+                    'assigned_to': '',
+                    'additional_charges': '0',
+                    'customer_name': f'{tag} {number}-{i}',
+                }
+                try:
+                    response = client.post(url, data)
+                    outcome = 'created' if response.status_code == 302 else 'errors'
+                except IntegrityError:
+                    outcome = 'duplicates'
+                except Exception:
+                    outcome = 'errors'
+                with lock:
+                    results[outcome] += 1
+            connection.close()
+
+        self.stdout.write(
+            f"Creating {options['workers'] * options['tickets']} tickets with {options['workers']} workers..."
+        )
+        threads = [threading.Thread(target=worker, args=(n,)) for n in range(options['workers'])]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+
+        self.stdout.write(f"Created:              {results['created']}")
+        self.stdout.write(f"Duplicate-key errors: {results['duplicates']}")
+        self.stdout.write(f"Other errors:         {results['errors']}")
+        self.stdout.write(f'Elapsed:              {elapsed:.2f}s')
+        self.stdout.write(f"Throughput:           {results['created'] / elapsed:.1f} tickets/s")
+
+        if not options['keep']:
+            Customer.objects.filter(name__startswith=tag).delete()
+
+        if results['duplicates'] or results['errors']:
+            self.stdout.write(self.style.WARNING('Benchmark finished with failures.'))
+        else:
+            self.stdout.write(self.style.SUCCESS('Benchmark finished without failures.'))
@@ -0,0 +1,109 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Case, Count, Value, When
+from django.utils import timezone
+
+from carwash import fragments
+from carwash.models import Customer, Ticket, Vehicle
+
+MERGED_DETAILS = ('email', 'address')
+
+
+def duplicated_phones(after, limit):
+    """The next ``limit`` normalized phone numbers after ``after`` that belong to several customers."""
+    return list(
+        Customer.objects.filter(phone_normalized__gt=after)
+        .values('phone_normalized')
+        .annotate(customers=Count('id'))
+        .filter(customers__gt=1)
+        .order_by('phone_normalized')
+        .values_list('phone_normalized', flat=True)[:limit]
+    )
+
+
+def reassign(queryset, field, keepers, **changes):
+    """Point ``field`` of the rows in ``queryset`` from each duplicate to its keeper, in one UPDATE."""
+    return queryset.filter(**{f'{field}__in': list(keepers)}).update(**{
+        field: Case(*[When(**{field: duplicate}, then=Value(keeper)) for duplicate, keeper in keepers.items()]),
+        **changes,
+    })
+
+
+class Command(BaseCommand):
+    help = (
+        'Merge customers that share a phone number into the oldest of them, moving their tickets and '
+        'vehicles, a batch of phone numbers per transaction'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500, help='Phone numbers per transaction')
+        parser.add_argument('--dry-run', action='store_true', help='Only report what would be merged')
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        after = ''
+        groups = merged = tickets = 0
+        while phones := duplicated_phones(after, options['batch_size']):
+            after = phones[-1]
+            if options['dry_run']:
+                customers = Customer.objects.filter(phone_normalized__in=phones).count()
+                groups += len(phones)
+                merged += customers - len(phones)
+                continue
+
+            with transaction.atomic():
+                batch_merged, batch_tickets = self.merge(phones)
+            groups += len(phones)
+            merged += batch_merged
+            tickets += batch_tickets
+            self.stdout.write(f'{groups} phone numbers processed, {merged} duplicates merged')
+
+        if options['dry_run']:
+            self.stdout.write(f'{merged} duplicates of {groups} customers would be merged.')
+            return
+        if merged:
+            fragments.invalidate_tickets()
+        self.stdout.write(self.style.SUCCESS(
+            f'Merged {merged} duplicates into {groups} customers and moved {tickets} tickets '
+            f'in {time.perf_counter() - started:.1f}s'
+        ))
+
+    def merge(self, phones):
+        """Merge the customers of each phone number in ``phones``; returns the duplicates merged and tickets moved."""
+        customers = Customer.objects.select_for_update().filter(phone_normalized__in=phones).order_by('id')
+        by_phone = {}
+        for customer in customers:
+            by_phone.setdefault(customer.phone_normalized, []).append(customer)
+
+        keepers = {}
+        renamed = []
+        for keeper, *duplicates in by_phone.values():
+            if not duplicates:
+                continue
+            for duplicate in duplicates:
+                keepers[duplicate.pk] = keeper.pk
+            # Details the oldest record lacks come from the latest duplicate that has them
+            latest_first = sorted(duplicates, key=lambda customer: customer.updated_at, reverse=True)
+            changed = False
+            for field in MERGED_DETAILS:
+                if not getattr(keeper, field):
+                    value = next((getattr(c, field) for c in latest_first if getattr(c, field)), '')
+                    if value:
+                        setattr(keeper, field, value)
+                        changed = True
+            if changed:
+                keeper.save()
+            # Tickets moved over index the duplicate's name and phone
+            if any((c.name, c.phone) != (keeper.name, keeper.phone) for c in duplicates):
+                renamed.append(keeper)
+
+        if not keepers:
+            return 0, 0
+        moved = reassign(Ticket.objects.all(), 'customer', keepers, updated_at=timezone.now())
+        reassign(Vehicle.objects.all(), 'customer', keepers)
+        for keeper in renamed:
+            keeper.refresh_ticket_search_text()
+        Customer.objects.filter(pk__in=list(keepers)).delete()
+        return len(keepers), moved
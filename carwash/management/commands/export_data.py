@@ -0,0 +1,60 @@
+import sys
+
+from django.core.management.base import BaseCommand
+
+from attendance.exports import ATTENDANCE_COLUMNS
+from attendance.models import EmployerAttendance
+from carwash.exports import CUSTOMER_COLUMNS, TICKET_COLUMNS
+from carwash.models import Customer, Ticket
+from carwash.search import search_customers
+from carwash_management.exports import export_rows, stream_export
+
+
+class Command(BaseCommand):
+    help = 'Stream tickets, customers or attendance records to a CSV or XLSX file'
+
+    def add_arguments(self, parser):
+        parser.add_argument('kind', choices=['tickets', 'customers', 'attendance'])
+        parser.add_argument('--format', choices=['csv', 'xlsx'], default='csv')
+        parser.add_argument('--output', '-o', help='Output file (default: standard output, CSV only)')
+        parser.add_argument('--status', help='Tickets: status filter')
+        parser.add_argument('--payment', help='Tickets: payment status filter')
+        parser.add_argument('--service', help='Tickets: service type id')
+        parser.add_argument('--search', help='Tickets and customers: search text')
+        parser.add_argument('--month', help='Attendance: YYYY-MM')
+        parser.add_argument('--user', help='Attendance: employer username')
+
+    def handle(self, *args, **options):
+        queryset, columns, sheet_name = self.get_export(options)
+        header, rows = export_rows(queryset, columns)
+        chunks = stream_export(options['format'], header, rows, sheet_name)
+
+        if options['output']:
+            binary = options['format'] == 'xlsx'
+            with open(options['output'], 'wb' if binary else 'w', newline=None if binary else '') as f:
+                for chunk in chunks:
+                    f.write(chunk)
+        elif options['format'] == 'xlsx':
+            for chunk in chunks:
+                sys.stdout.buffer.write(chunk)
+        else:
+            for chunk in chunks:
+                self.stdout.write(chunk, ending='')
+
+    def get_export(self, options):
+        if options['kind'] == 'tickets':
+            tickets = Ticket.objects.filter_listing(
+                options['status'], options['payment'], options['service'], options['search']
+            ).order_by('-created_at', '-id')
+            return tickets, TICKET_COLUMNS, 'Tickets'
+
+        if options['kind'] == 'customers':
+            customers = Customer.objects.order_by('name', 'id')
+            if options['search']:
+                customers = search_customers(customers, options['search'])
+            return customers, CUSTOMER_COLUMNS, 'Customers'
+
+        records = EmployerAttendance.objects.for_month(options['month']).order_by('-date', '-id')
+        if options['user']:
+            records = records.filter(user__username=options['user'])
+        return records, ATTENDANCE_COLUMNS, 'Attendance'
@@ -0,0 +1,106 @@
+import json
+import os
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from accounts.stats import invalidate_ticket_stats
+from carwash.imports import RowError, TicketImporter, chunked, read_rows
+
+
+class Command(BaseCommand):
+    help = 'Import tickets from a CSV or JSONL file in chunks, resuming from a checkpoint after a failure'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='CSV (with a header row) or JSONL file')
+        parser.add_argument('--format', choices=['csv', 'jsonl'], help='Defaults to the file extension')
+        parser.add_argument('--chunk-size', type=int, default=1000, help='Rows per transaction')
+        parser.add_argument('--checkpoint', help='Checkpoint file (default: <path>.checkpoint)')
+        parser.add_argument('--restart', action='store_true', help='Ignore an existing checkpoint')
+        parser.add_argument('--skip-invalid', action='store_true', help='Report and skip invalid rows')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        fmt = options['format'] or ('jsonl' if path.endswith(('.jsonl', '.ndjson')) else 'csv')
+        checkpoint_path = options['checkpoint'] or f'{path}.checkpoint'
+        if not os.path.exists(path):
+            raise CommandError(f'{path} does not exist.')
+
+        done = 0 if options['restart'] else self.read_checkpoint(checkpoint_path, path)
+        if done:
+            self.stdout.write(f'Resuming after {done} rows from {checkpoint_path}')
+
+        importer = TicketImporter()
+        imported = skipped = 0
+        started = time.perf_counter()
+
+        with open(path, newline='', encoding='utf-8-sig') as stream:
+            rows = read_rows(stream, fmt)
+            try:
+                # Rows before the checkpoint were committed by an earlier run
+                for _ in range(done):
+                    next(rows, None)
+
+                for chunk in chunked(rows, options['chunk_size']):
+                    invalid = 0
+                    if options['skip_invalid']:
+                        chunk, invalid = self.split_invalid(importer, chunk)
+                        skipped += invalid
+                    if chunk:
+                        imported += len(importer.import_chunk(chunk))
+                    done += len(chunk) + invalid
+                    self.write_checkpoint(checkpoint_path, path, done)
+                    invalidate_ticket_stats()
+
+                    elapsed = time.perf_counter() - started
+                    self.stdout.write(f'{done} rows processed, {imported} imported ({imported / elapsed:.0f} rows/s)')
+            except RowError as e:
+                raise CommandError(f'{e}. {done} rows are committed; fix the row and run the command again to resume.')
+
+        if os.path.exists(checkpoint_path):
+            os.remove(checkpoint_path)
+
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Imported {imported} tickets in {elapsed:.1f}s ({imported / max(elapsed, 1e-9):.0f} rows/s)'
+            + (f', skipped {skipped} invalid rows' if skipped else '')
+        ))
+
+    def split_invalid(self, importer, chunk):
+        """The rows of ``chunk`` that import_chunk accepts, and how many were skipped."""
+        parsed = {}
+        errors = []
+        for line, row in chunk:
+            try:
+                parsed[line] = importer.parse_row(line, row)
+            except RowError as e:
+                errors.append(e)
+        # Checked together, as import_chunk does, so a repeated ticket_id is caught within the chunk
+        errors += importer.check_rows(list(parsed.values()))
+
+        for e in sorted(errors, key=lambda e: e.line):
+            self.stderr.write(f'Skipping {e}')
+        invalid = {e.line for e in errors}
+        valid = [(line, row) for line, row in chunk if line not in invalid]
+        return valid, len(chunk) - len(valid)
+
+    def read_checkpoint(self, checkpoint_path, path):
+        try:
+            with open(checkpoint_path) as f:
+                checkpoint = json.load(f)
+        except FileNotFoundError:
+            return 0
+        except ValueError:
+            raise CommandError(f'{checkpoint_path} is not a valid checkpoint. Use --restart to ignore it.')
+
+        if checkpoint.get('path') != os.path.abspath(path):
+            raise CommandError(
+                f'{checkpoint_path} was written for {checkpoint.get("path")}. Use --restart to ignore it.'
+            )
+        return checkpoint['rows']
+
+    def write_checkpoint(self, checkpoint_path, path, rows):
+        temporary = f'{checkpoint_path}.tmp'
+        with open(temporary, 'w') as f:
+            json.dump({'path': os.path.abspath(path), 'rows': rows}, f)
+        os.replace(temporary, checkpoint_path)
@@ -0,0 +1,81 @@
+# Generated by Django 4.2.7 on 2026-10-17 00:49
+
+from django.db import migrations, models
+
+from carwash.search import SQLITE_FTS_TABLES, customer_search_text, ticket_search_text
+
+
+def populate_search_text(apps, schema_editor):
+    Customer = apps.get_model('carwash', 'Customer')
+    Ticket = apps.get_model('carwash', 'Ticket')
+    db_alias = schema_editor.connection.alias
+
+    customers = {}
+    batch = []
+    for customer in Customer.objects.using(db_alias).iterator(chunk_size=2000):
+        customer.search_text = customer_search_text(customer.name, customer.phone, customer.email)
+        customers[customer.id] = (customer.name, customer.phone)
+        batch.append(customer)
+        if len(batch) >= 2000:
+            Customer.objects.using(db_alias).bulk_update(batch, ['search_text'])
+            batch = []
+    Customer.objects.using(db_alias).bulk_update(batch, ['search_text'])
+
+    batch = []
+    tickets = Ticket.objects.using(db_alias).only('id', 'ticket_id', 'car_number', 'customer_id')
+    for ticket in tickets.iterator(chunk_size=2000):
+        name, phone = customers.get(ticket.customer_id, ('', ''))
+        ticket.search_text = ticket_search_text(ticket.ticket_id, ticket.car_number, name, phone)
+        batch.append(ticket)
+        if len(batch) >= 2000:
+            Ticket.objects.using(db_alias).bulk_update(batch, ['search_text'])
+            batch = []
+    Ticket.objects.using(db_alias).bulk_update(batch, ['search_text'])
+
+
+def create_trigram_indexes(apps, schema_editor):
+    # SQLite uses FTS5 tables instead, see carwash.search.install_sqlite_fts
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    schema_editor.execute(
+        'CREATE INDEX IF NOT EXISTS carwash_ticket_search_trgm '
+        'ON carwash_ticket USING gin (search_text gin_trgm_ops)'
+    )
+    schema_editor.execute(
+        'CREATE INDEX IF NOT EXISTS carwash_customer_search_trgm '
+        'ON carwash_customer USING gin (search_text gin_trgm_ops)'
+    )
+
+
+def drop_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        for fts_table in SQLITE_FTS_TABLES.values():
+            schema_editor.execute(f'DROP TABLE IF EXISTS {fts_table}')
+        return
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('DROP INDEX IF EXISTS carwash_ticket_search_trgm')
+    schema_editor.execute('DROP INDEX IF EXISTS carwash_customer_search_trgm')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('carwash', '0002_ticketsequence'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='customer',
+            name='search_text',
+            field=models.TextField(blank=True, editable=False),
+        ),
+        migrations.AddField(
+            model_name='ticket',
+            name='search_text',
+            field=models.TextField(blank=True, editable=False),
+        ),
+        migrations.RunPython(populate_search_text, migrations.RunPython.noop),
+        migrations.RunPython(create_trigram_indexes, drop_trigram_indexes),
+    ]
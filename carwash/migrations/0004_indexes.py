@@ -0,0 +1,67 @@
+# Generated by Django 4.2.7 on 2026-10-17 01:24
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def create_date_index(apps, schema_editor):
+    # Matches the SQL Django generates for created_at__date on PostgreSQL,
+    # ("created_at" AT TIME ZONE '<TIME_ZONE>')::date, so it has to be
+    # recreated if TIME_ZONE changes. SQLite passes the time zone as a
+    # query parameter, which an expression index can never match.
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(
+        'CREATE INDEX IF NOT EXISTS ticket_created_date_idx '
+        'ON carwash_ticket (((created_at AT TIME ZONE %s)::date))',
+        [settings.TIME_ZONE],
+    )
+
+
+def drop_date_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('DROP INDEX IF EXISTS ticket_created_date_idx')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('carwash', '0003_search_text'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='customer',
+            index=models.Index(fields=['name', 'id'], name='customer_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='ticket',
+            index=models.Index(fields=['-created_at', '-id'], name='ticket_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='ticket',
+            index=models.Index(fields=['status', '-created_at', '-id'], name='ticket_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='ticket',
+            index=models.Index(fields=['payment_status', '-created_at', '-id'], name='ticket_payment_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='ticket',
+            index=models.Index(fields=['service_type', '-created_at', '-id'], name='ticket_service_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='ticket',
+            index=models.Index(condition=models.Q(('status', 'under_working')), fields=['-created_at', '-id'], name='ticket_working_idx'),
+        ),
+        migrations.RunPython(create_date_index, drop_date_index),
+        # The composite index above leads with this column, so drop the
+        # single-column foreign key index once it exists
+        migrations.AlterField(
+            model_name='ticket',
+            name='service_type',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, to='carwash.servicetype'),
+        ),
+    ]
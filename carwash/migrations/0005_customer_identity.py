@@ -0,0 +1,97 @@
+# Generated by Django 4.2.7 on 2026-10-17 01:48
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+from carwash.identity import normalize_car_number, normalize_phone
+
+BATCH_SIZE = 2000
+
+
+def populate_identities(apps, schema_editor):
+    Customer = apps.get_model('carwash', 'Customer')
+    Vehicle = apps.get_model('carwash', 'Vehicle')
+    Ticket = apps.get_model('carwash', 'Ticket')
+    db_alias = schema_editor.connection.alias
+
+    batch = []
+    for customer in Customer.objects.using(db_alias).only('id', 'phone').iterator(chunk_size=BATCH_SIZE):
+        customer.phone_normalized = normalize_phone(customer.phone)
+        if customer.phone_normalized:
+            batch.append(customer)
+        if len(batch) >= BATCH_SIZE:
+            Customer.objects.using(db_alias).bulk_update(batch, ['phone_normalized'])
+            batch = []
+    Customer.objects.using(db_alias).bulk_update(batch, ['phone_normalized'])
+
+    # One vehicle per car number, with the model and customer of its latest ticket
+    tickets = Ticket.objects.using(db_alias).only('id', 'car_number', 'car_model', 'customer_id').order_by('id')
+    vehicles = {}
+    for ticket in tickets.iterator(chunk_size=BATCH_SIZE):
+        number = normalize_car_number(ticket.car_number)
+        if number:
+            car_model = ticket.car_model or vehicles.get(number, ('', None))[0]
+            vehicles[number] = (car_model, ticket.customer_id)
+    Vehicle.objects.using(db_alias).bulk_create(
+        [
+            Vehicle(car_number=number, car_model=car_model, customer_id=customer_id)
+            for number, (car_model, customer_id) in vehicles.items()
+        ],
+        batch_size=BATCH_SIZE,
+    )
+
+    vehicle_ids = dict(Vehicle.objects.using(db_alias).values_list('car_number', 'id'))
+    batch = []
+    for ticket in tickets.iterator(chunk_size=BATCH_SIZE):
+        ticket.vehicle_id = vehicle_ids.get(normalize_car_number(ticket.car_number))
+        if ticket.vehicle_id:
+            batch.append(ticket)
+        if len(batch) >= BATCH_SIZE:
+            Ticket.objects.using(db_alias).bulk_update(batch, ['vehicle'])
+            batch = []
+    Ticket.objects.using(db_alias).bulk_update(batch, ['vehicle'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('carwash', '0004_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Vehicle',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('car_number', models.CharField(max_length=20, unique=True)),
+                ('car_model', models.CharField(blank=True, max_length=100)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Vehicle',
+                'verbose_name_plural': 'Vehicles',
+                'ordering': ['car_number'],
+            },
+        ),
+        migrations.AddField(
+            model_name='customer',
+            name='phone_normalized',
+            field=models.CharField(blank=True, editable=False, max_length=15),
+        ),
+        migrations.AddField(
+            model_name='vehicle',
+            name='customer',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='carwash.customer'),
+        ),
+        migrations.AddField(
+            model_name='ticket',
+            name='vehicle',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='carwash.vehicle'),
+        ),
+        migrations.RunPython(populate_identities, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='customer',
+            index=models.Index(condition=models.Q(('phone_normalized', ''), _negated=True), fields=['phone_normalized'], name='customer_phone_idx'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 4.2.7 on 2026-10-17 01:51
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('carwash', '0005_customer_identity'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='ticket',
+            name='vehicle',
+            field=models.ForeignKey(blank=True, db_index=False, null=True, on_delete=django.db.models.deletion.SET_NULL, to='carwash.vehicle'),
+        ),
+        migrations.AddIndex(
+            model_name='ticket',
+            index=models.Index(fields=['vehicle', '-created_at', '-id'], name='ticket_vehicle_idx'),
+        ),
+    ]
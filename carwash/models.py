@@ -1,7 +1,10 @@
-from django.db import models
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import models, transaction
 from django.utils import timezone
 from django.core.validators import MinValueValidator
 from accounts.models import User
+from .identity import normalize_car_number, normalize_phone
+from .search import customer_search_text, search_tickets, ticket_search_text
 
 
 class ServiceType(models.Model):
@@ -30,16 +33,116 @@ class Customer(models.Model):
     phone = models.CharField(max_length=15, blank=True)
     email = models.EmailField(blank=True)
     address = models.TextField(blank=True)
+    search_text = models.TextField(blank=True, editable=False)
+    # Identifies the customer at ticket intake, see carwash.identity
+    phone_normalized = models.CharField(max_length=15, blank=True, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
     def __str__(self):
         return f"{self.name} ({self.phone})"
     
+    def normalize(self):
+        """Fill in the derived search and identity columns; returns whether the search text changed."""
+        search_text = customer_search_text(self.name, self.phone, self.email)
+        search_text_changed = search_text != self.search_text
+        self.search_text = search_text
+        self.phone_normalized = normalize_phone(self.phone)
+        return search_text_changed
+    
+    def save(self, *args, **kwargs):
+        search_text_changed = self.normalize() and self.pk is not None
+        
+        super().save(*args, **kwargs)
+        
+        # Tickets index the customer's name and phone as well
+        if search_text_changed:
+            self.refresh_ticket_search_text()
+    
+    def refresh_ticket_search_text(self):
+        tickets = list(self.ticket_set.only('id', 'ticket_id', 'car_number'))
+        for ticket in tickets:
+            ticket.search_text = ticket_search_text(ticket.ticket_id, ticket.car_number, self.name, self.phone)
+        Ticket.objects.bulk_update(tickets, ['search_text'], batch_size=500)
+    
     class Meta:
         verbose_name = 'Customer'
         verbose_name_plural = 'Customers'
         ordering = ['name']
+        indexes = [
+            # Customer list, paginated by (name, id)
+            models.Index(fields=['name', 'id'], name='customer_name_idx'),
+            # Ticket intake looks customers up by phone
+            models.Index(
+                fields=['phone_normalized'],
+                name='customer_phone_idx',
+                condition=~models.Q(phone_normalized=''),
+            ),
+        ]
+
+
+class Vehicle(models.Model):
+    """A car, identified by its normalized number plate (see carwash.identity)."""
+    
+    car_number = models.CharField(max_length=20, unique=True)
+    car_model = models.CharField(max_length=100, blank=True)
+    # The customer who brought it in last
+    customer = models.ForeignKey(Customer, on_delete=models.SET_NULL, null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    def __str__(self):
+        return self.car_number
+    
+    class Meta:
+        verbose_name = 'Vehicle'
+        verbose_name_plural = 'Vehicles'
+        ordering = ['car_number']
+
+
+class TicketQuerySet(models.QuerySet):
+    """Query helpers that load a ticket's related rows in the same query."""
+    
+    # Columns shown by the ticket tables (list view, author dashboard)
+    LISTING_FIELDS = (
+        'id', 'ticket_id', 'car_number', 'status', 'payment_status', 'total_amount', 'created_at',
+        'customer__id', 'customer__name', 'customer__phone',
+        'service_type__id', 'service_type__name', 'version',
+    )
+    
+    def for_listing(self):
+        return self.select_related('customer', 'service_type').only(*self.LISTING_FIELDS)
+    
+    def for_detail(self):
+        return self.select_related('customer', 'service_type', 'assigned_to')
+    
+    def for_board(self):
+        """The listing columns plus what the bay board cards and the rollups need."""
+        return self.select_related('customer', 'service_type', 'assigned_to').only(
+            *self.LISTING_FIELDS, 'completed_at', 'updated_at',
+            'assigned_to__id', 'assigned_to__username', 'assigned_to__first_name', 'assigned_to__last_name',
+        )
+    
+    def filter_listing(self, status=None, payment=None, service=None, search=None):
+        """Apply the ticket list filters; empty values are ignored."""
+        tickets = self
+        if status:
+            tickets = tickets.filter(status=status)
+        if payment:
+            tickets = tickets.filter(payment_status=payment)
+        if service:
+            tickets = tickets.filter(service_type_id=service)
+        if search:
+            tickets = search_tickets(tickets, search)
+        return tickets
+
+
+class TicketConflict(Exception):
+    """A ticket was changed by someone else since it was loaded."""
+    
+    def __init__(self, ticket_id):
+        super().__init__(f'Ticket {ticket_id} was changed by someone else')
+        self.ticket_id = ticket_id
 
 
 class Ticket(models.Model):
@@ -64,8 +167,11 @@ class Ticket(models.Model):
     car_model = models.CharField(max_length=100, blank=True)
     
     # Service and customer
-    service_type = models.ForeignKey(ServiceType, on_delete=models.CASCADE)
+    # Indexed by ticket_service_idx below
+    service_type = models.ForeignKey(ServiceType, on_delete=models.CASCADE, db_index=False)
     customer = models.ForeignKey(Customer, on_delete=models.CASCADE)
+    # Indexed by ticket_vehicle_idx below
+    vehicle = models.ForeignKey(Vehicle, on_delete=models.SET_NULL, null=True, blank=True, db_index=False)
     
     # Status and payment
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='under_working')
@@ -85,33 +191,92 @@ class Ticket(models.Model):
     assigned_to = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, 
                                    limit_choices_to={'role': 'employer'})
     
+    # Normalized ticket ID, car number and customer name/phone for search
+    search_text = models.TextField(blank=True, editable=False)
+    
+    # Bumped by every write, so a save over a stale copy fails (optimistic
+    # locking, see carwash.workflow)
+    version = models.PositiveIntegerField(default=0, editable=False)
+    
+    objects = TicketQuerySet.as_manager()
+    
     def __str__(self):
         return f"Ticket #{self.ticket_id} - {self.car_number}"
     
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Lets the daily rollups see what a save changed without a query
+        instance._loaded_values = dict(zip(field_names, values))
+        return instance
+    
+    def refresh_from_db(self, using=None, fields=None):
+        super().refresh_from_db(using, fields)
+        # The values loaded before are stale now; the rollups re-read them
+        self.__dict__.pop('_loaded_values', None)
+    
     def save(self, *args, **kwargs):
         if not self.ticket_id:
-            # Generate auto ticket ID
-            today = timezone.now().date()
-            date_str = today.strftime('%Y%m%d')
-            
-            # Get the last ticket for today
-            last_ticket = Ticket.objects.filter(
-                ticket_id__startswith=date_str
-            ).order_by('-ticket_id').first()
-            
-            if last_ticket:
-                # Extract the number and increment
-                last_number = int(last_ticket.ticket_id[-4:])
-                new_number = last_number + 1
-            else:
-                new_number = 1
-            
-            self.ticket_id = f"{date_str}{new_number:04d}"
+            # Generate auto ticket ID from the per-day sequence, before the
+            # transaction below so the counter row is not locked until it commits
+            from .sequences import next_ticket_id
+            self.ticket_id = next_ticket_id()
         
         # Calculate total amount
         self.total_amount = self.service_price + self.additional_charges
         
-        super().save(*args, **kwargs)
+        # Completion time follows the status, whoever changes it. It is
+        # stamped when the ticket becomes completed, not whenever it is
+        # missing: a completed ticket imported without one keeps none rather
+        # than a made-up wash time
+        if self.status != 'completed':
+            self.completed_at = None
+        elif self.completed_at is None and self._stored_status() != 'completed':
+            self.completed_at = timezone.now()
+        
+        # Tickets created outside carwash.intake (e.g. in the admin) join
+        # their car's history too
+        if self.vehicle_id is None and normalize_car_number(self.car_number):
+            self.vehicle, _ = Vehicle.objects.get_or_create(
+                car_number=normalize_car_number(self.car_number),
+                defaults={'car_model': self.car_model, 'customer': self.customer},
+            )
+        
+        self.search_text = ticket_search_text(
+            self.ticket_id, self.car_number, self.customer.name, self.customer.phone
+        )
+        
+        # What the save changes goes to the audit log (see carwash.audit)
+        from . import audit
+        previous = None if self._state.adding else audit.stored_values(self, kwargs.get('update_fields'))
+        
+        # The save signals update the daily rollups in the same transaction
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            audit.record_save(self, previous)
+    
+    def _stored_status(self):
+        """The status as last loaded or saved, ``None`` for a new ticket."""
+        if self._state.adding:
+            return None
+        loaded = getattr(self, '_loaded_values', None) or {}
+        if 'status' in loaded:
+            return loaded['status']
+        return Ticket.objects.filter(pk=self.pk).values_list('status', flat=True).first()
+    
+    def _do_update(self, base_qs, using, pk_val, values, update_fields, forced_update):
+        # Only write over the version this copy was loaded (or posted) with
+        version_field = self._meta.get_field('version')
+        values = [value for value in values if value[0] is not version_field]
+        values.append((version_field, None, self.version + 1))
+        updated = super()._do_update(
+            base_qs.filter(version=self.version), using, pk_val, values, update_fields, forced_update,
+        )
+        if updated:
+            self.version += 1
+        elif base_qs.filter(pk=pk_val).exists():
+            raise TicketConflict(self.ticket_id)
+        return updated
     
     @property
     def is_completed(self):
@@ -125,6 +290,103 @@ class Ticket(models.Model):
         verbose_name = 'Ticket'
         verbose_name_plural = 'Tickets'
         ordering = ['-created_at']
+        # The list views page by (-created_at, -id), so each filter gets an
+        # index that also returns its rows in that order. Lookups by
+        # created_at__date use an expression index created in migration
+        # 0004 on PostgreSQL only.
+        indexes = [
+            models.Index(fields=['-created_at', '-id'], name='ticket_created_idx'),
+            models.Index(fields=['status', '-created_at', '-id'], name='ticket_status_idx'),
+            models.Index(fields=['payment_status', '-created_at', '-id'], name='ticket_payment_idx'),
+            models.Index(fields=['service_type', '-created_at', '-id'], name='ticket_service_idx'),
+            # Open tickets (dashboard, queue) are a small, hot slice of the table
+            models.Index(
+                fields=['-created_at', '-id'],
+                name='ticket_working_idx',
+                condition=models.Q(status='under_working'),
+            ),
+            # Vehicle history, newest first
+            models.Index(fields=['vehicle', '-created_at', '-id'], name='ticket_vehicle_idx'),
+        ]
+
+
+class TicketEventBase(models.Model):
+    """An append-only record of a change to a ticket, see carwash.audit."""
+    
+    ACTION_CHOICES = [
+        ('created', 'Created'),
+        ('changed', 'Changed'),
+        ('deleted', 'Deleted'),
+    ]
+    
+    # No constraint, so the history outlives the ticket
+    ticket = models.ForeignKey(Ticket, on_delete=models.DO_NOTHING, db_constraint=False, related_name='+')
+    # The ticket's number, shown once the ticket is gone
+    ticket_number = models.CharField(max_length=20)
+    action = models.CharField(max_length=10, choices=ACTION_CHOICES)
+    # Field name -> [old value, new value]
+    changes = models.JSONField(default=dict, encoder=DjangoJSONEncoder)
+    user = models.ForeignKey(
+        User, on_delete=models.DO_NOTHING, db_constraint=False, null=True, blank=True, related_name='+',
+    )
+    # When the change was made, kept as is when the event is archived
+    created_at = models.DateTimeField(default=timezone.now)
+    
+    def __str__(self):
+        return f"Ticket #{self.ticket_number} {self.action} at {self.created_at:%Y-%m-%d %H:%M}"
+    
+    def save(self, *args, **kwargs):
+        if not self._state.adding:
+            raise ValueError('Ticket events cannot be changed')
+        super().save(*args, **kwargs)
+    
+    def delete(self, *args, **kwargs):
+        raise ValueError('Ticket events cannot be deleted')
+    
+    class Meta:
+        abstract = True
+        ordering = ['-created_at', '-id']
+
+
+class TicketEvent(TicketEventBase):
+    """Recent ticket changes, read by the ticket timelines."""
+    
+    class Meta(TicketEventBase.Meta):
+        verbose_name = 'Ticket Event'
+        verbose_name_plural = 'Ticket Events'
+        indexes = [
+            # A ticket's timeline, newest first
+            models.Index(fields=['ticket', '-created_at', '-id'], name='ticketevent_timeline_idx'),
+            # The oldest events, moved out by archive_ticket_events
+            models.Index(fields=['created_at'], name='ticketevent_created_idx'),
+        ]
+
+
+class ArchivedTicketEvent(TicketEventBase):
+    """Ticket events older than ``TICKET_EVENTS_ARCHIVE_DAYS``, moved out of the ``TicketEvent`` table."""
+    
+    class Meta(TicketEventBase.Meta):
+        verbose_name = 'Archived Ticket Event'
+        verbose_name_plural = 'Archived Ticket Events'
+        indexes = [
+            models.Index(fields=['ticket', '-created_at', '-id'], name='ticketarchive_timeline_idx'),
+        ]
+
+
+class TicketSequence(models.Model):
+    """Per-day counter backing the auto-generated ticket IDs."""
+    
+    date = models.DateField(unique=True)
+    last_value = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    def __str__(self):
+        return f"{self.date:%Y%m%d} -> {self.last_value}"
+    
+    class Meta:
+        verbose_name = 'Ticket Sequence'
+        verbose_name_plural = 'Ticket Sequences'
+        ordering = ['-date']
 
 
 class Event(models.Model):
@@ -0,0 +1,121 @@
+"""
+Indexed search for tickets and customers.
+
+Every ticket and customer keeps a normalized ``search_text`` column that is
+rebuilt on save. Searches are answered from an index over that column:
+
+* PostgreSQL: a GIN trigram index (``pg_trgm``), used by ``LIKE '%...%'``.
+* SQLite: an FTS5 table with the trigram tokenizer, kept in sync by
+  triggers that are (re)installed after every ``migrate``.
+
+Queries shorter than three characters cannot use a trigram index and fall
+back to a plain substring match on ``search_text``.
+"""
+
+from django.db import connections
+from django.db.models.expressions import RawSQL
+
+# Source table -> FTS5 table mirroring its search_text column
+SQLITE_FTS_TABLES = {
+    'carwash_ticket': 'carwash_ticket_search',
+    'carwash_customer': 'carwash_customer_search',
+}
+
+MIN_INDEXED_QUERY_LENGTH = 3
+
+
+def normalize_search_text(*parts):
+    """Lowercase and collapse whitespace so stored text and queries compare alike."""
+    return ' '.join(' '.join(str(part) for part in parts if part).casefold().split())
+
+
+def ticket_search_text(ticket_id, car_number, customer_name, customer_phone):
+    return normalize_search_text(ticket_id, car_number, customer_name, customer_phone)
+
+
+def customer_search_text(name, phone, email):
+    return normalize_search_text(name, phone, email)
+
+
+def _fts_phrase(query):
+    """Quote the query as a single FTS5 phrase so operators are not interpreted."""
+    return '"' + query.replace('"', '""') + '"'
+
+
+def _search(queryset, query):
+    query = normalize_search_text(query)
+    if not query:
+        return queryset
+
+    vendor = connections[queryset.db].vendor
+    fts_table = SQLITE_FTS_TABLES.get(queryset.model._meta.db_table)
+
+    if vendor == 'sqlite' and fts_table and len(query) >= MIN_INDEXED_QUERY_LENGTH:
+        return queryset.filter(
+            pk__in=RawSQL(f'SELECT rowid FROM {fts_table} WHERE {fts_table} MATCH %s', [_fts_phrase(query)])
+        )
+
+    # PostgreSQL answers this from the trigram index; other backends scan
+    return queryset.filter(search_text__contains=query)
+
+
+def search_tickets(queryset, query):
+    """Filter tickets by ticket ID, car number, customer name or phone."""
+    return _search(queryset, query)
+
+
+def search_customers(queryset, query):
+    """Filter customers by name, phone or email."""
+    return _search(queryset, query)
+
+
+def install_sqlite_fts(connection):
+    """
+    Create the FTS5 tables and their sync triggers on SQLite.
+
+    Safe to call repeatedly. SQLite migrations that rebuild a table drop its
+    triggers, so this runs after every ``migrate``. A newly created index is
+    populated from the existing rows.
+    """
+    if connection.vendor != 'sqlite':
+        return
+
+    with connection.cursor() as cursor:
+        existing_tables = set(connection.introspection.table_names(cursor))
+
+        for source, fts_table in SQLITE_FTS_TABLES.items():
+            if source not in existing_tables:
+                continue
+
+            if fts_table not in existing_tables:
+                cursor.execute(
+                    f"CREATE VIRTUAL TABLE {fts_table} USING fts5("
+                    f"search_text, content='{source}', content_rowid='id', tokenize='trigram')"
+                )
+                cursor.execute(f"INSERT INTO {fts_table}({fts_table}) VALUES ('rebuild')")
+
+            cursor.execute(
+                f"CREATE TRIGGER IF NOT EXISTS {fts_table}_ai AFTER INSERT ON {source} BEGIN "
+                f"INSERT INTO {fts_table}(rowid, search_text) VALUES (new.id, new.search_text); END"
+            )
+            cursor.execute(
+                f"CREATE TRIGGER IF NOT EXISTS {fts_table}_ad AFTER DELETE ON {source} BEGIN "
+                f"INSERT INTO {fts_table}({fts_table}, rowid, search_text) "
+                f"VALUES ('delete', old.id, old.search_text); END"
+            )
+            cursor.execute(
+                f"CREATE TRIGGER IF NOT EXISTS {fts_table}_au AFTER UPDATE OF search_text ON {source} "
+                f"WHEN old.search_text IS NOT new.search_text BEGIN "
+                f"INSERT INTO {fts_table}({fts_table}, rowid, search_text) "
+                f"VALUES ('delete', old.id, old.search_text); "
+                f"INSERT INTO {fts_table}(rowid, search_text) VALUES (new.id, new.search_text); END"
+            )
+
+
+def rebuild_sqlite_fts(connection):
+    """Rebuild the FTS5 tables from scratch, e.g. after raw SQL edits."""
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        for fts_table in SQLITE_FTS_TABLES.values():
+            cursor.execute(f"INSERT INTO {fts_table}({fts_table}) VALUES ('rebuild')")
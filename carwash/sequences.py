@@ -0,0 +1,103 @@
+"""
+Per-day ticket ID allocation.
+
+Ticket IDs look like ``YYYYMMDDNNNN``. Instead of scanning the tickets table
+for the highest ID of the day, each day has a ``TicketSequence`` row whose
+counter is bumped atomically. The bump locks the counter row (the whole
+database on SQLite) until the transaction it runs in commits. Called outside
+a transaction that is a short one of its own, and a rolled back ticket
+leaves a gap. Called inside one, ``atomic()`` only makes a savepoint: the
+row stays locked until the outer transaction commits, and every other
+ticket of the day waits for it. So ``Ticket.save()`` and
+``TicketImporter.import_chunk()`` (which the API batch create uses) reserve
+their IDs before opening their transaction; new callers should do the same.
+"""
+
+import threading
+
+from django.db import IntegrityError, connection, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Ticket, TicketSequence
+
+# SQLite has a single writer per database and no row locks, so concurrent
+# counters in the same process are serialized here instead of racing for
+# the write lock and failing with "database is locked".
+_sqlite_lock = threading.Lock()
+
+
+def format_ticket_id(day, number):
+    """Render a ticket ID for the given day and sequence number."""
+    return f"{day:%Y%m%d}{number:04d}"
+
+
+def _legacy_last_number(day):
+    """Highest number already used on ``day`` by tickets created before the sequence existed."""
+    date_str = day.strftime('%Y%m%d')
+    last_ticket = Ticket.objects.filter(
+        ticket_id__startswith=date_str
+    ).order_by('-ticket_id').values_list('ticket_id', flat=True).first()
+
+    if last_ticket:
+        return int(last_ticket[len(date_str):])
+    return 0
+
+
+def _ensure_sequence(day):
+    """Create the counter row for ``day`` if it does not exist yet."""
+    if TicketSequence.objects.filter(date=day).exists():
+        return
+    # Read before opening the transaction so that on SQLite the transaction
+    # starts with its write and cannot deadlock upgrading a read lock.
+    last_number = _legacy_last_number(day)
+    try:
+        with transaction.atomic():
+            TicketSequence.objects.create(date=day, last_value=last_number)
+    except IntegrityError:
+        # Another worker created it first
+        pass
+
+
+def _reserve(day, count):
+    _ensure_sequence(day)
+    with transaction.atomic():
+        # The UPDATE takes the row lock (PostgreSQL) or the write lock
+        # (SQLite) and holds it until commit, so the read below sees our own
+        # increment and nobody else's. Inside an outer transaction that is
+        # its commit, not the end of this block (see the module docstring).
+        TicketSequence.objects.filter(date=day).update(last_value=F('last_value') + count)
+        last_value = TicketSequence.objects.filter(date=day).values_list('last_value', flat=True).get()
+    return last_value - count + 1
+
+
+def reserve_ticket_numbers(count=1, day=None):
+    """
+    Reserve ``count`` consecutive sequence numbers for ``day``.
+
+    Returns the first number of the block. Bulk imports use this to grab a
+    whole block of IDs in one round-trip. Call it outside any transaction,
+    or the day's counter stays locked until that transaction commits.
+    """
+    if count < 1:
+        raise ValueError('count must be at least 1')
+
+    day = day or timezone.now().date()
+
+    if connection.vendor == 'sqlite':
+        with _sqlite_lock:
+            return _reserve(day, count)
+    return _reserve(day, count)
+
+
+def reserve_ticket_ids(count, day=None):
+    """Reserve a block of ``count`` ticket IDs and return them in order."""
+    day = day or timezone.now().date()
+    first = reserve_ticket_numbers(count, day)
+    return [format_ticket_id(day, number) for number in range(first, first + count)]
+
+
+def next_ticket_id(day=None):
+    """Allocate a single ticket ID."""
+    day = day or timezone.now().date()
+    return format_ticket_id(day, reserve_ticket_numbers(1, day))
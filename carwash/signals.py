@@ -0,0 +1,53 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from .models import Customer, ServiceType, Ticket
+from . import audit, catalog, fragments, history, live
+
+
+@receiver([post_save, post_delete], sender=ServiceType)
+def service_type_changed(sender, instance, **kwargs):
+    # After commit, so no process reloads the catalog before the change is visible
+    transaction.on_commit(catalog.invalidate)
+
+
+@receiver([post_save, post_delete], sender=Ticket)
+@receiver([post_save, post_delete], sender=Customer)
+def ticket_rows_changed(sender, instance, **kwargs):
+    # After commit, like the catalog, so no fragment of the old rows is
+    # cached under the new version
+    transaction.on_commit(fragments.invalidate_tickets)
+
+
+@receiver([post_save, post_delete], sender=Ticket)
+def vehicle_history_changed(sender, instance, **kwargs):
+    car_number = instance.car_number
+    transaction.on_commit(lambda: history.invalidate(car_number))
+
+
+@receiver(post_delete, sender=Ticket)
+def record_ticket_deleted(sender, instance, **kwargs):
+    # Saves are recorded by Ticket.save itself, deletes (also from querysets) here
+    audit.record_delete(instance)
+
+
+@receiver(pre_save, sender=Ticket)
+def remember_ticket_status(sender, instance, **kwargs):
+    if instance._state.adding:
+        instance._live_previous_status = None
+    else:
+        # from_db keeps the loaded values; a status that was not loaded
+        # counts as changed
+        instance._live_previous_status = getattr(instance, '_loaded_values', {}).get('status', '')
+
+
+@receiver(post_save, sender=Ticket)
+def publish_ticket_change(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    previous = instance.__dict__.pop('_live_previous_status', None)
+    if created or previous != instance.status:
+        event = live.ticket_event(instance, None if created else previous)
+        # Screens must not see a ticket that is then rolled back
+        transaction.on_commit(lambda: live.publish(event))
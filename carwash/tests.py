@@ -0,0 +1,77 @@
+from unittest import mock
+
+from asgiref.sync import sync_to_async
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from accounts.models import User
+from . import fragments, views
+from .models import Customer, ServiceType, Ticket
+
+
+class ConditionalPageTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user('author', password='secret', role='author')
+        service = ServiceType.objects.create(name='Basic Wash', price=100)
+        customer = Customer.objects.create(name='Conditional', phone='01700000000')
+        cls.ticket = Ticket.objects.create(
+            car_number='COND-1', service_type=service, customer=customer, service_price=100,
+        )
+
+    def setUp(self):
+        self.client.force_login(self.author)
+        self.url = reverse('carwash:ticket_list')
+        # Sets the CSRF cookie, which is part of the ETag
+        self.client.get(self.url)
+
+    def test_revalidation_of_unchanged_page(self):
+        response = self.client.get(self.url)
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+
+    def test_change_during_render_is_not_revalidated(self):
+        rows_version = views.aticket_rows_version
+
+        async def rows_version_after_change():
+            # Committed after the page version was read, before the view reads the rows
+            await Ticket.objects.filter(pk=self.ticket.pk).aupdate(
+                car_number='COND-2', updated_at=timezone.now(),
+            )
+            await sync_to_async(fragments.invalidate_tickets)()
+            return await rows_version()
+
+        with mock.patch.object(views, 'aticket_rows_version', rows_version_after_change):
+            response = self.client.get(self.url)
+        self.assertContains(response, 'COND-2')
+
+        # The page shows the change, its ETag does not: render it again
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 200)
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+
+
+class CompletedAtTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        service = ServiceType.objects.create(name='Basic Wash', price=100)
+        customer = Customer.objects.create(name='Completed', phone='01700000001')
+        cls.ticket = Ticket.objects.create(
+            car_number='DONE-1', service_type=service, customer=customer, service_price=100,
+        )
+
+    def test_stamped_when_the_ticket_becomes_completed(self):
+        ticket = Ticket.objects.get(pk=self.ticket.pk)
+        ticket.status = 'completed'
+        ticket.save()
+        self.assertIsNotNone(Ticket.objects.get(pk=ticket.pk).completed_at)
+
+    def test_completed_ticket_without_completion_time_keeps_none(self):
+        # As imported from a file without completed_at
+        Ticket.objects.filter(pk=self.ticket.pk).update(status='completed', completed_at=None)
+        ticket = Ticket.objects.get(pk=self.ticket.pk)
+        ticket.additional_charges = 20
+        ticket.save()
+        self.assertIsNone(Ticket.objects.get(pk=ticket.pk).completed_at)
@@ -5,11 +5,20 @@ app_name = 'carwash'
 
 urlpatterns = [
     path('', views.ticket_list, name='ticket_list'),
+    path('export/', views.ticket_export, name='ticket_export'),
+    path('bulk/', views.ticket_bulk_update, name='ticket_bulk_update'),
     path('create/', views.ticket_create, name='ticket_create'),
     path('preview/<int:ticket_id>/', views.ticket_preview, name='ticket_preview'),
     path('update/<int:ticket_id>/', views.ticket_update, name='ticket_update'),
+    path('timeline/<int:ticket_id>/', views.ticket_timeline, name='ticket_timeline'),
+    path('queue/', views.queue_board, name='queue_board'),
+    path('queue/events/', views.queue_events, name='queue_events'),
+    path('board/', views.ticket_board, name='ticket_board'),
+    path('board/move/<int:ticket_id>/', views.ticket_move, name='ticket_move'),
     path('customers/', views.customer_list, name='customer_list'),
+    path('customers/export/', views.customer_export, name='customer_export'),
     path('customers/create/', views.customer_create, name='customer_create'),
     path('customers/update/<int:customer_id>/', views.customer_update, name='customer_update'),
     path('get-service-price/', views.get_service_price, name='get_service_price'),
+    path('vehicle-history/', views.vehicle_history, name='vehicle_history'),
 ]
@@ -1,58 +1,91 @@
+import asyncio
+
 from django.shortcuts import render, redirect, get_object_or_404
-from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from django.core.paginator import Paginator
-from django.db.models import Q
-from django.http import JsonResponse
+from django.http import HttpResponse, JsonResponse, QueryDict
+from django.template.loader import render_to_string
+from django.urls import reverse
 from django.utils import timezone
-from .models import ServiceType, Customer, Ticket
-from .forms import CustomerForm, TicketForm, TicketUpdateForm
+from django.views.decorators.http import require_POST
+from .models import ServiceType, Customer, Ticket, TicketConflict
+from .forms import CustomerForm, TicketBulkForm, TicketForm, TicketUpdateForm, aemployer_choices, employer_choices
+from .search import search_customers
+from .catalog import aget_catalog, get_catalog
+from .fragments import aticket_rows_version
+from .history import HISTORY_LIMIT, MAX_HISTORY_LIMIT, avehicle_history
+from . import audit, workflow
+from accounts.decorators import MANAGER_ROLES, role_required
 from accounts.models import User
+from carwash_management.conditional import conditional_page, page_version
+from carwash_management.exports import export_response, export_rows
+from carwash_management.pagination import apaginate, page_rows
+from .exports import CUSTOMER_COLUMNS, TICKET_COLUMNS
+
+# Open tickets shown on the queue board
+QUEUE_BOARD_LIMIT = 100
+# Cards per column on the bay board
+BOARD_COLUMN_LIMIT = 50
+TICKETS_PER_PAGE = 20
+CUSTOMERS_PER_PAGE = 20
+
+
+def _filtered_tickets(filters):
+    """The tickets matching the ticket list ``filters`` (a QueryDict)."""
+    return Ticket.objects.filter_listing(
+        filters.get('status'),
+        filters.get('payment'),
+        filters.get('service'),
+        filters.get('search'),
+    )
+
+
+def _listed_tickets(request):
+    """The tickets matching the ticket list filters in ``request``."""
+    return _filtered_tickets(request.GET).for_listing().order_by('-created_at')
 
 
-@login_required
-def ticket_list(request):
+def _ticket_list_version(request):
+    rows, total = page_rows(request, _listed_tickets(request), TICKETS_PER_PAGE, ('-created_at', '-id'))
+    return page_version(
+        rows.values_list('id', 'updated_at', 'customer__updated_at', 'service_type__updated_at'),
+        total,
+        # The service filter options
+        get_catalog().version,
+        # The bulk assignment options
+        employer_choices(),
+    )
+
+
+@role_required(*MANAGER_ROLES, message='You do not have permission to view tickets.')
+@conditional_page(_ticket_list_version)
+async def ticket_list(request):
     """List all tickets with filtering and search."""
-    if not (request.user.is_author or request.user.is_superadmin):
-        messages.error(request, 'You do not have permission to view tickets.')
-        return redirect('accounts:dashboard')
-    
-    tickets = Ticket.objects.all().order_by('-created_at')
-    
     # Filtering
     status_filter = request.GET.get('status')
     payment_filter = request.GET.get('payment')
     service_filter = request.GET.get('service')
     search_query = request.GET.get('search')
     
-    if status_filter:
-        tickets = tickets.filter(status=status_filter)
-    
-    if payment_filter:
-        tickets = tickets.filter(payment_status=payment_filter)
+    tickets = _listed_tickets(request)
+    # Read before the tickets, see carwash.fragments
+    tickets_version = await aticket_rows_version()
     
-    if service_filter:
-        tickets = tickets.filter(service_type_id=service_filter)
-    
-    if search_query:
-        tickets = tickets.filter(
-            Q(ticket_id__icontains=search_query) |
-            Q(car_number__icontains=search_query) |
-            Q(customer__name__icontains=search_query) |
-            Q(customer__phone__icontains=search_query)
-        )
-    
-    # Pagination
-    paginator = Paginator(tickets, 20)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
-    
-    # Get filter options
-    service_types = ServiceType.objects.filter(is_active=True)
+    page_obj, catalog, employers = await asyncio.gather(
+        # Pagination
+        apaginate(request, tickets, TICKETS_PER_PAGE, ('-created_at', '-id')),
+        # Get filter options
+        aget_catalog(),
+        # Bulk assignment options
+        aemployer_choices(),
+    )
+    service_types = catalog.active
     
     context = {
         'page_obj': page_obj,
         'service_types': service_types,
+        'service_types_version': catalog.version,
+        'tickets_version': tickets_version,
+        'bulk_form': TicketBulkForm(initial={'query': request.GET.urlencode()}, employers=employers),
         'current_filters': {
             'status': status_filter,
             'payment': payment_filter,
@@ -64,13 +97,18 @@ def ticket_list(request):
     return render(request, 'carwash/ticket_list.html', context)
 
 
-@login_required
+@role_required(*MANAGER_ROLES, message='You do not have permission to export tickets.')
+def ticket_export(request):
+    """Stream the tickets matching the ticket list filters as CSV or XLSX."""
+    tickets = _filtered_tickets(request.GET).order_by('-created_at', '-id')
+    
+    header, rows = export_rows(tickets, TICKET_COLUMNS)
+    return export_response(request, f'tickets-{timezone.localdate():%Y%m%d}', header, rows, 'Tickets')
+
+
+@role_required(*MANAGER_ROLES, message='You do not have permission to create tickets.')
 def ticket_create(request):
     """Create a new ticket."""
-    if not (request.user.is_author or request.user.is_superadmin):
-        messages.error(request, 'You do not have permission to create tickets.')
-        return redirect('accounts:dashboard')
-    
     if request.method == 'POST':
         form = TicketForm(request.POST)
         if form.is_valid():
@@ -83,14 +121,48 @@ def ticket_create(request):
     return render(request, 'carwash/ticket_form.html', {'form': form, 'title': 'Create New Ticket'})
 
 
-@login_required
+@role_required(*MANAGER_ROLES, message='You do not have permission to update tickets.')
+@require_POST
+def ticket_bulk_update(request):
+    """Apply a bulk action from the ticket list, with one UPDATE per batch of tickets."""
+    form = TicketBulkForm(request.POST)
+    # Back to the list as it was filtered
+    query = request.POST.get('query', '')
+    back = reverse('carwash:ticket_list') + (f'?{query}' if query else '')
+    if not form.is_valid():
+        messages.error(request, ' '.join(error for errors in form.errors.values() for error in errors))
+        return redirect(back)
+    
+    data = form.cleaned_data
+    if data['matching']:
+        tickets = _filtered_tickets(QueryDict(query))
+    else:
+        tickets = Ticket.objects.filter(pk__in=data['tickets'])
+    
+    if data['action'] == 'assign':
+        updated = workflow.bulk_assign(tickets, data['employer'], request.user)
+    else:
+        updated = workflow.bulk_transition(tickets, *TicketBulkForm.MOVES[data['action']], request.user)
+    
+    if updated:
+        messages.success(request, f'{updated} ticket(s) updated.')
+    else:
+        messages.info(request, 'No ticket needed that change.')
+    return redirect(back)
+
+
+def _ticket_preview_version(request, ticket_id):
+    rows = list(Ticket.objects.filter(id=ticket_id).values_list(
+        'updated_at', 'customer__updated_at', 'service_type__updated_at',
+    ))
+    return page_version(rows) if rows else None
+
+
+@role_required(*MANAGER_ROLES, message='You do not have permission to view tickets.')
+@conditional_page(_ticket_preview_version)
 def ticket_preview(request, ticket_id):
     """Preview ticket before saving."""
-    if not (request.user.is_author or request.user.is_superadmin):
-        messages.error(request, 'You do not have permission to view tickets.')
-        return redirect('accounts:dashboard')
-    
-    ticket = get_object_or_404(Ticket, id=ticket_id)
+    ticket = get_object_or_404(Ticket.objects.for_detail(), id=ticket_id)
     
     if request.method == 'POST':
         if 'confirm' in request.POST:
@@ -102,49 +174,182 @@ def ticket_preview(request, ticket_id):
     return render(request, 'carwash/ticket_preview.html', {'ticket': ticket})
 
 
-@login_required
+@role_required(*MANAGER_ROLES, message='You do not have permission to update tickets.')
 def ticket_update(request, ticket_id):
     """Update ticket status and payment."""
-    if not (request.user.is_author or request.user.is_superadmin):
-        messages.error(request, 'You do not have permission to update tickets.')
-        return redirect('accounts:dashboard')
-    
-    ticket = get_object_or_404(Ticket, id=ticket_id)
+    ticket = get_object_or_404(Ticket.objects.for_detail(), id=ticket_id)
     
     if request.method == 'POST':
         form = TicketUpdateForm(request.POST, instance=ticket)
         if form.is_valid():
-            form.save()
-            messages.success(request, f'Ticket {ticket.ticket_id} updated successfully!')
-            return redirect('carwash:ticket_list')
+            try:
+                form.save()
+            except TicketConflict:
+                form.add_error('version', form.STALE_MESSAGE)
+            else:
+                messages.success(request, f'Ticket {ticket.ticket_id} updated successfully!')
+                return redirect('carwash:ticket_list')
     else:
         form = TicketUpdateForm(instance=ticket)
     
     return render(request, 'carwash/ticket_update.html', {'form': form, 'ticket': ticket})
 
 
-@login_required
-def customer_list(request):
-    """List all customers with search."""
-    if not (request.user.is_author or request.user.is_superadmin):
-        messages.error(request, 'You do not have permission to view customers.')
-        return redirect('accounts:dashboard')
+@role_required(*MANAGER_ROLES, message='You do not have permission to view tickets.')
+def ticket_timeline(request, ticket_id):
+    """Every recorded change to a ticket, newest first."""
+    ticket = get_object_or_404(Ticket.objects.only('id', 'ticket_id', 'car_number', 'created_at'), id=ticket_id)
     
-    customers = Customer.objects.all().order_by('name')
+    return render(request, 'carwash/ticket_timeline.html', {
+        'ticket': ticket,
+        'events': audit.describe(audit.timeline(ticket)),
+    })
+
+
+@role_required(*MANAGER_ROLES, message='You do not have permission to view the queue.')
+def queue_board(request):
+    """Open tickets in queue order, kept current by the live queue stream."""
+    tickets = Ticket.objects.for_listing().filter(status='under_working').order_by('created_at', 'id')
     
-    # Search
+    return render(request, 'carwash/queue_board.html', {
+        'tickets': tickets[:QUEUE_BOARD_LIMIT],
+        'limit': QUEUE_BOARD_LIMIT,
+    })
+
+
+# Column key, title and icon; a card's column follows from its state
+BOARD_COLUMNS = (
+    ('working', 'In the Bay', 'fa-car'),
+    ('unpaid', 'Awaiting Payment', 'fa-exclamation'),
+    ('paid', 'Paid', 'fa-money-bill'),
+    ('cancelled', 'Cancelled', 'fa-times'),
+)
+
+# Button label for each move
+BOARD_MOVE_LABELS = {
+    ('status', 'completed'): 'Complete',
+    ('status', 'cancelled'): 'Cancel',
+    ('payment_status', 'paid'): 'Paid',
+}
+
+
+def _board_column(status, payment_status):
+    if status == 'under_working':
+        return 'working'
+    if status == 'cancelled':
+        return 'cancelled'
+    return 'paid' if payment_status == 'paid' else 'unpaid'
+
+
+def _board_card(request, ticket):
+    """The card of ``ticket``, with the moves the workflow allows it."""
+    column = _board_column(ticket.status, ticket.payment_status)
+    moves = []
+    for field in workflow.TRANSITIONS:
+        for target in workflow.allowed_targets(field, getattr(ticket, field)):
+            state = {'status': ticket.status, 'payment_status': ticket.payment_status, field: target}
+            moves.append({
+                'field': field,
+                'to': target,
+                'label': BOARD_MOVE_LABELS[field, target],
+                # The column a card is dropped on to make this move
+                'column': _board_column(**state),
+            })
+    return {
+        'id': ticket.pk,
+        'version': ticket.version,
+        'column': column,
+        'html': render_to_string('carwash/board_card.html', {'ticket': ticket, 'moves': moves}, request),
+    }
+
+
+@role_required(*MANAGER_ROLES, message='You do not have permission to view the board.')
+def ticket_board(request):
+    """Today's tickets as cards in one column per stage, moved along the workflow."""
+    tickets = Ticket.objects.for_board()
+    today = timezone.localtime().replace(hour=0, minute=0, second=0, microsecond=0)
+    columns = {
+        # Queue order
+        'working': tickets.filter(status='under_working').order_by('created_at', 'id'),
+        # Owed from any day
+        'unpaid': tickets.filter(status='completed', payment_status='due').order_by('-created_at', '-id'),
+        'paid': tickets.filter(status='completed', payment_status='paid', created_at__gte=today)
+            .order_by('-created_at', '-id'),
+        'cancelled': tickets.filter(status='cancelled', created_at__gte=today).order_by('-created_at', '-id'),
+    }
+    
+    return render(request, 'carwash/ticket_board.html', {
+        'columns': [
+            {
+                'key': key,
+                'title': title,
+                'icon': icon,
+                'cards': [_board_card(request, ticket) for ticket in columns[key][:BOARD_COLUMN_LIMIT]],
+            }
+            for key, title, icon in BOARD_COLUMNS
+        ],
+        'limit': BOARD_COLUMN_LIMIT,
+    })
+
+
+@role_required(*MANAGER_ROLES, json=True)
+@require_POST
+def ticket_move(request, ticket_id):
+    """AJAX endpoint moving a board card one workflow step, if nobody has moved it since it was shown."""
+    try:
+        version = int(request.POST['version'])
+    except (KeyError, ValueError):
+        return JsonResponse({'error': 'version must be a number'}, status=400)
+    
+    try:
+        ticket = workflow.transition(ticket_id, request.POST.get('field', ''), request.POST.get('to', ''), version)
+    except Ticket.DoesNotExist:
+        return JsonResponse({'error': 'Ticket not found'}, status=404)
+    except workflow.TransitionNotAllowed as error:
+        return JsonResponse({'error': str(error)}, status=400)
+    except TicketConflict as conflict:
+        # Send the card as it is now, so the board can show it
+        ticket = Ticket.objects.for_board().filter(pk=ticket_id).first()
+        return JsonResponse({
+            'error': f'Ticket {conflict.ticket_id} was changed by someone else; its card has been updated.',
+            'card': _board_card(request, ticket) if ticket else None,
+        }, status=409)
+    return JsonResponse({'card': _board_card(request, ticket)})
+
+
+def queue_events(request):
+    """
+    The live queue stream is served by ``carwash.live.queue_events`` under
+    ASGI. Under WSGI this view answers instead, and the screens fall back to
+    reloading periodically.
+    """
+    return HttpResponse('Live updates need the ASGI server.', status=503, content_type='text/plain')
+
+
+def _listed_customers(request):
+    """The customers matching the customer list search in ``request``."""
+    customers = Customer.objects.all().order_by('name')
     search_query = request.GET.get('search')
     if search_query:
-        customers = customers.filter(
-            Q(name__icontains=search_query) |
-            Q(phone__icontains=search_query) |
-            Q(email__icontains=search_query)
-        )
+        customers = search_customers(customers, search_query)
+    return customers
+
+
+def _customer_list_version(request):
+    rows, total = page_rows(request, _listed_customers(request), CUSTOMERS_PER_PAGE, ('name', 'id'))
+    return page_version(rows.values_list('id', 'updated_at'), total)
+
+
+@role_required(*MANAGER_ROLES, message='You do not have permission to view customers.')
+@conditional_page(_customer_list_version)
+async def customer_list(request):
+    """List all customers with search."""
+    # Search
+    search_query = request.GET.get('search')
+    customers = _listed_customers(request)
     
     # Pagination
-    paginator = Paginator(customers, 20)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    page_obj = await apaginate(request, customers, CUSTOMERS_PER_PAGE, ('name', 'id'))
     
     context = {
         'page_obj': page_obj,
@@ -154,13 +359,23 @@ def customer_list(request):
     return render(request, 'carwash/customer_list.html', context)
 
 
-@login_required
+@role_required(*MANAGER_ROLES, message='You do not have permission to export customers.')
+def customer_export(request):
+    """Stream the customers matching the customer list search as CSV or XLSX."""
+    customers = Customer.objects.order_by('name', 'id')
+    search_query = request.GET.get('search')
+    if search_query:
+        customers = search_customers(customers, search_query)
+    
+    header, rows = export_rows(customers, CUSTOMER_COLUMNS)
+    return export_response(
+        request, f'customers-{timezone.localdate():%Y%m%d}', header, rows, 'Customers'
+    )
+
+
+@role_required(*MANAGER_ROLES, message='You do not have permission to create customers.')
 def customer_create(request):
     """Create a new customer."""
-    if not (request.user.is_author or request.user.is_superadmin):
-        messages.error(request, 'You do not have permission to create customers.')
-        return redirect('accounts:dashboard')
-    
     if request.method == 'POST':
         form = CustomerForm(request.POST)
         if form.is_valid():
@@ -173,13 +388,9 @@ def customer_create(request):
     return render(request, 'carwash/customer_form.html', {'form': form, 'title': 'Create New Customer'})
 
 
-@login_required
+@role_required(*MANAGER_ROLES, message='You do not have permission to update customers.')
 def customer_update(request, customer_id):
     """Update customer information."""
-    if not (request.user.is_author or request.user.is_superadmin):
-        messages.error(request, 'You do not have permission to update customers.')
-        return redirect('accounts:dashboard')
-    
     customer = get_object_or_404(Customer, id=customer_id)
     
     if request.method == 'POST':
@@ -194,15 +405,26 @@ def customer_update(request, customer_id):
     return render(request, 'carwash/customer_form.html', {'form': form, 'title': 'Update Customer', 'customer': customer})
 
 
-@login_required
-def get_service_price(request):
+@role_required(*MANAGER_ROLES, json=True)
+async def get_service_price(request):
     """AJAX endpoint to get service price."""
-    if not (request.user.is_author or request.user.is_superadmin):
-        return JsonResponse({'error': 'Permission denied'}, status=403)
-    
     service_id = request.GET.get('service_id')
-    try:
-        service = ServiceType.objects.get(id=service_id, is_active=True)
-        return JsonResponse({'price': float(service.price)})
-    except ServiceType.DoesNotExist:
+    service = (await aget_catalog()).get(service_id, active_only=True)
+    if service is None:
         return JsonResponse({'error': 'Service not found'}, status=404)
+    return JsonResponse({'price': float(service.price)})
+
+
+@role_required(*MANAGER_ROLES, json=True)
+async def vehicle_history(request):
+    """AJAX endpoint with the latest tickets of a car, by number plate as typed."""
+    try:
+        limit = int(request.GET.get('limit', HISTORY_LIMIT))
+    except ValueError:
+        return JsonResponse({'error': 'limit must be a number'}, status=400)
+    limit = max(1, min(limit, MAX_HISTORY_LIMIT))
+    
+    history = await avehicle_history(request.GET.get('car_number', ''), limit)
+    if history is None:
+        return JsonResponse({'error': 'Car number required'}, status=400)
+    return JsonResponse(history)
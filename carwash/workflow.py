@@ -0,0 +1,194 @@
+"""
+Ticket workflow.
+
+A ticket's status and payment status only move along ``TRANSITIONS``::
+
+    status          under_working -> completed | cancelled
+    payment_status  due -> paid
+
+:func:`transition` makes one move with a single conditional ``UPDATE``
+that matches the ticket's current state *and* its ``version``. Every write
+to a ticket bumps the version (``Ticket.save`` included, see
+``Ticket._do_update``), so when two terminals move the same card at once
+exactly one ``UPDATE`` matches and the other gets a ``TicketConflict``
+rather than overwriting it.
+
+Since the ``UPDATE`` skips ``Ticket.save`` and its signals, ``transition``
+does their work itself: it records the change in the audit log, moves the
+ticket's contribution in the daily rollups and, after the commit,
+invalidates the cached ticket rows, the car's history and the dashboard
+numbers and publishes the live queue event.
+
+:func:`bulk_transition` and :func:`bulk_assign` change many tickets at
+once (the bulk actions of the ticket list and the admin) with one
+``UPDATE`` per ``BULK_BATCH_SIZE`` tickets. They keep the rollups from the
+totals of each batch before and after its ``UPDATE`` and record one audit
+event per ticket, from the old values read when the rows are locked.
+"""
+
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from accounts.stats import invalidate_ticket_stats
+from reports import rollups
+from .models import Ticket, TicketConflict
+from . import audit, fragments, history, live
+
+# Field -> current value -> values it may move to
+TRANSITIONS = {
+    'status': {
+        'under_working': ('completed', 'cancelled'),
+    },
+    'payment_status': {
+        'due': ('paid',),
+    },
+}
+
+
+# Tickets written per UPDATE by the bulk actions
+BULK_BATCH_SIZE = 2000
+
+
+class TransitionNotAllowed(ValueError):
+    pass
+
+
+def allowed_targets(field, current):
+    return TRANSITIONS[field].get(current, ())
+
+
+def sources(field, target):
+    """The values of ``field`` that may move to ``target``."""
+    if field not in TRANSITIONS:
+        raise TransitionNotAllowed(f'{field} has no workflow')
+    values = [current for current, targets in TRANSITIONS[field].items() if target in targets]
+    if not values:
+        raise TransitionNotAllowed(f'No ticket can go to {target}')
+    return values
+
+
+def check_transition(field, current, target):
+    """Raise ``TransitionNotAllowed`` unless ``field`` may move from ``current`` to ``target``."""
+    if field not in TRANSITIONS:
+        raise TransitionNotAllowed(f'{field} has no workflow')
+    if target not in allowed_targets(field, current):
+        raise TransitionNotAllowed(f'A ticket cannot go from {current} to {target}')
+
+
+def tickets_changed(car_numbers):
+    """Invalidate what the save signals would have for tickets written with ``QuerySet.update()``."""
+    car_numbers = set(car_numbers)
+
+    def invalidate():
+        fragments.invalidate_tickets()
+        invalidate_ticket_stats()
+        for car_number in car_numbers:
+            history.invalidate(car_number)
+
+    # After the commit, so nobody caches the old rows under the new versions
+    transaction.on_commit(invalidate)
+
+
+def _rollup_values(ticket):
+    return {name: getattr(ticket, name) for name in rollups.TICKET_FIELDS}
+
+
+def transition(ticket_id, field, target, version=None):
+    """
+    Move ticket ``ticket_id`` to ``target`` in ``field`` and return it as
+    loaded by ``for_board()``, with the new values and version.
+
+    With ``version``, the move only happens if the ticket is still at that
+    version, i.e. unchanged since the caller showed it. Raises
+    ``Ticket.DoesNotExist``, ``TransitionNotAllowed`` or ``TicketConflict``.
+    """
+    if field not in TRANSITIONS:
+        raise TransitionNotAllowed(f'{field} has no workflow')
+
+    with transaction.atomic():
+        ticket = Ticket.objects.for_board().get(pk=ticket_id)
+        if version is not None and version != ticket.version:
+            raise TicketConflict(ticket.ticket_id)
+        current = getattr(ticket, field)
+        check_transition(field, current, target)
+
+        previous = _rollup_values(ticket)
+        now = timezone.now()
+        changes = {field: target, 'updated_at': now}
+        if field == 'status':
+            changes['completed_at'] = now if target == 'completed' else None
+
+        # The state and version checks make this the only write that can
+        # win; a concurrent one updates nothing
+        updated = Ticket.objects.filter(pk=ticket.pk, version=ticket.version, **{field: current}).update(
+            version=F('version') + 1, **changes,
+        )
+        if not updated:
+            raise TicketConflict(ticket.ticket_id)
+
+        audited = {name: value for name, value in changes.items() if name in audit.AUDITED_FIELDS}
+        audit.record([audit.new_event(
+            ticket.pk, ticket.ticket_id, 'changed',
+            audit.diff({name: getattr(ticket, name) for name in audited}, audited),
+        )])
+        for name, value in changes.items():
+            setattr(ticket, name, value)
+        ticket.version += 1
+
+        rollups.record_ticket_change(previous, _rollup_values(ticket))
+        tickets_changed([ticket.car_number])
+        if field == 'status':
+            event = live.ticket_event(ticket, current)
+        else:
+            event = live.ticket_event(ticket, ticket.status, event='payment')
+        transaction.on_commit(lambda: live.publish(event))
+
+    return ticket
+
+
+def _bulk_update(tickets, changes, user, now):
+    """Write ``changes`` to the tickets of the queryset ``tickets``; returns how many changed."""
+    with transaction.atomic():
+        # Locked until the commit, so the totals below see only this change
+        rows = list(
+            Ticket.objects.filter(pk__in=tickets.values('pk')).select_for_update().order_by('pk')
+            .values('pk', 'ticket_id', 'car_number', *changes)
+        )
+        for start in range(0, len(rows), BULK_BATCH_SIZE):
+            batch = rows[start:start + BULK_BATCH_SIZE]
+            batch_tickets = Ticket.objects.filter(pk__in=[row['pk'] for row in batch])
+            before = rollups.ticket_totals(batch_tickets)
+            batch_tickets.update(version=F('version') + 1, updated_at=now, **changes)
+            rollups.record_tickets_change(before, rollups.ticket_totals(batch_tickets))
+            audit.record(
+                audit.new_event(row['pk'], row['ticket_id'], 'changed', audit.diff(row, changes), user)
+                for row in batch
+            )
+
+        if rows:
+            tickets_changed(row['car_number'] for row in rows)
+            if 'status' in changes:
+                # Too many events for the queue screens; have them reload
+                transaction.on_commit(lambda: live.publish(live.RESYNC))
+    return len(rows)
+
+
+def bulk_transition(tickets, field, target, user):
+    """
+    Move the tickets of the queryset ``tickets`` that may go to ``target``
+    in ``field`` there, on behalf of ``user``; the others are left alone.
+    Returns how many moved.
+    """
+    now = timezone.now()
+    changes = {field: target}
+    if field == 'status':
+        changes['completed_at'] = now if target == 'completed' else None
+    return _bulk_update(tickets.filter(**{f'{field}__in': sources(field, target)}), changes, user, now)
+
+
+def bulk_assign(tickets, employer_id, user):
+    """Assign the tickets of the queryset ``tickets`` to the employer ``employer_id`` (or nobody); returns how many changed."""
+    return _bulk_update(
+        tickets.exclude(assigned_to_id=employer_id), {'assigned_to_id': employer_id}, user, timezone.now(),
+    )
@@ -1,11 +1,40 @@
 """
 ASGI config for carwash_management project.
+
+Everything is handled by Django except the live queue stream, which is
+served by ``carwash.live.queue_events`` directly so that each open screen
+holds a coroutine instead of a worker thread. Run it with an ASGI server,
+e.g. ``gunicorn -k uvicorn.workers.UvicornWorker carwash_management.asgi:application``.
 """
 
 import os
 
+from django.conf import settings
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'carwash_management.settings')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+# Imported once the apps are loaded
+from django.urls import reverse  # noqa: E402
+
+from carwash.live import queue_events  # noqa: E402
+from carwash_management.databases import warm_up, warn_if_persistent  # noqa: E402
+
+warn_if_persistent()
+if getattr(settings, 'DB_WARMUP', False):
+    # Requests run on other threads, so this only checks the database answers
+    warm_up(keep=False)
+
+QUEUE_EVENTS_PATH = reverse('carwash:queue_events')
+
+
+async def application(scope, receive, send):
+    path = scope.get('path', '')
+    if path.startswith(scope.get('root_path', '')):
+        path = path[len(scope.get('root_path', '')):]
+    if scope['type'] == 'http' and path == QUEUE_EVENTS_PATH:
+        await queue_events(scope, receive, send)
+    else:
+        await django_application(scope, receive, send)
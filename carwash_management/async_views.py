@@ -0,0 +1,48 @@
+"""
+Helpers for async views.
+
+Under ASGI an ``async def`` view runs on the event loop instead of holding
+a worker thread. Nothing it does there may touch the database
+synchronously, which rules out a few things sync views take for granted:
+
+* ``request.user`` is loaded lazily from the session on first access.
+  :func:`aget_user` loads it in a worker thread; after that the lazy
+  object is filled in and can be used freely.
+* Django's ``login_required`` (before 5.0) only wraps sync views. The
+  :func:`login_required` here handles both.
+* Querysets must be evaluated before the template is rendered, e.g. with
+  :func:`alist`.
+"""
+
+import asyncio
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth.decorators import login_required as sync_login_required
+from django.contrib.auth.views import redirect_to_login
+
+
+async def aget_user(request):
+    """``request.user``, loaded from the session without blocking the event loop."""
+    await sync_to_async(getattr)(request.user, 'is_authenticated')
+    return request.user
+
+
+def login_required(view_func):
+    """``django.contrib.auth.decorators.login_required`` for sync and async views."""
+    if not asyncio.iscoroutinefunction(view_func):
+        return sync_login_required(view_func)
+
+    @wraps(view_func)
+    async def wrapper(request, *args, **kwargs):
+        user = await aget_user(request)
+        if not user.is_authenticated:
+            return redirect_to_login(request.get_full_path())
+        return await view_func(request, *args, **kwargs)
+
+    return wrapper
+
+
+async def alist(queryset):
+    """Evaluate ``queryset`` with async iteration."""
+    return [obj async for obj in queryset]
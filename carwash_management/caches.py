@@ -0,0 +1,69 @@
+"""
+Cache backend selection from a single ``CACHE_URL`` setting.
+
+Supported URLs::
+
+    locmem://[name]          per-process memory (default)
+    file:///path/to/dir      shared between processes on one host
+    redis://host:port/db     shared between hosts (needs the ``redis`` package)
+    rediss://...             Redis over TLS
+    dummy://                 caching disabled
+"""
+
+from urllib.parse import urlsplit
+
+from django.core.exceptions import ImproperlyConfigured
+
+DEFAULT_TIMEOUT = 300
+KEY_PREFIX = 'carwash'
+
+
+def parse_cache_url(url, timeout=DEFAULT_TIMEOUT):
+    """Return a ``CACHES`` dict for ``url``."""
+    parts = urlsplit(url)
+    scheme = parts.scheme.lower()
+
+    if scheme == 'locmem':
+        backend = {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': parts.netloc or 'carwash',
+        }
+    elif scheme == 'file':
+        if not parts.path:
+            raise ImproperlyConfigured('CACHE_URL file:// needs a directory, e.g. file:///var/tmp/carwash_cache')
+        backend = {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': parts.path,
+        }
+    elif scheme in ('redis', 'rediss'):
+        backend = {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': url,
+        }
+    elif scheme == 'dummy':
+        backend = {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}
+    else:
+        raise ImproperlyConfigured(f"Unsupported CACHE_URL scheme '{scheme}'")
+
+    backend.update({'TIMEOUT': timeout, 'KEY_PREFIX': KEY_PREFIX})
+    return {'default': backend}
+
+
+def check_shared_backends(workers, cache_url, live_queue_url):
+    """
+    Refuse to start several worker processes that would each keep their own
+    cache and live queue: cache invalidations (service catalog, ticket rows,
+    dashboard numbers, signed-in principals) and queue events would then
+    only reach the process that made them.
+    """
+    if workers <= 1:
+        return
+    if urlsplit(cache_url).scheme.lower() not in ('redis', 'rediss', 'file'):
+        raise ImproperlyConfigured(
+            f'WEB_CONCURRENCY={workers} needs a CACHE_URL every worker shares (redis:// or file://), '
+            f"not '{cache_url}'"
+        )
+    if urlsplit(live_queue_url).scheme.lower() not in ('redis', 'rediss'):
+        raise ImproperlyConfigured(
+            f"WEB_CONCURRENCY={workers} needs a redis:// LIVE_QUEUE_URL, not '{live_queue_url}'"
+        )
@@ -0,0 +1,132 @@
+"""
+Conditional GET for the HTML list and detail pages.
+
+A view decorated with :func:`conditional_page` sends an ``ETag`` and a
+``Last-Modified`` header derived from a cheap *version* of the data the
+page shows: the ids and ``updated_at`` of its rows (read with a narrow
+query over the same index the page uses), the total it displays, its
+filter parameters and who is looking. When the browser revalidates its copy
+and the version still matches, an empty ``304 Not Modified`` is returned
+without running the view, so the page query and the template rendering are
+both skipped.
+
+The version is read *before* the view runs, on every request, as
+``carwash.fragments`` does for cached fragments: a change committed while
+the page renders makes the page newer than its ``ETag``, so the next
+revalidation fails and the page is rendered again. Read after the view, the
+new version could be sent with the old page and every later revalidation
+would get a ``304`` for it.
+
+Pages are sent with ``Cache-Control: private, no-cache``: browsers keep them
+but revalidate before every reuse, so nothing stale is ever shown.
+"""
+
+import asyncio
+import calendar
+import datetime
+import hashlib
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.contrib.messages import get_messages
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag
+
+
+def page_version(rows, *extra):
+    """
+    Version of a page showing ``rows`` (tuples of ids and modification
+    times) plus anything else in ``extra`` that it displays. The latest
+    modification time in ``rows`` becomes its ``Last-Modified``.
+    """
+    rows = list(rows)
+    stamps = [value for row in rows for value in row if isinstance(value, datetime.datetime)]
+    return (rows, extra), max(stamps, default=None)
+
+
+def _is_revalidation(request):
+    return 'HTTP_IF_NONE_MATCH' in request.META or 'HTTP_IF_MODIFIED_SINCE' in request.META
+
+
+def _validators(request, version_func, args, kwargs):
+    """``(etag, last_modified timestamp)`` for the page, or ``None`` if it must be rendered."""
+    # A page carrying a flash message is never reused
+    if request.method not in ('GET', 'HEAD') or len(get_messages(request)):
+        return None
+    version = version_func(request, *args, **kwargs)
+    if version is None:
+        return None
+    parts, last_modified = version
+    user = request.user
+    key = repr((
+        parts,
+        request.get_full_path(),
+        user.pk,
+        user.role,
+        # Pages embed the CSRF token, which changes when it is rotated
+        request.META.get('CSRF_COOKIE'),
+    ))
+    etag = quote_etag(hashlib.md5(key.encode()).hexdigest())
+    if last_modified is not None:
+        last_modified = calendar.timegm(last_modified.utctimetuple())
+    return etag, last_modified
+
+
+def _not_modified(request, validators):
+    if validators is None:
+        return None
+    etag, last_modified = validators
+    return get_conditional_response(request, etag=etag, last_modified=last_modified)
+
+
+def _set_validators(response, validators):
+    if validators is None or response.status_code != 200:
+        return response
+    etag, last_modified = validators
+    response.headers.setdefault('ETag', etag)
+    if last_modified is not None:
+        response.headers.setdefault('Last-Modified', http_date(last_modified))
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+
+def conditional_page(version_func):
+    """
+    Answer revalidations of the decorated view with ``304 Not Modified``
+    while ``version_func(request, *args, **kwargs)`` is unchanged.
+
+    ``version_func`` returns ``(parts, last_modified)``, usually through
+    :func:`page_version`, or ``None`` for a page that cannot be versioned.
+    It is called before the view for every ``GET`` and ``HEAD``; its result
+    is only used for pages the view rendered successfully, so it does not
+    need to check permissions itself. Apply the decorator inside
+    ``login_required``.
+    """
+    def decorator(view_func):
+        if asyncio.iscoroutinefunction(view_func):
+            validators_for = sync_to_async(_validators)
+
+            @wraps(view_func)
+            async def wrapper(request, *args, **kwargs):
+                # Before the view, see the module docstring
+                validators = await validators_for(request, version_func, args, kwargs)
+                if _is_revalidation(request):
+                    not_modified = _not_modified(request, validators)
+                    if not_modified is not None:
+                        return not_modified
+                response = await view_func(request, *args, **kwargs)
+                return _set_validators(response, validators)
+        else:
+            @wraps(view_func)
+            def wrapper(request, *args, **kwargs):
+                # Before the view, see the module docstring
+                validators = _validators(request, version_func, args, kwargs)
+                if _is_revalidation(request):
+                    not_modified = _not_modified(request, validators)
+                    if not_modified is not None:
+                        return not_modified
+                response = view_func(request, *args, **kwargs)
+                return _set_validators(response, validators)
+
+        return wrapper
+    return decorator
@@ -0,0 +1,85 @@
+"""
+PostgreSQL connection settings, chosen with a single ``DB_POOL`` setting.
+
+Supported modes::
+
+    off          a new connection for every request (Django's default)
+    persistent   every worker thread keeps its connection for DB_CONN_MAX_AGE
+                 seconds and checks it is alive before reusing it
+    pgbouncer    connect through PgBouncer in transaction pooling mode: each
+                 request opens a cheap connection to the local pooler, which
+                 keeps the connections to PostgreSQL open
+
+Persistent connections belong to the thread that opened them. Under ASGI,
+Django runs the synchronous code of every request in a thread of its own,
+so they are never reused and pile up until they are garbage collected. Use
+``pgbouncer`` with the uvicorn workers of ``deploy.sh`` and ``persistent``
+with sync or threaded WSGI workers. Django 4.2 has no pool of its own (the
+psycopg 3 pool is supported from Django 5.1).
+"""
+
+import logging
+
+from django.core.exceptions import ImproperlyConfigured
+from django.db import DatabaseError, connections
+
+logger = logging.getLogger(__name__)
+
+POOL_MODES = ('off', 'persistent', 'pgbouncer')
+DEFAULT_CONN_MAX_AGE = 300
+DEFAULT_CONNECT_TIMEOUT = 5
+
+
+def database_settings(name, user, password, host, port, pool='off', conn_max_age=DEFAULT_CONN_MAX_AGE,
+                      connect_timeout=DEFAULT_CONNECT_TIMEOUT):
+    """Return a ``DATABASES`` dict for PostgreSQL that reuses connections as ``pool`` says."""
+    pool = pool.lower()
+    if pool not in POOL_MODES:
+        raise ImproperlyConfigured(f"Unsupported DB_POOL '{pool}', expected one of {', '.join(POOL_MODES)}")
+
+    database = {
+        'ENGINE': 'django.db.backends.postgresql',
+        'NAME': name,
+        'USER': user,
+        'PASSWORD': password,
+        'HOST': host,
+        'PORT': port,
+        'OPTIONS': {'connect_timeout': connect_timeout},
+    }
+    if pool == 'persistent':
+        database.update({'CONN_MAX_AGE': conn_max_age, 'CONN_HEALTH_CHECKS': True})
+    elif pool == 'pgbouncer':
+        # Server-side cursors outlive the transaction PgBouncer lends a
+        # server connection for. Streamed exports then fetch their rows in
+        # one go instead of in chunks.
+        database.update({'CONN_MAX_AGE': 0, 'DISABLE_SERVER_SIDE_CURSORS': True})
+    return {'default': database}
+
+
+def warm_up(keep=True):
+    """
+    Connect to every database at worker startup instead of on the first
+    request, and report one that cannot be reached.
+
+    The connections are kept for the requests of this thread when ``keep``
+    is true and they are persistent; otherwise they are closed again and the
+    warm-up only proves the database (or PgBouncer) answers.
+    """
+    for connection in connections.all():
+        try:
+            connection.ensure_connection()
+        except DatabaseError:
+            logger.exception('Could not connect to the %s database at startup', connection.alias)
+            continue
+        if not keep or not connection.settings_dict['CONN_MAX_AGE']:
+            connection.close()
+
+
+def warn_if_persistent():
+    """Log the databases whose persistent connections ASGI requests would never reuse."""
+    for alias in connections:
+        if connections.settings[alias].get('CONN_MAX_AGE'):
+            logger.warning(
+                'The %s database has CONN_MAX_AGE set, but ASGI requests do not reuse connections; '
+                'use DB_POOL=pgbouncer instead', alias,
+            )
@@ -0,0 +1,326 @@
+"""
+Keyset (cursor) pagination for the list views.
+
+``django.core.paginator.Paginator`` runs ``COUNT(*)`` on every request and
+pages with ``OFFSET``, which gets slower the deeper you go. Keyset
+pagination instead remembers the sort key of the last row on the page and
+asks for rows after it, which an index on the sort key answers directly.
+
+List views call :func:`paginate`, which uses keyset pagination when
+``settings.KEYSET_PAGINATION`` is on or the request already carries a
+``cursor`` parameter, and falls back to the regular paginator otherwise.
+Async views call :func:`apaginate`, which returns the same pages with the
+rows and the count already fetched.
+"""
+
+import asyncio
+import base64
+import datetime
+import decimal
+import hashlib
+import json
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import Q
+from django.http import QueryDict
+
+CURSOR_PARAM = 'cursor'
+COUNT_CACHE_TIMEOUT = 60
+
+
+def _encode_value(value):
+    if isinstance(value, (datetime.datetime, datetime.date)):
+        return value.isoformat()
+    if isinstance(value, decimal.Decimal):
+        return str(value)
+    return value
+
+
+def _estimated_count(queryset):
+    """The planner's row estimate for an unfiltered PostgreSQL table, or ``None``."""
+    connection = connections[queryset.db]
+    if connection.vendor != 'postgresql' or queryset.query.where:
+        return None
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT reltuples::bigint FROM pg_class WHERE relname = %s',
+            [queryset.model._meta.db_table],
+        )
+        row = cursor.fetchone()
+    if row and row[0] >= 0:
+        return row[0]
+    return None
+
+
+def _count_key(queryset):
+    sql, params = queryset.query.sql_with_params()
+    return 'pagination:count:' + hashlib.md5(f'{sql}|{params}'.encode()).hexdigest()
+
+
+def cached_count(queryset, timeout=COUNT_CACHE_TIMEOUT):
+    """
+    Row count for ``queryset``, cached for ``timeout`` seconds.
+
+    Unfiltered PostgreSQL tables use the planner's row estimate instead of
+    counting.
+    """
+    count = _estimated_count(queryset)
+    if count is not None:
+        return count
+
+    key = _count_key(queryset)
+    count = cache.get(key)
+    if count is None:
+        count = queryset.count()
+        cache.set(key, count, timeout)
+    return count
+
+
+async def acached_count(queryset, timeout=COUNT_CACHE_TIMEOUT):
+    """Async :func:`cached_count`."""
+    if connections[queryset.db].vendor == 'postgresql':
+        count = await sync_to_async(_estimated_count)(queryset)
+        if count is not None:
+            return count
+
+    key = _count_key(queryset)
+    count = await cache.aget(key)
+    if count is None:
+        count = await queryset.acount()
+        await cache.aset(key, count, timeout)
+    return count
+
+
+class KeysetPage:
+    """One page of a keyset-paginated queryset; mirrors the parts of ``Page`` the templates use."""
+
+    is_keyset = True
+
+    def __init__(self, object_list, paginator, has_next, has_previous, next_cursor, previous_cursor):
+        self.object_list = object_list
+        self.paginator = paginator
+        self._has_next = has_next
+        self._has_previous = has_previous
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+        self.base_params = None
+        self._count = None
+
+    def __repr__(self):
+        return f'<KeysetPage of {len(self.object_list)} rows>'
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def has_next(self):
+        return self._has_next
+
+    def has_previous(self):
+        return self._has_previous
+
+    def has_other_pages(self):
+        return self._has_next or self._has_previous
+
+    @property
+    def count(self):
+        """Total rows (approximate or cached), or ``None`` if counting is disabled."""
+        if self.paginator.count_timeout is None:
+            return None
+        if self._count is None:
+            self._count = cached_count(self.paginator.queryset, self.paginator.count_timeout)
+        return self._count
+
+    def _querystring(self, cursor):
+        params = self.base_params.copy() if self.base_params is not None else QueryDict(mutable=True)
+        params.pop('page', None)
+        params.pop(CURSOR_PARAM, None)
+        params[CURSOR_PARAM] = cursor
+        return params.urlencode()
+
+    @property
+    def first_querystring(self):
+        return self._querystring(self.paginator.first_cursor)
+
+    @property
+    def last_querystring(self):
+        return self._querystring(self.paginator.last_cursor)
+
+    @property
+    def next_querystring(self):
+        return self._querystring(self.next_cursor)
+
+    @property
+    def previous_querystring(self):
+        return self._querystring(self.previous_cursor)
+
+
+class KeysetPaginator:
+    """
+    Paginate ``queryset`` by the model fields in ``ordering``.
+
+    ``ordering`` must end with a unique field (normally ``id``) so that every
+    row has a distinct position, e.g. ``('-created_at', '-id')``.
+    """
+
+    def __init__(self, queryset, per_page, ordering, count_timeout=COUNT_CACHE_TIMEOUT):
+        self.queryset = queryset
+        self.per_page = int(per_page)
+        self.fields = [(name.lstrip('-'), name.startswith('-')) for name in ordering]
+        self.count_timeout = count_timeout
+        self._model_fields = [queryset.model._meta.get_field(name) for name, _ in self.fields]
+
+    def _ordering(self, reverse=False):
+        return [
+            f"{'-' if descending != reverse else ''}{name}"
+            for name, descending in self.fields
+        ]
+
+    def values_for(self, obj):
+        return [_encode_value(getattr(obj, field.attname)) for field in self._model_fields]
+
+    def encode_cursor(self, direction, values):
+        payload = json.dumps([direction, values], separators=(',', ':'))
+        return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+    def decode_cursor(self, cursor):
+        """Return ``(direction, values)`` or ``None`` for a missing or malformed cursor."""
+        if not cursor:
+            return None
+        try:
+            padded = cursor + '=' * (-len(cursor) % 4)
+            direction, values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+            if direction not in ('n', 'p'):
+                return None
+            if values is not None:
+                if len(values) != len(self._model_fields):
+                    return None
+                values = [field.to_python(value) for field, value in zip(self._model_fields, values)]
+            return direction, values
+        except (ValueError, TypeError, ValidationError):
+            return None
+
+    @property
+    def first_cursor(self):
+        return self.encode_cursor('n', None)
+
+    @property
+    def last_cursor(self):
+        return self.encode_cursor('p', None)
+
+    def after(self, values, reverse=False):
+        """Rows strictly after ``values`` in the (possibly reversed) ordering."""
+        condition = Q()
+        for index, (name, descending) in enumerate(self.fields):
+            lookup = 'lt' if descending != reverse else 'gt'
+            clause = Q(**{f'{name}__{lookup}': values[index]})
+            for previous_index in range(index):
+                clause &= Q(**{self.fields[previous_index][0]: values[previous_index]})
+            condition |= clause
+        return condition
+
+    def _page_queryset(self, decoded):
+        """The rows to fetch for a decoded cursor: one more than a page, to tell if there is another."""
+        limit = self.per_page + 1
+        if decoded is None or decoded[0] == 'n':
+            queryset = self.queryset
+            if decoded is not None and decoded[1] is not None:
+                queryset = queryset.filter(self.after(decoded[1]))
+            return queryset.order_by(*self._ordering())[:limit]
+
+        queryset = self.queryset
+        if decoded[1] is not None:
+            queryset = queryset.filter(self.after(decoded[1], reverse=True))
+        return queryset.order_by(*self._ordering(reverse=True))[:limit]
+
+    def page_rows(self, cursor=None):
+        """The unevaluated queryset ``get_page(cursor)`` reads its rows from."""
+        return self._page_queryset(self.decode_cursor(cursor))
+
+    def get_page(self, cursor=None):
+        decoded = self.decode_cursor(cursor)
+        return self._build_page(decoded, list(self._page_queryset(decoded)))
+
+    async def aget_page(self, cursor=None):
+        decoded = self.decode_cursor(cursor)
+        return self._build_page(decoded, [obj async for obj in self._page_queryset(decoded)])
+
+    def _build_page(self, decoded, rows):
+        if decoded is None or decoded[0] == 'n':
+            has_previous, has_next = decoded is not None and decoded[1] is not None, len(rows) > self.per_page
+            rows = rows[:self.per_page]
+        else:
+            has_previous, has_next = len(rows) > self.per_page, decoded[1] is not None
+            rows = rows[:self.per_page][::-1]
+
+        next_cursor = self.encode_cursor('n', self.values_for(rows[-1])) if has_next and rows else None
+        previous_cursor = self.encode_cursor('p', self.values_for(rows[0])) if has_previous and rows else None
+        return KeysetPage(rows, self, has_next, has_previous, next_cursor, previous_cursor)
+
+
+def use_keyset(request):
+    return getattr(settings, 'KEYSET_PAGINATION', False) or CURSOR_PARAM in request.GET
+
+
+def paginate(request, queryset, per_page, ordering):
+    """Return the requested page of ``queryset`` for a list view."""
+    if use_keyset(request):
+        page = KeysetPaginator(queryset, per_page, ordering).get_page(request.GET.get(CURSOR_PARAM))
+        page.base_params = request.GET
+        return page
+
+    paginator = Paginator(queryset, per_page)
+    return paginator.get_page(request.GET.get('page'))
+
+
+def page_rows(request, queryset, per_page, ordering):
+    """
+    The rows :func:`paginate` would show for ``request``, as an unevaluated
+    queryset, and the total the page would display. Lets a page be
+    versioned (see ``carwash_management.conditional``) without being built.
+    """
+    if use_keyset(request):
+        paginator = KeysetPaginator(queryset, per_page, ordering)
+        return paginator.page_rows(request.GET.get(CURSOR_PARAM)), cached_count(queryset, paginator.count_timeout)
+
+    page = Paginator(queryset, per_page).get_page(request.GET.get('page'))
+    return page.object_list, page.paginator.count
+
+
+def _offset_page(queryset, per_page, number):
+    page = Paginator(queryset, per_page).get_page(number)
+    page.object_list = list(page.object_list)
+    return page
+
+
+async def apaginate(request, queryset, per_page, ordering):
+    """
+    Async :func:`paginate`. The page's rows and its count are fetched
+    before it is returned (together, for keyset pages), so rendering it
+    needs no database access.
+    """
+    if not use_keyset(request):
+        return await sync_to_async(_offset_page)(queryset, per_page, request.GET.get('page'))
+
+    paginator = KeysetPaginator(queryset, per_page, ordering)
+    cursor = request.GET.get(CURSOR_PARAM)
+    if paginator.count_timeout is None:
+        page = await paginator.aget_page(cursor)
+    else:
+        page, page_count = await asyncio.gather(
+            paginator.aget_page(cursor),
+            acached_count(queryset, paginator.count_timeout),
+        )
+        page._count = page_count
+    page.base_params = request.GET
+    return page
@@ -0,0 +1,43 @@
+"""
+Session storage selection from a single ``SESSION_STORE`` setting.
+
+Supported stores::
+
+    db              a django_session row read on every request (Django's default)
+    cached_db       read from the cache and written through to the database;
+                    needs a cache every worker shares (file:// or redis://),
+                    otherwise a worker keeps serving a session another one
+                    has logged out
+    signed_cookies  the whole session in a signed cookie, nothing stored on
+                    the server; a copied cookie stays valid until it expires
+                    or the user's password changes
+    auto            cached_db with a shared CACHE_URL, db otherwise (default)
+
+Expired ``db`` and ``cached_db`` rows are removed by the
+``clear_expired_sessions`` command.
+"""
+
+from urllib.parse import urlsplit
+
+from django.core.exceptions import ImproperlyConfigured
+
+ENGINES = {
+    'db': 'django.contrib.sessions.backends.db',
+    'cached_db': 'django.contrib.sessions.backends.cached_db',
+    'signed_cookies': 'django.contrib.sessions.backends.signed_cookies',
+}
+
+# Caches (see carwash_management.caches) that every worker process sees
+SHARED_CACHE_SCHEMES = ('file', 'redis', 'rediss')
+
+
+def session_engine(store, cache_url):
+    """Return the ``SESSION_ENGINE`` for ``store``, given the ``CACHE_URL`` in use."""
+    store = store.lower()
+    if store == 'auto':
+        store = 'cached_db' if urlsplit(cache_url).scheme.lower() in SHARED_CACHE_SCHEMES else 'db'
+    if store not in ENGINES:
+        raise ImproperlyConfigured(
+            f"Unsupported SESSION_STORE '{store}', expected auto or one of {', '.join(ENGINES)}"
+        )
+    return ENGINES[store]
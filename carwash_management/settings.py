@@ -5,6 +5,9 @@ Django settings for carwash_management project.
 import os
 from pathlib import Path
 
+from .caches import parse_cache_url
+from .sessions import session_engine
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -32,6 +35,7 @@ LOCAL_APPS = [
     'attendance',
     'requests',
     'reports',
+    'api',
 ]
 
 INSTALLED_APPS = DJANGO_APPS + LOCAL_APPS
@@ -41,8 +45,11 @@ MIDDLEWARE = [
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
-    'django.contrib.auth.middleware.AuthenticationMiddleware',
+    # request.user from the principal cached in the session (accounts.principal)
+    'accounts.principal.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
+    # Writes the ticket events of a request in one insert (carwash.audit)
+    'carwash.audit.AuditMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
@@ -74,6 +81,13 @@ DATABASES = {
     }
 }
 
+# Cache (locmem://, file:///path, redis://host:port/db)
+CACHE_URL = os.environ.get('CACHE_URL', 'locmem://')
+CACHES = parse_cache_url(CACHE_URL)
+
+# Live queue broker: memory:// (one process) or redis://host:port/db
+LIVE_QUEUE_URL = os.environ.get('LIVE_QUEUE_URL', 'memory://')
+
 # Custom User Model
 AUTH_USER_MODEL = 'accounts.User'
 
@@ -122,6 +136,18 @@ LOGOUT_REDIRECT_URL = '/accounts/login/'
 EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'
 
 # Session settings
+# Where sessions live: auto, db, cached_db or signed_cookies; see
+# carwash_management/sessions.py
+SESSION_ENGINE = session_engine(os.environ.get('SESSION_STORE', 'auto'), CACHE_URL)
 SESSION_COOKIE_AGE = 86400  # 24 hours
 SESSION_EXPIRE_AT_BROWSER_CLOSE = True
 
+# Days ticket audit events stay in the table the timelines read before
+# archive_ticket_events moves them to the archive
+TICKET_EVENTS_ARCHIVE_DAYS = 365
+
+# Pagination: cursor-based paging for list views (avoids COUNT(*) and OFFSET)
+KEYSET_PAGINATION = False
+
+# Connect when a worker starts instead of on its first request
+DB_WARMUP = False
@@ -6,6 +6,10 @@ import os
 from pathlib import Path
 from decouple import config
 
+from .caches import check_shared_backends, parse_cache_url
+from .databases import DEFAULT_CONN_MAX_AGE, database_settings
+from .sessions import session_engine
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -33,6 +37,7 @@ LOCAL_APPS = [
     'attendance',
     'requests',
     'reports',
+    'api',
 ]
 
 INSTALLED_APPS = DJANGO_APPS + LOCAL_APPS
@@ -43,8 +48,11 @@ MIDDLEWARE = [
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
-    'django.contrib.auth.middleware.AuthenticationMiddleware',
+    # request.user from the principal cached in the session (accounts.principal)
+    'accounts.principal.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
+    # Writes the ticket events of a request in one insert (carwash.audit)
+    'carwash.audit.AuditMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
@@ -54,7 +62,6 @@ TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
         'DIRS': [BASE_DIR / 'templates'],
-        'APP_DIRS': True,
         'OPTIONS': {
             'context_processors': [
                 'django.template.context_processors.debug',
@@ -62,6 +69,13 @@ TEMPLATES = [
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
             ],
+            # Templates are parsed once per process; restart to pick up changes
+            'loaders': [
+                ('django.template.loaders.cached.Loader', [
+                    'django.template.loaders.filesystem.Loader',
+                    'django.template.loaders.app_directories.Loader',
+                ]),
+            ],
         },
     },
 ]
@@ -69,16 +83,35 @@ TEMPLATES = [
 WSGI_APPLICATION = 'carwash_management.wsgi.application'
 
 # Database
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.postgresql',
-        'NAME': config('DB_NAME', default='carwash_db'),
-        'USER': config('DB_USER', default='postgres'),
-        'PASSWORD': config('DB_PASSWORD', default=''),
-        'HOST': config('DB_HOST', default='localhost'),
-        'PORT': config('DB_PORT', default='5432'),
-    }
-}
+# Connection reuse: off, persistent (WSGI workers) or pgbouncer (ASGI
+# workers); see carwash_management/databases.py
+DATABASES = database_settings(
+    name=config('DB_NAME', default='carwash_db'),
+    user=config('DB_USER', default='postgres'),
+    password=config('DB_PASSWORD', default=''),
+    host=config('DB_HOST', default='localhost'),
+    port=config('DB_PORT', default='5432'),
+    pool=config('DB_POOL', default='off'),
+    conn_max_age=config('DB_CONN_MAX_AGE', default=DEFAULT_CONN_MAX_AGE, cast=int),
+    connect_timeout=config('DB_CONNECT_TIMEOUT', default=5, cast=int),
+)
+
+# Connect when a worker starts instead of on its first request
+DB_WARMUP = config('DB_WARMUP', default=True, cast=bool)
+
+# Cache (locmem://, file:///path, redis://host:port/db)
+# Use a shared backend (file or Redis) when running several workers so
+# invalidations reach every process.
+CACHE_URL = config('CACHE_URL', default='locmem://')
+CACHES = parse_cache_url(CACHE_URL, timeout=config('CACHE_TIMEOUT', default=300, cast=int))
+
+# Live queue broker: memory:// (one process) or redis://host:port/db
+LIVE_QUEUE_URL = config('LIVE_QUEUE_URL', default='memory://')
+
+# Worker processes, also read by gunicorn. More than one needs a shared cache
+# (Redis or file://) and a Redis live queue, or the settings refuse to load.
+WEB_CONCURRENCY = config('WEB_CONCURRENCY', default=1, cast=int)
+check_shared_backends(WEB_CONCURRENCY, CACHE_URL, LIVE_QUEUE_URL)
 
 # Custom User Model
 AUTH_USER_MODEL = 'accounts.User'
@@ -136,11 +169,21 @@ EMAIL_HOST_USER = config('EMAIL_HOST_USER', default='')
 EMAIL_HOST_PASSWORD = config('EMAIL_HOST_PASSWORD', default='')
 
 # Session settings
+# Where sessions live: auto, db, cached_db or signed_cookies; see
+# carwash_management/sessions.py
+SESSION_ENGINE = session_engine(config('SESSION_STORE', default='auto'), CACHE_URL)
 SESSION_COOKIE_AGE = 86400  # 24 hours
 SESSION_EXPIRE_AT_BROWSER_CLOSE = True
 SESSION_COOKIE_SECURE = True
 CSRF_COOKIE_SECURE = True
 
+# Days ticket audit events stay in the table the timelines read before
+# archive_ticket_events moves them to the archive
+TICKET_EVENTS_ARCHIVE_DAYS = config('TICKET_EVENTS_ARCHIVE_DAYS', default=365, cast=int)
+
+# Pagination: cursor-based paging for list views (avoids COUNT(*) and OFFSET)
+KEYSET_PAGINATION = config('KEYSET_PAGINATION', default=True, cast=bool)
+
 # Security settings
 SECURE_BROWSER_XSS_FILTER = True
 SECURE_CONTENT_TYPE_NOSNIFF = True
@@ -18,6 +18,7 @@ urlpatterns = [
     path('attendance/', include('attendance.urls')),
     path('requests/', include('requests.urls')),
     path('reports/', include('reports.urls')),
+    path('api/', include('api.urls')),
 ]
 
 if settings.DEBUG:
@@ -4,8 +4,16 @@ WSGI config for carwash_management project.
 
 import os
 
+from django.conf import settings
 from django.core.wsgi import get_wsgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'carwash_management.settings')
 
 application = get_wsgi_application()
+
+if getattr(settings, 'DB_WARMUP', False):
+    from carwash_management.databases import warm_up
+
+    # Sync workers serve their requests on this thread, so a persistent
+    # connection opened now is the one the first request uses
+    warm_up()
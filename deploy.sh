@@ -47,7 +47,8 @@ sudo apt update && sudo apt upgrade -y
 
 # Install required packages
 print_status "Installing required packages..."
-sudo apt install -y python3 python3-pip python3-venv postgresql postgresql-contrib nginx git curl
+sudo apt install -y python3 python3-pip python3-venv postgresql postgresql-contrib nginx git curl redis-server
+sudo systemctl enable --now redis-server
 
 # Create application user
 if ! id "$APP_USER" &>/dev/null; then
@@ -92,6 +93,11 @@ sudo -u $APP_USER sed -i "s/your-very-long-random-secret-key-here-change-this-in
 # Update domain in .env
 sudo -u $APP_USER sed -i "s/yourdomain.com/$DOMAIN/" $APP_DIR/.env
 
+# The workers share the cache and the live queue through Redis; with
+# several workers the settings refuse to load without them
+sudo -u $APP_USER sed -i "s|^# CACHE_URL=redis://.*|CACHE_URL=redis://localhost:6379/1|" $APP_DIR/.env
+sudo -u $APP_USER sed -i "s|^# LIVE_QUEUE_URL=redis://.*|LIVE_QUEUE_URL=redis://localhost:6379/2|" $APP_DIR/.env
+
 # Run Django setup
 print_status "Setting up Django application..."
 sudo -u $APP_USER bash -c "cd $APP_DIR && source venv/bin/activate && export DJANGO_SETTINGS_MODULE=carwash_management.settings_production && python manage.py makemigrations"
@@ -112,7 +118,8 @@ print_status "Creating Gunicorn service..."
 sudo tee /etc/systemd/system/$APP_NAME.service > /dev/null <<EOF
 [Unit]
 Description=Car Wash Management Gunicorn daemon
-After=network.target
+After=network.target redis-server.service
+Requires=redis-server.service
 
 [Service]
 User=$APP_USER
@@ -120,7 +127,9 @@ Group=www-data
 WorkingDirectory=$APP_DIR
 Environment="PATH=$APP_DIR/venv/bin"
 Environment="DJANGO_SETTINGS_MODULE=carwash_management.settings_production"
-ExecStart=$APP_DIR/venv/bin/gunicorn --workers 3 --bind unix:$APP_DIR/$APP_NAME.sock carwash_management.wsgi:application
+# Worker count for gunicorn and the settings, which check the workers share Redis
+Environment="WEB_CONCURRENCY=3"
+ExecStart=$APP_DIR/venv/bin/gunicorn --worker-class uvicorn.workers.UvicornWorker --bind unix:$APP_DIR/$APP_NAME.sock carwash_management.asgi:application
 ExecReload=/bin/kill -s HUP \$MAINPID
 Restart=on-failure
 
@@ -207,6 +216,8 @@ sudo chmod +x $APP_DIR/backup.sh
 # Setup cron jobs
 print_status "Setting up cron jobs..."
 sudo -u $APP_USER crontab -l 2>/dev/null | { cat; echo "0 2 * * * $APP_DIR/backup.sh"; } | sudo -u $APP_USER crontab -
+# Expired sessions, deleted in small batches every hour
+sudo -u $APP_USER crontab -l 2>/dev/null | { cat; echo "15 * * * * cd $APP_DIR && DJANGO_SETTINGS_MODULE=carwash_management.settings_production venv/bin/python manage.py clear_expired_sessions >/dev/null"; } | sudo -u $APP_USER crontab -
 
 # Create health check script
 print_status "Creating health check script..."
@@ -0,0 +1,107 @@
+"""
+Revenue and throughput figures for the reports pages.
+
+The figures are read from the daily rollups (``DailyTicketSummary``, see
+``reports.rollups``) rather than from tickets, so every function runs one
+``GROUP BY`` over at most a few rows per day in the range and the cost
+does not depend on how many tickets there are. Days are local dates.
+"""
+
+import datetime
+from decimal import Decimal
+
+from django.db.models import DecimalField, F, Sum, Value
+from django.db.models.functions import Coalesce, TruncMonth, TruncWeek
+
+from carwash.models import Ticket
+from .models import DailyTicketSummary
+
+PERIODS = {
+    'day': None,
+    'week': TruncWeek,
+    'month': TruncMonth,
+}
+
+
+def _count(field):
+    return Coalesce(Sum(field), 0)
+
+
+def _amount(field):
+    return Coalesce(Sum(field), Value(Decimal('0')), output_field=DecimalField())
+
+
+def _revenue_columns():
+    return {
+        'tickets': _count('tickets'),
+        'revenue': _amount('revenue'),
+        'paid': _amount('paid_revenue'),
+        'paid_tickets': _count('paid_tickets'),
+        'washes': _count('washes'),
+        'wash_seconds': _count('wash_seconds'),
+    }
+
+
+def _finish(row):
+    """Derive the due amount and average wash duration from the summed columns."""
+    row['due'] = row['revenue'] - row['paid']
+    washes, wash_seconds = row.pop('washes'), row.pop('wash_seconds')
+    row['wash_duration'] = datetime.timedelta(seconds=wash_seconds / washes) if washes else None
+    return row
+
+
+def summaries_between(start, end):
+    """Summary rows for the local dates ``start`` through ``end`` (inclusive)."""
+    return DailyTicketSummary.objects.filter(date__range=(start, end))
+
+
+def summary(summaries):
+    """Ticket count, revenue split by payment status, average ticket value and wash duration."""
+    totals = _finish(summaries.aggregate(**_revenue_columns()))
+    totals['average_ticket'] = totals['revenue'] / totals['tickets'] if totals['tickets'] else None
+    return totals
+
+
+def revenue_by_period(summaries, period='day'):
+    """Revenue per day, week (starting Monday) or month, oldest first."""
+    truncate = PERIODS[period]
+    rows = (
+        summaries.annotate(period=truncate('date') if truncate else F('date'))
+        .values('period')
+        .annotate(**_revenue_columns())
+        .order_by('period')
+    )
+    return [_finish(row) for row in rows]
+
+
+def revenue_by_service_type(summaries):
+    rows = (
+        summaries.values('service_type_id', 'service_type__name')
+        .annotate(**_revenue_columns())
+        .order_by('-revenue')
+    )
+    return [_finish(row) for row in rows]
+
+
+def revenue_by_payment_status(summaries):
+    totals = summaries.aggregate(**_revenue_columns())
+    labels = dict(Ticket.PAYMENT_STATUS_CHOICES)
+    rows = [
+        {'payment_status': 'paid', 'tickets': totals['paid_tickets'], 'revenue': totals['paid']},
+        {
+            'payment_status': 'due',
+            'tickets': totals['tickets'] - totals['paid_tickets'],
+            'revenue': totals['revenue'] - totals['paid'],
+        },
+    ]
+    return [{**row, 'label': labels[row['payment_status']]} for row in rows if row['tickets']]
+
+
+def revenue_by_employer(summaries):
+    """Revenue and wash time per assigned employer (``employer_id`` is ``None`` for unassigned tickets)."""
+    rows = (
+        summaries.values('employer_id', 'employer__username', 'employer__first_name', 'employer__last_name')
+        .annotate(**_revenue_columns())
+        .order_by('-revenue')
+    )
+    return [_finish(row) for row in rows]
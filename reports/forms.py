@@ -0,0 +1,41 @@
+import datetime
+
+from django import forms
+from django.utils import timezone
+
+from .analytics import PERIODS
+
+DEFAULT_RANGE_DAYS = 30
+MAX_RANGE_DAYS = 3 * 366
+
+
+class ReportFilterForm(forms.Form):
+    """Date range and grouping period for the revenue report."""
+    
+    start = forms.DateField(required=False, widget=forms.DateInput(attrs={'class': 'form-control', 'type': 'date'}))
+    end = forms.DateField(required=False, widget=forms.DateInput(attrs={'class': 'form-control', 'type': 'date'}))
+    period = forms.ChoiceField(
+        required=False,
+        choices=[(period, period.title()) for period in PERIODS],
+        widget=forms.Select(attrs={'class': 'form-control'}),
+    )
+    
+    def clean(self):
+        cleaned_data = super().clean()
+        end = cleaned_data.get('end') or timezone.localdate()
+        start = cleaned_data.get('start') or end - datetime.timedelta(days=DEFAULT_RANGE_DAYS - 1)
+        
+        if start > end:
+            raise forms.ValidationError('The start date must not be after the end date.')
+        if (end - start).days >= MAX_RANGE_DAYS:
+            raise forms.ValidationError(f'Reports cover at most {MAX_RANGE_DAYS} days.')
+        
+        cleaned_data.update(start=start, end=end, period=cleaned_data.get('period') or 'day')
+        return cleaned_data
+    
+    def get_range(self):
+        """The requested ``(start, end, period)``, or the default range if the input is invalid."""
+        if self.is_valid():
+            return self.cleaned_data['start'], self.cleaned_data['end'], self.cleaned_data['period']
+        end = timezone.localdate()
+        return end - datetime.timedelta(days=DEFAULT_RANGE_DAYS - 1), end, 'day'
@@ -0,0 +1,79 @@
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from accounts.models import User
+from carwash.management.benchmarking import new_tag, remove_seeded, seed_tickets
+from carwash.models import Ticket
+from reports import analytics, rollups
+
+
+class Command(BaseCommand):
+    help = 'Seed a year of tickets and time each report query, a rollup rebuild and the full report page'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=365, help='Days of history to seed')
+        parser.add_argument('--per-day', type=int, default=300, help='Tickets per day')
+        parser.add_argument('--repeat', type=int, default=10, help='Timed runs per measurement')
+        parser.add_argument('--keep', action='store_true', help='Keep the seeded rows')
+
+    def handle(self, *args, **options):
+        tag = new_tag()
+        days = options['days']
+        tickets = days * options['per_day']
+
+        try:
+            seed_tickets(tag, tickets, max(1, tickets // 20), stdout=self.stdout, days=days)
+
+            end = timezone.localdate()
+            start = end - timezone.timedelta(days=days - 1)
+            summaries = analytics.summaries_between(start, end)
+            self.stdout.write(
+                f'{Ticket.objects.filter(created_at__date__range=(start, end)).count()} tickets in '
+                f'{summaries.count()} summary rows between {start} and {end}'
+            )
+
+            measurements = [
+                ('summary', lambda: analytics.summary(summaries)),
+                ('by day', lambda: analytics.revenue_by_period(summaries, 'day')),
+                ('by week', lambda: analytics.revenue_by_period(summaries, 'week')),
+                ('by month', lambda: analytics.revenue_by_period(summaries, 'month')),
+                ('by service type', lambda: analytics.revenue_by_service_type(summaries)),
+                ('by payment status', lambda: analytics.revenue_by_payment_status(summaries)),
+                ('by employer', lambda: analytics.revenue_by_employer(summaries)),
+                # What every report query cost before the rollups: one pass over the tickets
+                ('rebuild one day', lambda: rollups.rebuild_ticket_days(end, end)),
+                ('rebuild whole range', lambda: rollups.rebuild_ticket_days(start, end)),
+            ]
+
+            client = Client()
+            client.force_login(User.objects.filter(role='author').first())
+            url = reverse('reports:revenue_report')
+            query = {'start': start.isoformat(), 'end': end.isoformat()}
+            for period in analytics.PERIODS:
+                measurements.append((f'page ({period})', lambda period=period: client.get(url, {**query, 'period': period})))
+
+            for label, run in measurements:
+                self.measure(label, run, options['repeat'])
+        finally:
+            if not options['keep']:
+                self.stdout.write('Removing seeded rows...')
+                remove_seeded(tag)
+
+    def measure(self, label, run, repeat):
+        run()  # warm up
+        timings = []
+        for _ in range(repeat):
+            with CaptureQueriesContext(connection) as context:
+                started = time.perf_counter()
+                run()
+                timings.append((time.perf_counter() - started) * 1000)
+        self.stdout.write(
+            f'  {label:<20} {len(context.captured_queries):3} queries   {statistics.median(timings):8.1f} ms'
+        )
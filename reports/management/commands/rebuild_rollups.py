@@ -0,0 +1,68 @@
+import datetime
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from attendance.models import EmployerAttendance
+from reports.rollups import rebuild_attendance_days, rebuild_ticket_days, ticket_date_range
+
+
+def rebuild_shard(start, end):
+    try:
+        return rebuild_ticket_days(start, end), rebuild_attendance_days(start, end)
+    finally:
+        # Each worker thread has its own connection
+        connection.close()
+
+
+class Command(BaseCommand):
+    help = 'Recompute the daily ticket and attendance summaries from the raw rows, in parallel date shards'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--start', type=datetime.date.fromisoformat, help='First date (default: oldest data)')
+        parser.add_argument('--end', type=datetime.date.fromisoformat, help='Last date (default: newest data)')
+        parser.add_argument('--shard-days', type=int, default=31, help='Days rebuilt per transaction')
+        parser.add_argument('--workers', type=int, default=4, help='Shards rebuilt concurrently')
+
+    def handle(self, *args, **options):
+        start, end = options['start'], options['end']
+        if start is None or end is None:
+            ticket_days = ticket_date_range()
+            attendance_days = EmployerAttendance.objects.dates('date', 'day')
+            candidates = [day for day in (*(ticket_days or ()), attendance_days.first(), attendance_days.last()) if day]
+            if not candidates:
+                self.stdout.write('Nothing to rebuild.')
+                return
+            start = start or min(candidates)
+            end = end or max(candidates)
+        if start > end:
+            raise CommandError('--start must not be after --end.')
+
+        shards = []
+        shard_start = start
+        while shard_start <= end:
+            shard_end = min(end, shard_start + datetime.timedelta(days=options['shard_days'] - 1))
+            shards.append((shard_start, shard_end))
+            shard_start = shard_end + datetime.timedelta(days=1)
+
+        # SQLite has a single writer, so parallel shards would only wait on each other
+        workers = 1 if connection.vendor == 'sqlite' else max(1, options['workers'])
+        self.stdout.write(f'Rebuilding {start} to {end} in {len(shards)} shard(s) with {workers} worker(s)...')
+
+        started = time.perf_counter()
+        ticket_rows = attendance_rows = 0
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = {executor.submit(rebuild_shard, *shard): shard for shard in shards}
+            for future in as_completed(futures):
+                tickets, attendance = future.result()
+                ticket_rows += tickets
+                attendance_rows += attendance
+                shard_start, shard_end = futures[future]
+                self.stdout.write(f'  {shard_start} to {shard_end}: {tickets} ticket rows, {attendance} attendance rows')
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Rebuilt {ticket_rows} ticket and {attendance_rows} attendance summary rows '
+            f'in {time.perf_counter() - started:.1f}s'
+        ))
@@ -0,0 +1,57 @@
+# Generated by Django 4.2.7 on 2026-10-17 01:19
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('carwash', '0003_search_text'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyAttendanceSummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(unique=True)),
+                ('worked', models.IntegerField(default=0)),
+                ('missed', models.IntegerField(default=0)),
+                ('leave', models.IntegerField(default=0)),
+                ('half_day', models.IntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'Daily Attendance Summary',
+                'verbose_name_plural': 'Daily Attendance Summaries',
+                'ordering': ['-date'],
+            },
+        ),
+        migrations.CreateModel(
+            name='DailyTicketSummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('tickets', models.IntegerField(default=0)),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('paid_tickets', models.IntegerField(default=0)),
+                ('paid_revenue', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('completed', models.IntegerField(default=0)),
+                ('cancelled', models.IntegerField(default=0)),
+                ('washes', models.IntegerField(default=0)),
+                ('wash_seconds', models.BigIntegerField(default=0)),
+                ('employer', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL)),
+                ('service_type', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='carwash.servicetype')),
+            ],
+            options={
+                'verbose_name': 'Daily Ticket Summary',
+                'verbose_name_plural': 'Daily Ticket Summaries',
+                'ordering': ['-date'],
+                'unique_together': {('date', 'service_type', 'employer')},
+            },
+        ),
+    ]
@@ -0,0 +1,31 @@
+from django.db import migrations
+
+from reports.rollups import rebuild_attendance_days, rebuild_ticket_days, ticket_date_range
+
+
+def backfill_rollups(apps, schema_editor):
+    Ticket = apps.get_model('carwash', 'Ticket')
+    EmployerAttendance = apps.get_model('attendance', 'EmployerAttendance')
+    DailyTicketSummary = apps.get_model('reports', 'DailyTicketSummary')
+    DailyAttendanceSummary = apps.get_model('reports', 'DailyAttendanceSummary')
+    db_alias = schema_editor.connection.alias
+
+    days = ticket_date_range(Ticket, db_alias)
+    if days:
+        rebuild_ticket_days(*days, Ticket, DailyTicketSummary, db_alias)
+
+    dates = EmployerAttendance.objects.using(db_alias).dates('date', 'day')
+    if dates:
+        rebuild_attendance_days(dates.first(), dates.last(), EmployerAttendance, DailyAttendanceSummary, db_alias)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reports', '0001_initial'),
+        ('attendance', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_rollups, migrations.RunPython.noop),
+    ]
@@ -1,2 +1,55 @@
-# Reports app models - can be extended later for analytics
-# For now, we'll use the existing models from other apps
+from django.db import models
+from accounts.models import User
+from carwash.models import ServiceType
+
+
+class DailyTicketSummary(models.Model):
+    """
+    Ticket totals per local day, service type and assigned employer.
+    
+    Kept up to date by ``reports.rollups`` whenever a ticket is created,
+    changed or deleted, so reports and dashboards sum a few rows per day
+    instead of scanning tickets.
+    """
+    
+    date = models.DateField()
+    service_type = models.ForeignKey(ServiceType, on_delete=models.CASCADE)
+    employer = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True)
+    
+    tickets = models.IntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    paid_tickets = models.IntegerField(default=0)
+    paid_revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    completed = models.IntegerField(default=0)
+    cancelled = models.IntegerField(default=0)
+    
+    # Tickets with a completion time, and the sum of their wash durations
+    washes = models.IntegerField(default=0)
+    wash_seconds = models.BigIntegerField(default=0)
+    
+    def __str__(self):
+        return f"{self.date} {self.service_type_id}/{self.employer_id}: {self.tickets} tickets"
+    
+    class Meta:
+        verbose_name = 'Daily Ticket Summary'
+        verbose_name_plural = 'Daily Ticket Summaries'
+        ordering = ['-date']
+        unique_together = ('date', 'service_type', 'employer')
+
+
+class DailyAttendanceSummary(models.Model):
+    """Attendance records per day, counted by status."""
+    
+    date = models.DateField(unique=True)
+    worked = models.IntegerField(default=0)
+    missed = models.IntegerField(default=0)
+    leave = models.IntegerField(default=0)
+    half_day = models.IntegerField(default=0)
+    
+    def __str__(self):
+        return f"{self.date}: {self.worked} worked, {self.missed} missed"
+    
+    class Meta:
+        verbose_name = 'Daily Attendance Summary'
+        verbose_name_plural = 'Daily Attendance Summaries'
+        ordering = ['-date']
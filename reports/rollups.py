@@ -0,0 +1,252 @@
+"""
+Incremental maintenance of the daily summary tables.
+
+Every ticket contributes to exactly one ``DailyTicketSummary`` row (its
+local creation date, service type and assigned employer). When a ticket is
+saved, the signal handlers in ``reports.signals`` subtract what its old
+state contributed and add what its new state contributes, inside the
+ticket's own transaction; attendance records work the same way against
+``DailyAttendanceSummary``. Writes that bypass ``save()``, such as
+``bulk_create`` or ``QuerySet.update()``, must call ``add_tickets``,
+apply the ``ticket_totals`` taken around the update with
+``record_tickets_change`` or rebuild the affected days with
+``rebuild_ticket_days``.
+"""
+
+import datetime
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import IntegrityError, connections, transaction
+from django.db.models import Count, DurationField, ExpressionWrapper, F, Max, Min, Q, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from attendance.models import EmployerAttendance
+from carwash.models import Ticket
+from .models import DailyAttendanceSummary, DailyTicketSummary
+
+# Ticket fields (attnames) a ticket's contribution depends on
+TICKET_FIELDS = (
+    'created_at', 'service_type_id', 'assigned_to_id', 'status', 'payment_status', 'total_amount', 'completed_at',
+)
+ATTENDANCE_FIELDS = ('date', 'status')
+
+TICKET_MEASURES = (
+    'tickets', 'revenue', 'paid_tickets', 'paid_revenue', 'completed', 'cancelled', 'washes', 'wash_seconds',
+)
+ATTENDANCE_MEASURES = ('worked', 'missed', 'leave', 'half_day')
+
+
+def ticket_contribution(values):
+    """The summary key and measures of one ticket, from its field values by attname."""
+    created_at = values['created_at']
+    completed_at = values['completed_at']
+    amount = values['total_amount']
+    paid = values['payment_status'] == 'paid'
+
+    key = (timezone.localdate(created_at), values['service_type_id'], values['assigned_to_id'])
+    measures = {
+        'tickets': 1,
+        'revenue': amount,
+        'paid_tickets': int(paid),
+        'paid_revenue': amount if paid else Decimal('0'),
+        'completed': int(values['status'] == 'completed'),
+        'cancelled': int(values['status'] == 'cancelled'),
+        'washes': int(completed_at is not None),
+        'wash_seconds': int((completed_at - created_at).total_seconds()) if completed_at is not None else 0,
+    }
+    return key, measures
+
+
+def attendance_contribution(values):
+    return values['date'], {status: int(values['status'] == status) for status in ATTENDANCE_MEASURES}
+
+
+def _accumulate(deltas, key, measures, sign):
+    totals = deltas[key]
+    for name, value in measures.items():
+        totals[name] = totals.get(name, 0) + sign * value
+
+
+def _apply(model, key, delta):
+    """Add ``delta`` to the summary row for ``key``, creating the row if needed."""
+    changes = {name: F(name) + value for name, value in delta.items() if value}
+    if not changes:
+        return
+
+    # Rows with no employer are not covered by the unique constraint (NULLs
+    # are distinct), so always update a single row
+    rows = model.objects.filter(**key)
+    if model.objects.filter(pk__in=rows.order_by('pk').values('pk')[:1]).update(**changes):
+        return
+    try:
+        with transaction.atomic():
+            model.objects.create(**key, **delta)
+    except IntegrityError:
+        # Created concurrently
+        model.objects.filter(pk__in=rows.order_by('pk').values('pk')[:1]).update(**changes)
+
+
+def _ticket_key(key):
+    date, service_type_id, employer_id = key
+    return {'date': date, 'service_type_id': service_type_id, 'employer_id': employer_id}
+
+
+def record_ticket_change(old, new):
+    """
+    Move a ticket's contribution from its ``old`` field values to its ``new``
+    ones. Either may be ``None``, for a created or deleted ticket.
+    """
+    deltas = defaultdict(dict)
+    if old is not None:
+        _accumulate(deltas, *ticket_contribution(old), -1)
+    if new is not None:
+        _accumulate(deltas, *ticket_contribution(new), 1)
+    for key, delta in deltas.items():
+        _apply(DailyTicketSummary, _ticket_key(key), delta)
+
+
+def add_tickets(tickets):
+    """Add newly bulk-created tickets, with one write per summary row they touch."""
+    deltas = defaultdict(dict)
+    for ticket in tickets:
+        _accumulate(deltas, *ticket_contribution({name: getattr(ticket, name) for name in TICKET_FIELDS}), 1)
+    for key, delta in deltas.items():
+        _apply(DailyTicketSummary, _ticket_key(key), delta)
+
+
+def record_attendance_change(old, new):
+    deltas = defaultdict(dict)
+    if old is not None:
+        _accumulate(deltas, *attendance_contribution(old), -1)
+    if new is not None:
+        _accumulate(deltas, *attendance_contribution(new), 1)
+    for date, delta in deltas.items():
+        _apply(DailyAttendanceSummary, {'date': date}, delta)
+
+
+def _day_bounds(start, end):
+    zone = timezone.get_current_timezone()
+    return (
+        datetime.datetime.combine(start, datetime.time.min, zone),
+        datetime.datetime.combine(end + datetime.timedelta(days=1), datetime.time.min, zone),
+    )
+
+
+def ticket_date_range(ticket_model=Ticket, using='default'):
+    """First and last local creation date of any ticket, or ``None``."""
+    bounds = ticket_model.objects.using(using).aggregate(first=Min('created_at'), last=Max('created_at'))
+    if bounds['first'] is None:
+        return None
+    return timezone.localdate(bounds['first']), timezone.localdate(bounds['last'])
+
+
+def _ticket_groups(tickets):
+    """The summary measures of ``tickets`` per (local date, service type, employer), in one query."""
+    wash = ExpressionWrapper(F('completed_at') - F('created_at'), output_field=DurationField())
+    groups = (
+        tickets.annotate(day=TruncDate('created_at', tzinfo=timezone.get_current_timezone()))
+        .values('day', 'service_type_id', 'assigned_to_id')
+        .annotate(
+            tickets=Count('id'),
+            revenue=Sum('total_amount'),
+            paid_tickets=Count('id', filter=Q(payment_status='paid')),
+            paid_revenue=Sum('total_amount', filter=Q(payment_status='paid')),
+            completed=Count('id', filter=Q(status='completed')),
+            cancelled=Count('id', filter=Q(status='cancelled')),
+            washes=Count('id', filter=Q(completed_at__isnull=False)),
+            wash_time=Sum(wash, filter=Q(completed_at__isnull=False)),
+        )
+        .order_by()
+    )
+    for group in groups:
+        key = (group['day'], group['service_type_id'], group['assigned_to_id'])
+        yield key, {
+            'tickets': group['tickets'],
+            'revenue': group['revenue'] or 0,
+            'paid_tickets': group['paid_tickets'],
+            'paid_revenue': group['paid_revenue'] or 0,
+            'completed': group['completed'],
+            'cancelled': group['cancelled'],
+            'washes': group['washes'],
+            'wash_seconds': int(group['wash_time'].total_seconds()) if group['wash_time'] else 0,
+        }
+
+
+def ticket_totals(tickets):
+    """What the tickets of the queryset ``tickets`` contribute to the summaries, by summary key."""
+    return dict(_ticket_groups(tickets))
+
+
+def record_tickets_change(before, after):
+    """
+    Apply the difference between two ``ticket_totals`` of the same tickets,
+    taken before and after writing them with ``QuerySet.update()``.
+    """
+    deltas = defaultdict(dict)
+    for key, measures in before.items():
+        _accumulate(deltas, key, measures, -1)
+    for key, measures in after.items():
+        _accumulate(deltas, key, measures, 1)
+    for key, delta in deltas.items():
+        _apply(DailyTicketSummary, _ticket_key(key), delta)
+
+
+def _lock_summaries(summary_model, start, end, using):
+    """
+    Hold off incremental writes to the summaries of ``start`` through ``end``
+    until the rebuild commits, so none lands between reading the source rows
+    and rewriting the summaries and gets lost.
+    """
+    connection = connections[using]
+    if connection.vendor == 'postgresql':
+        # Locking the day rows would still let a write that creates a new row
+        # through; plain reads of the table go on
+        table = connection.ops.quote_name(summary_model._meta.db_table)
+        with connection.cursor() as cursor:
+            cursor.execute(f'LOCK TABLE {table} IN EXCLUSIVE MODE')
+    else:
+        # On SQLite the transaction's read stops other writers committing
+        # first (FOR UPDATE is left out there)
+        list(summary_model.objects.using(using).filter(date__range=(start, end)).select_for_update().values('pk'))
+
+
+def rebuild_ticket_days(start, end, ticket_model=Ticket, summary_model=DailyTicketSummary, using='default'):
+    """
+    Recompute the ticket summaries for the local dates ``start`` through
+    ``end`` from the tickets, in one transaction that incremental updates
+    wait for. The model arguments let migrations pass their historical
+    models.
+    """
+    lower, upper = _day_bounds(start, end)
+    tickets = ticket_model.objects.using(using).filter(created_at__gte=lower, created_at__lt=upper)
+
+    with transaction.atomic(using=using):
+        _lock_summaries(summary_model, start, end, using)
+        summaries = [
+            summary_model(**_ticket_key(key), **measures)
+            for key, measures in _ticket_groups(tickets)
+        ]
+        summary_model.objects.using(using).filter(date__range=(start, end)).delete()
+        summary_model.objects.using(using).bulk_create(summaries, batch_size=1000)
+    return len(summaries)
+
+
+def rebuild_attendance_days(start, end, attendance_model=EmployerAttendance,
+                            summary_model=DailyAttendanceSummary, using='default'):
+    """Recompute the attendance summaries for ``start`` through ``end`` from the attendance records."""
+    groups = (
+        attendance_model.objects.using(using).filter(date__range=(start, end))
+        .values('date')
+        .annotate(**{status: Count('id', filter=Q(status=status)) for status in ATTENDANCE_MEASURES})
+        .order_by()
+    )
+
+    with transaction.atomic(using=using):
+        # See rebuild_ticket_days
+        _lock_summaries(summary_model, start, end, using)
+        summaries = [summary_model(**group) for group in groups]
+        summary_model.objects.using(using).filter(date__range=(start, end)).delete()
+        summary_model.objects.using(using).bulk_create(summaries, batch_size=1000)
+    return len(summaries)
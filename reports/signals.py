@@ -0,0 +1,60 @@
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from attendance.models import EmployerAttendance
+from carwash.models import Ticket
+from . import rollups
+
+TRACKED_FIELDS = {
+    Ticket: rollups.TICKET_FIELDS,
+    EmployerAttendance: rollups.ATTENDANCE_FIELDS,
+}
+
+RECORDERS = {
+    Ticket: rollups.record_ticket_change,
+    EmployerAttendance: rollups.record_attendance_change,
+}
+
+
+def _current_values(instance):
+    return {name: getattr(instance, name) for name in TRACKED_FIELDS[type(instance)]}
+
+
+def _stored_values(instance, use_loaded=True):
+    """The tracked fields as they are in the database, from the values loaded with the instance if possible."""
+    fields = TRACKED_FIELDS[type(instance)]
+    loaded = getattr(instance, '_loaded_values', None) if use_loaded else None
+    if loaded is not None and all(name in loaded for name in fields):
+        return {name: loaded[name] for name in fields}
+    return type(instance).objects.filter(pk=instance.pk).values(*fields).first()
+
+
+@receiver(pre_save, sender=Ticket)
+@receiver(pre_save, sender=EmployerAttendance)
+def remember_stored_values(sender, instance, **kwargs):
+    # A ticket save only succeeds over the version it was loaded with (see
+    # Ticket._do_update), so the loaded values are still the stored ones
+    instance._rollup_previous = None if instance._state.adding else _stored_values(instance)
+
+
+@receiver(pre_delete, sender=Ticket)
+@receiver(pre_delete, sender=EmployerAttendance)
+def remember_deleted_values(sender, instance, **kwargs):
+    # Deletes are not version checked and may come from a stale copy
+    instance._rollup_previous = _stored_values(instance, use_loaded=False)
+
+
+@receiver(post_save, sender=Ticket)
+@receiver(post_save, sender=EmployerAttendance)
+def update_rollups_on_save(sender, instance, **kwargs):
+    current = _current_values(instance)
+    RECORDERS[sender](instance.__dict__.pop('_rollup_previous', None), current)
+    instance._loaded_values = {**getattr(instance, '_loaded_values', {}), **current}
+
+
+@receiver(post_delete, sender=Ticket)
+@receiver(post_delete, sender=EmployerAttendance)
+def update_rollups_on_delete(sender, instance, **kwargs):
+    previous = instance.__dict__.pop('_rollup_previous', None)
+    if previous is not None:
+        RECORDERS[sender](previous, None)
@@ -4,5 +4,5 @@ from . import views
 app_name = 'reports'
 
 urlpatterns = [
-    # Reports URLs will be added later
+    path('', views.revenue_report, name='revenue_report'),
 ]
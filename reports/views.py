@@ -1,5 +1,37 @@
 from django.shortcuts import render
-from django.contrib.auth.decorators import login_required
+from accounts.decorators import MANAGER_ROLES, role_required
+from . import analytics
+from .forms import ReportFilterForm
 
-# Reports views - can be extended later for analytics
-# For now, just a placeholder
+
+def _minutes(duration):
+    return round(duration.total_seconds() / 60, 1) if duration is not None else None
+
+
+@role_required(*MANAGER_ROLES, message='You do not have permission to view reports.')
+def revenue_report(request):
+    """Revenue, throughput and wash time for a date range."""
+    form = ReportFilterForm(request.GET)
+    start, end, period = form.get_range()
+    summaries = analytics.summaries_between(start, end)
+    
+    by_period = analytics.revenue_by_period(summaries, period)
+    summary = analytics.summary(summaries)
+    by_service_type = analytics.revenue_by_service_type(summaries)
+    by_employer = analytics.revenue_by_employer(summaries)
+    for row in [summary, *by_period, *by_service_type, *by_employer]:
+        row['wash_minutes'] = _minutes(row.pop('wash_duration'))
+    
+    context = {
+        'form': form,
+        'start': start,
+        'end': end,
+        'period': period,
+        'summary': summary,
+        'by_period': by_period,
+        'by_service_type': by_service_type,
+        'by_payment_status': analytics.revenue_by_payment_status(summaries),
+        'by_employer': by_employer,
+    }
+    
+    return render(request, 'reports/revenue_report.html', context)
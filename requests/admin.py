@@ -13,6 +13,7 @@ class EmployerRequestAdmin(admin.ModelAdmin):
     list_display = ('title', 'user', 'request_type', 'is_instruction', 'is_active', 'is_read', 'created_at')
     list_filter = ('request_type', 'is_instruction', 'is_active', 'is_read', 'created_at')
     search_fields = ('title', 'content', 'user__first_name', 'user__last_name')
+    list_select_related = ('user',)
     ordering = ('-created_at',)
     inlines = [RequestReplyInline]
     
@@ -31,6 +32,8 @@ class RequestReplyAdmin(admin.ModelAdmin):
     list_display = ('request', 'author', 'is_read', 'created_at')
     list_filter = ('is_read', 'created_at')
     search_fields = ('content', 'request__title', 'author__first_name', 'author__last_name')
+    # The request column shows its employer too
+    list_select_related = ('request__user', 'author')
     ordering = ('-created_at',)
     
     fieldsets = (
@@ -0,0 +1,35 @@
+# Generated by Django 4.2.7 on 2026-10-17 01:26
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('requests', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='employerrequest',
+            index=models.Index(fields=['user', '-created_at', '-id'], name='request_user_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='employerrequest',
+            index=models.Index(condition=models.Q(('is_instruction', False)), fields=['-created_at', '-id'], name='request_open_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='employerrequest',
+            index=models.Index(condition=models.Q(('is_instruction', True)), fields=['-created_at', '-id'], name='request_instruction_idx'),
+        ),
+        # request_user_idx leads with this column, so drop the single-column
+        # foreign key index once it exists
+        migrations.AlterField(
+            model_name='employerrequest',
+            name='user',
+            field=models.ForeignKey(db_index=False, limit_choices_to={'role': 'employer'}, on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL),
+        ),
+    ]
@@ -3,6 +3,14 @@ from django.utils import timezone
 from accounts.models import User
 
 
+class EmployerRequestQuerySet(models.QuerySet):
+    
+    def for_listing(self):
+        """Requests with their sender and a ``has_replies`` flag, in one query."""
+        replies = RequestReply.objects.filter(request=models.OuterRef('pk'))
+        return self.select_related('user').annotate(has_replies=models.Exists(replies))
+
+
 class EmployerRequest(models.Model):
     """Employer requests and Author instructions."""
     
@@ -11,7 +19,8 @@ class EmployerRequest(models.Model):
         ('instruction', 'Instruction'),
     ]
     
-    user = models.ForeignKey(User, on_delete=models.CASCADE, limit_choices_to={'role': 'employer'})
+    # Indexed by request_user_idx below
+    user = models.ForeignKey(User, on_delete=models.CASCADE, limit_choices_to={'role': 'employer'}, db_index=False)
     title = models.CharField(max_length=200)
     content = models.TextField()
     request_type = models.CharField(max_length=20, choices=REQUEST_TYPE_CHOICES, default='request')
@@ -21,6 +30,8 @@ class EmployerRequest(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    objects = EmployerRequestQuerySet.as_manager()
+    
     def __str__(self):
         return f"{self.title} - {self.user.get_full_name()}"
     
@@ -28,6 +39,25 @@ class EmployerRequest(models.Model):
         verbose_name = 'Employer Request'
         verbose_name_plural = 'Employer Requests'
         ordering = ['-created_at']
+        # Requests and instructions are separate lists, so the author views
+        # get one partial index each. Boolean filters are rendered as bare
+        # column tests, which match a partial index condition on both
+        # SQLite and PostgreSQL but an index column only on PostgreSQL.
+        indexes = [
+            # One employer's requests and instructions; each employer has
+            # few enough rows that the remaining filters are cheap
+            models.Index(fields=['user', '-created_at', '-id'], name='request_user_idx'),
+            models.Index(
+                fields=['-created_at', '-id'],
+                name='request_open_idx',
+                condition=models.Q(is_instruction=False),
+            ),
+            models.Index(
+                fields=['-created_at', '-id'],
+                name='request_instruction_idx',
+                condition=models.Q(is_instruction=True),
+            ),
+        ]
 
 
 class RequestReply(models.Model):
@@ -1,35 +1,33 @@
 from django.shortcuts import render, redirect, get_object_or_404
-from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from django.core.paginator import Paginator
 from django.utils import timezone
 from .models import EmployerRequest, RequestReply
 from .forms import EmployerRequestForm, RequestReplyForm
+from accounts.decorators import ALL_ROLES, role_required
 from accounts.models import User
+from carwash_management.conditional import conditional_page, page_version
+from carwash_management.pagination import apaginate, page_rows
 
+INSTRUCTIONS_PER_PAGE = 10
 
-@login_required
-def request_list(request):
+
+@role_required('employer', 'author', message='You do not have permission to view requests.')
+async def request_list(request):
     """List requests based on user role."""
     if request.user.is_employer():
         # Show employer's own requests
-        requests = EmployerRequest.objects.filter(user=request.user).order_by('-created_at')
-    elif request.user.is_author():
-        # Show all employer requests
-        requests = EmployerRequest.objects.filter(is_instruction=False).order_by('-created_at')
+        requests = EmployerRequest.objects.for_listing().filter(user=request.user).order_by('-created_at')
     else:
-        messages.error(request, 'You do not have permission to view requests.')
-        return redirect('accounts:dashboard')
+        # Show all employer requests
+        requests = EmployerRequest.objects.for_listing().filter(is_instruction=False).order_by('-created_at')
     
     # Pagination
-    paginator = Paginator(requests, 10)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    page_obj = await apaginate(request, requests, 10, ('-created_at', '-id'))
     
     return render(request, 'requests/request_list.html', {'page_obj': page_obj})
 
 
-@login_required
+@role_required(*ALL_ROLES)
 def request_create(request):
     """Create a new request or instruction."""
     if request.method == 'POST':
@@ -62,14 +60,10 @@ def request_create(request):
     return render(request, 'requests/request_form.html', {'form': form, 'title': title})
 
 
-@login_required
+@role_required('author', message='Only authors can reply to requests.')
 def request_reply(request, request_id):
     """Reply to a request (authors only)."""
-    if not request.user.is_author():
-        messages.error(request, 'Only authors can reply to requests.')
-        return redirect('accounts:dashboard')
-    
-    employer_request = get_object_or_404(EmployerRequest, id=request_id)
+    employer_request = get_object_or_404(EmployerRequest.objects.select_related('user'), id=request_id)
     
     if request.method == 'POST':
         form = RequestReplyForm(request.POST)
@@ -84,7 +78,7 @@ def request_reply(request, request_id):
         form = RequestReplyForm()
     
     # Get all replies for this request
-    replies = RequestReply.objects.filter(request=employer_request).order_by('created_at')
+    replies = RequestReply.objects.select_related('author').filter(request=employer_request).order_by('created_at')
     
     context = {
         'employer_request': employer_request,
@@ -95,34 +89,39 @@ def request_reply(request, request_id):
     return render(request, 'requests/request_reply.html', context)
 
 
-@login_required
-def instruction_list(request):
+def _listed_instructions(user):
+    """The instructions ``user`` sees: their own for employers, all of them for authors."""
+    instructions = EmployerRequest.objects.for_listing().filter(is_instruction=True).order_by('-created_at')
+    if user.is_employer():
+        instructions = instructions.filter(user=user)
+    return instructions
+
+
+def _instruction_list_version(request):
+    rows, total = page_rows(
+        request, _listed_instructions(request.user), INSTRUCTIONS_PER_PAGE, ('-created_at', '-id')
+    )
+    return page_version(rows.values_list('id', 'updated_at', 'has_replies'), total)
+
+
+@role_required('employer', 'author', message='You do not have permission to view instructions.')
+@conditional_page(_instruction_list_version)
+async def instruction_list(request):
     """List instructions (for employers) or manage instructions (for authors)."""
     if request.user.is_employer():
         # Show instructions for this employer
-        instructions = EmployerRequest.objects.filter(
-            user=request.user,
-            is_instruction=True
-        ).order_by('-created_at')
+        instructions = _listed_instructions(request.user)
         
         # Pagination
-        paginator = Paginator(instructions, 10)
-        page_number = request.GET.get('page')
-        page_obj = paginator.get_page(page_number)
+        page_obj = await apaginate(request, instructions, INSTRUCTIONS_PER_PAGE, ('-created_at', '-id'))
         
         return render(request, 'requests/instruction_list.html', {'page_obj': page_obj})
     
-    elif request.user.is_author():
+    else:
         # Show all instructions for management
-        instructions = EmployerRequest.objects.filter(is_instruction=True).order_by('-created_at')
+        instructions = _listed_instructions(request.user)
         
         # Pagination
-        paginator = Paginator(instructions, 10)
-        page_number = request.GET.get('page')
-        page_obj = paginator.get_page(page_number)
+        page_obj = await apaginate(request, instructions, INSTRUCTIONS_PER_PAGE, ('-created_at', '-id'))
         
         return render(request, 'requests/instruction_manage.html', {'page_obj': page_obj})
-    
-    else:
-        messages.error(request, 'You do not have permission to view instructions.')
-        return redirect('accounts:dashboard')